@@ -0,0 +1,418 @@
+import functools
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from budget import get_budget_governor
+from priority_scheduler import DEFAULT_CLASS, DEFAULT_CLASSES, PriorityScheduler, _percentile
+
+# Environment switches read by AdmissionController.from_env()
+#   ADMISSION_WORKERS               applications run at once (default 4)
+#   ADMISSION_MAX_LATENCY_SECONDS   bound on queueing + run time of admitted work (default 120)
+#   ADMISSION_MAX_QUEUE             queued applications beyond which intake is refused (default 1000)
+#   ADMISSION_DEFER_CLASSES         priority classes that may be deferred to filter-only (default "bulk")
+
+# What an application costs in each mode before any has been observed:
+# the full pipeline makes up to six sequential GPT-4 calls, filter-only two
+DEFAULT_COSTS = {"full": 30.0, "filter": 10.0, "resume": 20.0}
+# Nodes of the full pipeline and of a filter-only run, for estimates from node latency
+FULL_NODES = ("compact", "features", "filter", "jd", "cultural", "organiser", "emailer")
+FILTER_NODES = ("compact", "features", "filter")
+# Deferred work is resumed once a full run would finish within this share of the bound
+RESUME_BELOW = 0.5
+# Admitted work is due at the bound and served by deadline once this share of it is left
+URGENT_WITHIN = 0.5
+EWMA_ALPHA = 0.2
+LATENCY_WINDOW = 10000
+
+
+class AdmissionRejected(Exception):
+    """Intake refused because the pipeline is overloaded; retry after retry_after seconds."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class NodeLatency:
+    """Moving average of observed run time per graph node."""
+
+    def __init__(self, alpha=EWMA_ALPHA):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._averages = {}
+
+    def observe(self, node, seconds):
+        # Both JD analysers are one step of the path
+        node = "jd" if node in ("tech_jd", "sales_jd") else node
+        with self._lock:
+            previous = self._averages.get(node)
+            self._averages[node] = seconds if previous is None else previous + self.alpha * (seconds - previous)
+
+    def estimate(self, nodes):
+        """Sum of the averages of nodes, or None until every one has been observed."""
+        with self._lock:
+            if not all(node in self._averages for node in nodes):
+                return None
+            return sum(self._averages[node] for node in nodes)
+
+    def snapshot(self):
+        with self._lock:
+            return {node: round(seconds, 4) for node, seconds in self._averages.items()}
+
+
+_node_latency = NodeLatency()
+
+
+def get_node_latency():
+    """Return the process-wide node latency averages."""
+    return _node_latency
+
+
+def timed(stage, node):
+    """Wrap a graph node so its run time feeds the node latency averages."""
+    @functools.wraps(node)
+    def run(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return node(*args, **kwargs)
+        finally:
+            _node_latency.observe(stage, time.perf_counter() - started)
+    return run
+
+
+def graph_processes():
+    """The graph entry points the controller runs in each mode."""
+    from lg_graph import run_filter_only, run_once
+    from reevaluate import resume_deferred
+
+    def full(application):
+        return run_once(application["user_profile"], application["cover_letter"],
+                        application.get("application_id"), tenant_id=application.get("tenant_id"))
+
+    def filter_only(application):
+        return run_filter_only(application["user_profile"], application["cover_letter"],
+                               application.get("application_id"), tenant_id=application.get("tenant_id"))
+
+    def resume(application):
+        results = resume_deferred([application["application_id"]])["results"]
+        return results[0].get("state") if results else None
+
+    return {"full": full, "filter": filter_only, "resume": resume}
+
+
+class AdmissionController:
+    """
+    Admission control in front of the graph.
+
+    Every application is queued (by priority class, see priority_scheduler)
+    only if it can be expected to finish within max_latency: the estimated
+    cost of the work queued ahead of it and in flight, spread over the
+    workers, plus its own run time. Admitted work is due at the bound, so
+    the scheduler serves it by deadline before heavier classes arriving
+    later can push it past. Costs come from the observed run time of each
+    mode, or from the node latency averages until a mode has been observed.
+    When a full run would not fit:
+
+    - applications of a deferrable class (bulk by default) get only the
+      cheap filter stage now; their inputs and filter result are stored,
+      and the rest of the pipeline is resumed once a full run fits in
+      RESUME_BELOW of the bound again (or at shutdown)
+    - other applications, and everything once max_queue is reached, are
+      refused with AdmissionRejected carrying a retry-after estimate
+
+    So admitted work keeps a bounded latency while the overload is absorbed
+    by deferring the work that can wait.
+    """
+
+    def __init__(self, processes=None, workers=4, max_latency=120.0, max_queue=1000,
+                 defer_classes=(DEFAULT_CLASS,), classes=None, clock=time.monotonic, node_latency=None):
+        self.processes = processes or graph_processes()
+        self.workers = workers
+        self.max_latency = max_latency
+        self.max_queue = max_queue
+        self.defer_classes = set(defer_classes)
+        self.clock = clock
+        self.node_latency = node_latency or get_node_latency()
+        urgency = max_latency * URGENT_WITHIN if math.isfinite(max_latency) else 300.0
+        self.scheduler = PriorityScheduler(classes=classes, urgency_seconds=urgency, clock=clock)
+        self.classes = self.scheduler.classes
+        self._lock = threading.Lock()
+        self._costs = {}
+        self._queued_cost = {name: 0.0 for name in self.classes}
+        self._in_flight_cost = 0.0
+        self._in_flight = 0
+        self._deferred = deque()
+        self._closing = False
+        self._threads = []
+        self._on_result = None
+        self._stats = {
+            name: {"admitted": 0, "deferred": 0, "rejected": 0, "resumed": 0, "over_bound": 0,
+                   "latencies": deque(maxlen=LATENCY_WINDOW)}
+            for name in self.classes
+        }
+
+    @classmethod
+    def from_env(cls, processes=None):
+        defer = os.getenv("ADMISSION_DEFER_CLASSES", DEFAULT_CLASS)
+        return cls(
+            processes=processes,
+            workers=int(os.getenv("ADMISSION_WORKERS", "4")),
+            max_latency=float(os.getenv("ADMISSION_MAX_LATENCY_SECONDS", "120")),
+            max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "1000")),
+            defer_classes=tuple(name.strip() for name in defer.split(",") if name.strip()),
+        )
+
+    def cost(self, mode):
+        """Estimated run time of one application in a mode, in seconds."""
+        with self._lock:
+            observed = self._costs.get(mode)
+        if observed is not None:
+            return observed
+        estimate = self.node_latency.estimate(FILTER_NODES if mode == "filter" else FULL_NODES)
+        return estimate if estimate is not None else DEFAULT_COSTS[mode]
+
+    def _observe(self, mode, seconds):
+        with self._lock:
+            previous = self._costs.get(mode)
+            self._costs[mode] = seconds if previous is None else previous + EWMA_ALPHA * (seconds - previous)
+
+    def _class_of(self, application):
+        name = application.get("priority_class")
+        return name if name in self.classes else self.scheduler.default_class
+
+    def _wait_locked(self, priority_class):
+        # Work of classes at least as heavily weighted is served ahead
+        weight = self.classes[priority_class]["weight"]
+        ahead = sum(cost for name, cost in self._queued_cost.items() if self.classes[name]["weight"] >= weight)
+        return (ahead + self._in_flight_cost) / self.workers
+
+    def expected_latency(self, priority_class=DEFAULT_CLASS, mode="full"):
+        """Expected seconds from now until a new application of a class would be done."""
+        cost = self.cost(mode)
+        with self._lock:
+            return self._wait_locked(priority_class) + cost
+
+    def _enqueue(self, application, priority_class, mode, cost):
+        deadline = application.get("deadline")
+        if mode == "full" and math.isfinite(self.max_latency):
+            # Due at the bound, so later arrivals of heavier classes cannot push it past
+            deadline = min(deadline or math.inf, self.clock() + self.max_latency)
+        with self._lock:
+            self._queued_cost[priority_class] += cost
+        self.scheduler.submit({"mode": mode, "cost": cost, "application": application},
+                              priority_class=priority_class, deadline=deadline)
+
+    def submit(self, application):
+        """
+        Offer an application for intake.
+
+        Args:
+            application (dict): 'user_profile', 'cover_letter' and optionally
+                'application_id', 'tenant_id', 'priority_class' and 'deadline'
+
+        Returns:
+            str: "admitted" (full pipeline) or "deferred" (filter only for now)
+
+        Raises:
+            AdmissionRejected: Overloaded (or over budget); retry after e.retry_after seconds
+        """
+        if self._closing:
+            raise AdmissionRejected("Intake is closed")
+        if not get_budget_governor().admit():
+            raise AdmissionRejected("Budget hard cap reached")
+        priority_class = self._class_of(application)
+        stats = self._stats[priority_class]
+        full_cost = self.cost("full")
+        with self._lock:
+            wait = self._wait_locked(priority_class)
+            queued = len(self.scheduler)
+        latency = wait + full_cost
+        if queued < self.max_queue:
+            # Nothing ahead: refusing could not make the application any faster
+            if latency <= self.max_latency or wait == 0:
+                self._enqueue(application, priority_class, "full", full_cost)
+                with self._lock:
+                    stats["admitted"] += 1
+                return "admitted"
+            if priority_class in self.defer_classes:
+                self._enqueue(application, priority_class, "filter", self.cost("filter"))
+                with self._lock:
+                    stats["deferred"] += 1
+                return "deferred"
+        with self._lock:
+            stats["rejected"] += 1
+        raise AdmissionRejected(
+            f"Overloaded: {queued} applications queued, about {latency:.0f}s until a new one would be done",
+            retry_after=max(1, math.ceil(latency - self.max_latency)),
+        )
+
+    def _resume_deferred(self):
+        """Queue deferred applications for the rest of the pipeline while a full run fits comfortably."""
+        cost = self.cost("resume")
+        while True:
+            with self._lock:
+                if not self._deferred:
+                    return
+                application, priority_class = self._deferred[0]
+                if not self._closing and self._wait_locked(priority_class) + cost > self.max_latency * RESUME_BELOW:
+                    return
+                self._deferred.popleft()
+                self._queued_cost[priority_class] += cost
+            self.scheduler.submit({"mode": "resume", "cost": cost, "application": application},
+                                  priority_class=priority_class)
+
+    def _run(self, entry):
+        job = entry.application
+        mode, cost, application = job["mode"], job["cost"], job["application"]
+        priority_class = entry.priority_class
+        with self._lock:
+            self._queued_cost[priority_class] = max(0.0, self._queued_cost[priority_class] - cost)
+            self._in_flight_cost += cost
+            self._in_flight += 1
+        started = self.clock()
+        try:
+            state = self.processes[mode](application)
+        finally:
+            elapsed = self.clock() - started
+            self._observe(mode, elapsed)
+            with self._lock:
+                self._in_flight_cost = max(0.0, self._in_flight_cost - cost)
+                self._in_flight -= 1
+        stats = self._stats[priority_class]
+        if mode == "filter":
+            if state is not None and state.get("application_id") and not state.get("parked_stage"):
+                with self._lock:
+                    self._deferred.append(({**application, "application_id": state["application_id"]},
+                                           priority_class))
+            return
+        latency = self.clock() - entry.submitted_at
+        with self._lock:
+            if mode == "resume":
+                stats["resumed"] += 1
+            else:
+                stats["latencies"].append(latency)
+                if latency > self.max_latency:
+                    stats["over_bound"] += 1
+        self.scheduler.complete(entry)
+        if state is not None and self._on_result is not None:
+            self._on_result(state)
+
+    def _worker(self):
+        while True:
+            entry = self.scheduler.next(timeout=0.2)
+            if entry is None:
+                with self._lock:
+                    done = self._closing and not self._in_flight and not self._deferred
+                if done and not len(self.scheduler):
+                    return
+                self._resume_deferred()
+                continue
+            try:
+                self._run(entry)
+            except Exception as e:
+                print(f"Admission worker failed on an application: {e}")
+            self._resume_deferred()
+
+    def start(self, on_result=None):
+        """Start the workers. on_result is called with the final state of every admitted or resumed application."""
+        self._on_result = on_result
+        self._threads = [threading.Thread(target=self._worker, name=f"admission-worker-{i}", daemon=True)
+                         for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def restore_deferred(self, priority_class=DEFAULT_CLASS):
+        """Queue applications deferred by an earlier process for resumption. Returns how many."""
+        from stage_results import get_stage_result_store
+
+        restored = 0
+        for application in get_stage_result_store().iter_applications(deferred_only=True):
+            with self._lock:
+                self._deferred.append((application, priority_class))
+            restored += 1
+        return restored
+
+    def close(self):
+        """Stop intake, resume every deferred application and wait until all work is done."""
+        self._closing = True
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def report(self):
+        """
+        Intake outcome and latency per class.
+
+        Returns:
+            dict: 'classes' (admitted, deferred, rejected, resumed, over_bound and
+                  p50/p95/p99 seconds from submission to done for admitted work),
+                  'queued', 'in_flight', 'deferred_waiting', 'costs' and 'node_latency'
+        """
+        with self._lock:
+            classes = {}
+            for name, stats in self._stats.items():
+                latencies = list(stats["latencies"])
+                row = {key: value for key, value in stats.items() if key != "latencies"}
+                for q in (50, 95, 99):
+                    value = _percentile(latencies, q)
+                    row[f"p{q}_s"] = round(value, 3) if value is not None else None
+                classes[name] = row
+            report = {
+                "classes": classes,
+                "in_flight": self._in_flight,
+                "deferred_waiting": len(self._deferred),
+                "costs": {mode: round(seconds, 4) for mode, seconds in self._costs.items()},
+            }
+        report["queued"] = len(self.scheduler)
+        report["node_latency"] = self.node_latency.snapshot()
+        return report
+
+
+def main():
+    """Compare latency under a 2x overload without and with admission control."""
+    # Scaled-down simulation: 4 workers, full run ~40ms (~100/s served),
+    # filter-only ~8ms, 200/s arriving for 5s (10% referral, 20% priority role, 70% bulk)
+    mix = ["referral"] * 1 + ["priority_role"] * 2 + ["bulk"] * 7
+    arrivals = [{"priority_class": random.choice(mix), "application_id": f"sim-{i}"} for i in range(1000)]
+
+    def work(seconds):
+        def process(application):
+            time.sleep(random.uniform(0.8, 1.2) * seconds)
+            return {"application_id": application["application_id"]}
+        return process
+
+    processes = {"full": work(0.040), "filter": work(0.008), "resume": work(0.032)}
+    classes = {name: dict(spec) for name, spec in DEFAULT_CLASSES.items()}
+
+    def simulate(max_latency):
+        controller = AdmissionController(processes, workers=4, max_latency=max_latency, classes=classes,
+                                         node_latency=NodeLatency())
+        controller.start()
+        started = time.monotonic()
+        for application in arrivals:
+            try:
+                controller.submit(application)
+            except AdmissionRejected:
+                pass
+            time.sleep(1 / 200)
+        intake_seconds = time.monotonic() - started
+        controller.close()
+        return controller.report(), intake_seconds, time.monotonic() - started
+
+    print("Admission control under a 2x overload (1000 applications, 200/s in, ~100/s served):")
+    print("=" * 50)
+    for label, bound in (("admit everything", math.inf), ("admission control", 0.5)):
+        report, intake, total = simulate(bound)
+        print(f"\n{label} (latency bound {bound}s), drained {total - intake:.1f}s after intake ended:")
+        for name, row in report["classes"].items():
+            print(f"  {name:14s} admitted {row['admitted']:4d}, deferred {row['deferred']:4d} "
+                  f"(resumed {row['resumed']:4d}), rejected {row['rejected']:3d} | "
+                  f"p95 {row['p95_s']}s, p99 {row['p99_s']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import threading
+import weakref
+from datetime import date, timedelta
+from itertools import combinations
+
+import numpy as np
+
+from in_memory_db import INTERVIEW_TYPES, TIME_SLOTS, get_slot_store
+
+
+def _to_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+class AvailabilityGrid:
+    """
+    Available slot counts per interview type as (day, hour) matrices.
+
+    Row i is start_date + i days and column j is TIME_SLOTS[j]; a cell holds
+    how many slots (interviewers) are free then. "Which days have every
+    round at distinct hours", "earliest such day" and weekly capacity are
+    answered with vectorized reductions over whole calendars instead of
+    nested scans over slot lists.
+    """
+
+    def __init__(self, start_date, num_days, interview_types=INTERVIEW_TYPES):
+        self.start_date = _to_date(start_date)
+        self.num_days = num_days
+        self.counts = {t: np.zeros((num_days, len(TIME_SLOTS)), dtype=np.int32) for t in interview_types}
+
+    @classmethod
+    def from_counts(cls, rows):
+        """Build a grid from (interview_type, date, time_order, count) rows."""
+        dates = {}
+        for _, day, _, _ in rows:
+            if day not in dates:
+                dates[day] = date.fromisoformat(day)
+        if not dates:
+            return cls(date.today(), 0)
+        start = min(dates.values())
+        grid = cls(start, (max(dates.values()) - start).days + 1)
+
+        by_type = {}
+        for interview_type, day, time_order, count in rows:
+            cells = by_type.setdefault(interview_type, ([], [], []))
+            cells[0].append((dates[day] - start).days)
+            cells[1].append(time_order)
+            cells[2].append(count)
+        for interview_type, (days, hours, counts) in by_type.items():
+            matrix = grid.counts.setdefault(
+                interview_type, np.zeros((grid.num_days, len(TIME_SLOTS)), dtype=np.int32)
+            )
+            np.add.at(matrix, (np.array(days), np.array(hours)), np.array(counts))
+        return grid
+
+    @classmethod
+    def from_store(cls, store=None, start_date=None, end_date=None):
+        """Build a grid from the available slots of a SlotStore (default: the process-wide one)."""
+        store = store or get_slot_store()
+        return cls.from_counts(store.availability_counts(start_date, end_date))
+
+    @classmethod
+    def from_slots(cls, slots):
+        """Build a grid from slot dicts such as get_available_slots() returns."""
+        tally = {}
+        for slot in slots:
+            key = (slot["interview_type"], slot["date"], TIME_SLOTS.index(slot["time"]))
+            tally[key] = tally.get(key, 0) + 1
+        return cls.from_counts([key + (count,) for key, count in tally.items()])
+
+    def date_of(self, day):
+        return (self.start_date + timedelta(days=int(day))).isoformat()
+
+    def day_of(self, value):
+        return (_to_date(value) - self.start_date).days
+
+    def available(self, interview_type):
+        """Boolean (day, hour) matrix of cells with at least one free slot."""
+        counts = self.counts.get(interview_type)
+        if counts is None:
+            return np.zeros((self.num_days, len(TIME_SLOTS)), dtype=bool)
+        return counts > 0
+
+    def has_any(self, interview_type):
+        return bool(self.available(interview_type).any())
+
+    def feasible_days(self, interview_types):
+        """
+        Days on which every type can be booked at pairwise distinct hours.
+
+        A day is feasible when, for every subset of the types, the hours
+        free for at least one of them number at least the subset size
+        (Hall's condition), checked for all days at once.
+
+        Returns:
+            numpy.ndarray: Boolean vector over days
+        """
+        masks = [self.available(t) for t in interview_types]
+        feasible = np.ones(self.num_days, dtype=bool)
+        for size in range(1, len(masks) + 1):
+            for subset in combinations(masks, size):
+                union = np.logical_or.reduce(subset)
+                feasible &= union.sum(axis=1) >= size
+        return feasible
+
+    def earliest_feasible_day(self, interview_types, from_date=None):
+        """Index of the first feasible day on or after from_date, or None."""
+        first = max(self.day_of(from_date), 0) if from_date else 0
+        feasible = self.feasible_days(interview_types)[first:]
+        if not feasible.size:
+            return None
+        day = int(np.argmax(feasible))
+        return first + day if feasible[day] else None
+
+    def pick_hours(self, interview_types, day):
+        """
+        Pick one hour per type on a day with no two types sharing an hour,
+        preferring earlier hours.
+
+        Returns:
+            list: Hour indices in the order of interview_types, or None
+        """
+        options = [np.flatnonzero(self.available(t)[day]) for t in interview_types]
+        chosen = []
+
+        def pick(i):
+            if i == len(options):
+                return True
+            for hour in options[i]:
+                if hour in chosen:
+                    continue
+                chosen.append(int(hour))
+                if pick(i + 1):
+                    return True
+                chosen.pop()
+            return False
+
+        return list(chosen) if pick(0) else None
+
+    def earliest_cell(self, interview_type, from_date=None):
+        """(day, hour) of the earliest free slot of a type, or None."""
+        first = max(self.day_of(from_date), 0) if from_date else 0
+        flat = self.available(interview_type)[first:].ravel()
+        if not flat.size:
+            return None
+        i = int(np.argmax(flat))
+        if not flat[i]:
+            return None
+        day, hour = divmod(i, len(TIME_SLOTS))
+        return first + day, hour
+
+    def weekly_capacity(self, interview_types):
+        """
+        Free slots per type and number of feasible bundle days, per Monday-based week.
+
+        Returns:
+            list: Dicts with 'week_start', 'slots' (per type) and 'bundle_days'
+        """
+        front = self.start_date.weekday()
+        back = -(front + self.num_days) % 7
+
+        def per_week(values):
+            return np.pad(values, (front, back)).reshape(-1, 7).sum(axis=1)
+
+        slots = {t: per_week(self.counts[t].sum(axis=1)) if t in self.counts else None for t in interview_types}
+        bundle_days = per_week(self.feasible_days(interview_types).astype(np.int32))
+        first_monday = self.start_date - timedelta(days=front)
+        return [
+            {
+                "week_start": (first_monday + timedelta(weeks=week)).isoformat(),
+                "slots": {t: int(slots[t][week]) if slots[t] is not None else 0 for t in interview_types},
+                "bundle_days": int(bundle_days[week]),
+            }
+            for week in range(len(bundle_days))
+        ]
+
+    def mark_booked(self, slot):
+        """Take a booked slot out of the grid."""
+        day = self.day_of(slot["date"])
+        counts = self.counts.get(slot["interview_type"])
+        if counts is not None and 0 <= day < self.num_days:
+            hour = TIME_SLOTS.index(slot["time"])
+            counts[day, hour] = max(counts[day, hour] - 1, 0)
+
+    def describe(self, interview_types, max_days=5):
+        """
+        Compact text summary for the organiser prompt: the earliest feasible
+        days with their free hours per type, and the earliest slot of each type.
+        """
+        lines = ["Earliest days with every required round (free times per round):"]
+        days = np.flatnonzero(self.feasible_days(interview_types))[:max_days]
+        for day in days:
+            rounds = [
+                f"{t}: " + ", ".join(TIME_SLOTS[h] for h in np.flatnonzero(self.available(t)[day]))
+                for t in interview_types
+            ]
+            lines.append(f"- {self.date_of(day)}: " + " | ".join(rounds))
+        if not len(days):
+            lines.append("- none")
+        lines.append("Earliest free slot per round:")
+        for t in interview_types:
+            cell = self.earliest_cell(t)
+            lines.append(f"- {t}: {self.date_of(cell[0])} {TIME_SLOTS[cell[1]]}" if cell else f"- {t}: none")
+        return "\n".join(lines)
+
+
+_grids = weakref.WeakKeyDictionary()
+_grids_lock = threading.Lock()
+
+
+def get_availability(store=None):
+    """
+    Return the availability grid of a slot store, rebuilt only after the store changed.
+
+    Args:
+        store (SlotStore): Store to read (default: the process-wide one)
+    """
+    store = store or get_slot_store()
+    with _grids_lock:
+        cached = _grids.get(store)
+        if cached is not None and cached[0] == store.version:
+            return cached[1]
+    version = store.version
+    grid = AvailabilityGrid.from_store(store)
+    with _grids_lock:
+        _grids[store] = (version, grid)
+    return grid
+
+
+def main():
+    """Show feasible interview days and weekly capacity for the stored slots."""
+    from interview_organiser import REQUIRED_TYPES
+
+    grid = get_availability()
+    print("Interview Availability:")
+    print("=" * 50)
+    print(f"Calendar: {grid.date_of(0)} + {grid.num_days} days")
+    for interview_type, rounds in REQUIRED_TYPES.items():
+        print(f"\n{interview_type} ({', '.join(rounds)}):")
+        day = grid.earliest_feasible_day(rounds)
+        print(f"  Earliest same-day bundle: {grid.date_of(day) if day is not None else 'none'}")
+        for week in grid.weekly_capacity(rounds):
+            print(f"  Week of {week['week_start']}: {week['bundle_days']} bundle days, slots {week['slots']}")
+
+
+if __name__ == "__main__":
+    main()
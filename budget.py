@@ -0,0 +1,236 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# USD per 1K tokens as (prompt, completion)
+MODEL_PRICES = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+}
+
+# Features a node can fall back from when the budget runs low
+DEGRADABLE_FEATURES = ("llm_email", "llm_organiser")
+
+# Application whose LLM calls are currently being charged
+_current_application = contextvars.ContextVar("current_application", default=None)
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """Estimated USD cost of one call. Unknown models are priced as gpt-4."""
+    prompt_price, completion_price = MODEL_PRICES.get(model, MODEL_PRICES["gpt-4"])
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+def _env_float(name):
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+class BudgetGovernor:
+    """
+    Tracks LLM token usage and estimated cost per application and per batch.
+
+    Caps are in USD and all optional:
+    - application_soft_cap: once an application has spent this much, its
+      remaining steps degrade (template email, local slot picking)
+    - batch_soft_cap: once the batch has spent this much, every application
+      degrades
+    - batch_hard_cap: once the batch has spent this much, admit() refuses new
+      applications; in-flight ones finish in degraded mode
+
+    Usage is recorded from the 'usage' block of each chat completion.
+    """
+
+    def __init__(self, application_soft_cap=None, batch_soft_cap=None, batch_hard_cap=None):
+        self.application_soft_cap = application_soft_cap
+        self.batch_soft_cap = batch_soft_cap
+        self.batch_hard_cap = batch_hard_cap
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def from_env(cls):
+        """Build a governor from BUDGET_APPLICATION_SOFT_USD, BUDGET_BATCH_SOFT_USD and BUDGET_BATCH_HARD_USD."""
+        return cls(
+            application_soft_cap=_env_float("BUDGET_APPLICATION_SOFT_USD"),
+            batch_soft_cap=_env_float("BUDGET_BATCH_SOFT_USD"),
+            batch_hard_cap=_env_float("BUDGET_BATCH_HARD_USD"),
+        )
+
+    def reset(self):
+        """Start a new batch."""
+        with self._lock:
+            self.started_at = time.time()
+            self.calls = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.cost = 0.0
+            self.by_node = {}
+            self.degraded = {feature: 0 for feature in DEGRADABLE_FEATURES}
+            self.applications_done = 0
+            self.applications_refused = 0
+            self.max_application_cost = 0.0
+            self._in_flight = {}
+
+    @contextmanager
+    def application(self, application_key, resume=None):
+        """
+        Charge LLM calls made inside this block to one application.
+
+        Entering an application that is already open reuses its entry. An
+        application handled in several blocks (e.g. screened, then finalized
+        once shortlisted) passes the entry yielded by its first block as
+        resume, so the soft cap sees its whole spend and it is counted once.
+
+        Args:
+            application_key: Application id (or another key unique in the batch)
+            resume (dict): Entry yielded by an earlier block of the same application
+
+        Yields:
+            dict: The application's 'calls', 'tokens' and 'cost' so far
+        """
+        with self._lock:
+            spent = self._in_flight.get(application_key)
+            nested = spent is not None
+            if not nested:
+                spent = resume if resume is not None else {"calls": 0, "tokens": 0, "cost": 0.0}
+                self._in_flight[application_key] = spent
+        token = _current_application.set(application_key)
+        try:
+            yield spent
+        finally:
+            _current_application.reset(token)
+            if not nested:
+                with self._lock:
+                    self._in_flight.pop(application_key, None)
+                    if resume is None:
+                        self.applications_done += 1
+                    self.max_application_cost = max(self.max_application_cost, spent["cost"])
+
+    def record_usage(self, node, model, usage):
+        """Record the usage block of one chat completion made by a node."""
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost += cost
+            stats = self.by_node.setdefault(node, {"calls": 0, "tokens": 0, "cost": 0.0})
+            stats["calls"] += 1
+            stats["tokens"] += prompt_tokens + completion_tokens
+            stats["cost"] += cost
+            spent = self._in_flight.get(_current_application.get())
+            if spent is not None:
+                spent["calls"] += 1
+                spent["tokens"] += prompt_tokens + completion_tokens
+                spent["cost"] += cost
+        return cost
+
+    def application_cost(self):
+        """Cost charged so far to the current application."""
+        with self._lock:
+            spent = self._in_flight.get(_current_application.get())
+            return spent["cost"] if spent else 0.0
+
+    def hard_cap_reached(self):
+        return self.batch_hard_cap is not None and self.cost >= self.batch_hard_cap
+
+    def should_degrade(self, feature):
+        """
+        Decide whether a node should skip its LLM call for a cheaper fallback.
+
+        Args:
+            feature (str): One of DEGRADABLE_FEATURES
+
+        Returns:
+            bool: True if the batch or the current application is over its soft cap
+        """
+        degrade = (
+            self.hard_cap_reached()
+            or (self.batch_soft_cap is not None and self.cost >= self.batch_soft_cap)
+            or (self.application_soft_cap is not None
+                and self.application_cost() >= self.application_soft_cap)
+        )
+        if degrade:
+            with self._lock:
+                self.degraded[feature] = self.degraded.get(feature, 0) + 1
+        return degrade
+
+    def admit(self):
+        """Return False (pause admission) once the batch hard cap is reached."""
+        if self.hard_cap_reached():
+            with self._lock:
+                self.applications_refused += 1
+            return False
+        return True
+
+    def snapshot(self):
+        """Live burn-down figures for the current batch."""
+        with self._lock:
+            elapsed = max(time.time() - self.started_at, 1e-9)
+            done = self.applications_done
+            avg_cost = self.cost / done if done else None
+            remaining = None
+            if self.batch_hard_cap is not None:
+                remaining = max(self.batch_hard_cap - self.cost, 0.0)
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cost_usd": round(self.cost, 4),
+                "remaining_usd": round(remaining, 4) if remaining is not None else None,
+                "burn_rate_usd_per_min": round(self.cost / elapsed * 60, 4),
+                "applications_done": done,
+                "applications_in_flight": len(self._in_flight),
+                "applications_refused": self.applications_refused,
+                "avg_cost_per_application": round(avg_cost, 4) if avg_cost is not None else None,
+                "max_cost_per_application": round(self.max_application_cost, 4),
+                "applications_left_in_budget": (
+                    int(remaining / avg_cost) if remaining is not None and avg_cost else None
+                ),
+                "degraded": dict(self.degraded),
+                "by_node": {node: dict(stats) for node, stats in self.by_node.items()},
+            }
+
+    def format_burn_down(self):
+        """One-line burn-down summary for console output."""
+        snap = self.snapshot()
+        line = (
+            f"💰 Spent ${snap['cost_usd']:.4f} over {snap['calls']} calls "
+            f"({snap['prompt_tokens'] + snap['completion_tokens']} tokens), "
+            f"{snap['applications_done']} applications"
+        )
+        if snap["remaining_usd"] is not None:
+            line += f", ${snap['remaining_usd']:.4f} left"
+            if snap["applications_left_in_budget"] is not None:
+                line += f" (~{snap['applications_left_in_budget']} applications)"
+        return line
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_budget_governor():
+    """Return the process-wide governor, configured from the environment on first use."""
+    global _governor
+    if _governor is not None:
+        return _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = BudgetGovernor.from_env()
+    return _governor
+
+
+def set_budget_governor(governor):
+    """Replace the process-wide governor, e.g. with one configured for a drive."""
+    global _governor
+    with _governor_lock:
+        _governor = governor
@@ -1,23 +1,8 @@
 from company_culture import company_culture
-import os
 import json
-from openai import OpenAI
-from dotenv import load_dotenv
 
-load_dotenv()
-
-_client = None
-
-
-def get_openai_client():
-    global _client
-    if _client is not None:
-        return _client
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables")
-    _client = OpenAI(api_key=api_key)
-    return _client
+from llm_circuit import LLMUnavailableError
+from llm_client import create_chat_completion
 
 
 functions = [
@@ -41,8 +26,42 @@ functions = [
     }
 ]
 
+# Same schema plus a numeric score, used in scoring mode to rank candidates
+scored_functions = [
+    {
+        "name": "finalverdict",
+        "description": "Return select or reject with a 0-100 score and an optional rejection_reason",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "verdict": {
+                    "type": "string",
+                    "enum": ["select", "reject"]
+                },
+                "score": {
+                    "type": "integer",
+                    "minimum": 0,
+                    "maximum": 100,
+                    "description": "0-100 rating of how well the candidate fits our culture"
+                },
+                "rejection_reason": {
+                    "type": "string",
+                    "description": "Reason for rejection if verdict is reject; empty otherwise"
+                }
+            },
+            "required": ["verdict", "score", "rejection_reason"]
+        }
+    }
+]
+
+SCORING_INSTRUCTIONS = """
+Also return score: an integer from 0 to 100 rating how well the candidate fits our culture, used to rank shortlisted candidates.
+Use the full range. Candidates you reject must score below 50.
+"""
+
 
-SYSTEM_PROMPT = f"""You are a cultural fit analyzer for our company.
+# Prompt with a {company_culture} placeholder, filled in per tenant (see tenants)
+PROMPT_TEMPLATE = """You are a cultural fit analyzer for our company.
 You will be given our company culture details and a candidate's cover letter.
 Assess whether the candidate's values, traits, and work style align with our company culture.
 If there is a strong cultural fit, choose verdict=select; otherwise verdict=reject.
@@ -61,27 +80,31 @@ Company Culture:
 {company_culture}
 """
 
+SYSTEM_PROMPT = PROMPT_TEMPLATE.format(company_culture=company_culture)
+
 
-def analyze_cultural_fit(cover_letter: str):
+def analyze_cultural_fit(cover_letter: str, scoring: bool = False, system_prompt: str = None):
     """
     Analyze cultural fit between candidate's cover letter and company culture.
     
     Args:
         cover_letter (str): Candidate's cover letter containing their traits and values
+        scoring (bool): Also ask for a 0-100 fit score
+        system_prompt (str): Prompt built from another company culture (default: SYSTEM_PROMPT)
         
     Returns:
-        dict: Contains 'verdict' and 'rejection_reason' fields
+        dict: Contains 'verdict' and 'rejection_reason' fields, plus 'score' in scoring mode
     """
-    client = get_openai_client()
     messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "system", "content": (system_prompt or SYSTEM_PROMPT) + (SCORING_INSTRUCTIONS if scoring else "")},
         {"role": "user", "content": f"Candidate Cover Letter:\n\n{cover_letter}"}
     ]
     try:
-        resp = client.chat.completions.create(
+        resp = create_chat_completion(
+            "cultural",
             model="gpt-4",
             messages=messages,
-            functions=functions,
+            functions=scored_functions if scoring else functions,
             function_call={"name": "finalverdict"}
         )
         fc = resp.choices[0].message.function_call
@@ -93,8 +116,15 @@ def analyze_cultural_fit(cover_letter: str):
                 return {"verdict": "reject", "rejection_reason": "Invalid verdict from model"}
             if verdict == "select":
                 reason = ""
-            return {"verdict": verdict, "rejection_reason": reason}
+            if not scoring:
+                return {"verdict": verdict, "rejection_reason": reason}
+            score = args.get("score")
+            if isinstance(score, bool) or not isinstance(score, (int, float)):
+                return {"verdict": "reject", "rejection_reason": "Invalid score from model", "score": 0}
+            return {"verdict": verdict, "rejection_reason": reason, "score": max(0, min(100, int(score)))}
         return {"verdict": "reject", "rejection_reason": "Model did not return a function call"}
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         return {"verdict": "reject", "rejection_reason": f"Error: {e}"}
 
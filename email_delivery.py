@@ -0,0 +1,514 @@
+import asyncio
+import json
+import os
+import re
+import ssl
+import time
+from base64 import b64encode
+from email.message import EmailMessage
+from email.policy import SMTP as SMTP_POLICY
+from email.utils import make_msgid
+
+from tenants import get_tenant_registry
+
+DEFAULT_SUBJECT = "Update on your application"
+
+_SUBJECT_RE = re.compile(r"^\W*subject\W*:\s*(.*?)\W*$", re.IGNORECASE)
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+
+
+def parse_generated_email(text):
+    """
+    Split generate_email() output into subject and body.
+
+    The model writes "Subject: ..." on its own line (sometimes wrapped in
+    markdown); everything after it is the body.
+
+    Returns:
+        tuple: (subject, body)
+    """
+    lines = (text or "").strip().splitlines()
+    for i, line in enumerate(lines):
+        match = _SUBJECT_RE.match(line)
+        if match and match.group(1):
+            return match.group(1).strip(), "\n".join(lines[i + 1:]).strip()
+    return DEFAULT_SUBJECT, "\n".join(lines).strip()
+
+
+def find_email_address(text):
+    """First email address in text (e.g. a profile), or None."""
+    match = _EMAIL_RE.search(text or "")
+    return match.group(0) if match else None
+
+
+def build_message(sender, recipient, subject, body, message_id=None):
+    """Build the RFC 5322 bytes for one email."""
+    message = EmailMessage(policy=SMTP_POLICY)
+    message["From"] = sender
+    message["To"] = recipient
+    message["Subject"] = subject
+    message["Message-ID"] = message_id or make_msgid()
+    message.set_content(body)
+    return message.as_bytes()
+
+
+class SMTPError(Exception):
+    """SMTP failure. transient is True for 4xx replies and dropped connections."""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.transient = code is None or 400 <= code < 500
+
+
+class SMTPConnection:
+    """
+    Minimal asyncio ESMTP client that keeps its session open between messages.
+
+    When the server advertises PIPELINING (RFC 2920), MAIL FROM, every
+    RCPT TO and DATA go out in a single write and their replies are read
+    back together, saving round trips per message.
+    """
+
+    def __init__(self, host, port, username=None, password=None, starttls=False, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.extensions = {}
+        self.messages_sent = 0
+
+    @property
+    def pipelining(self):
+        return "PIPELINING" in self.extensions
+
+    async def _read_reply(self):
+        lines = []
+        while True:
+            raw = await asyncio.wait_for(self.reader.readline(), self.timeout)
+            if not raw:
+                raise SMTPError(None, "Connection closed by server")
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            code = int(line[:3])
+            lines.append(line[4:])
+            if line[3:4] != "-":
+                return code, "\n".join(lines)
+
+    async def _command(self, command, expected=(250,)):
+        self.writer.write(command.encode("utf-8") + b"\r\n")
+        await self.writer.drain()
+        code, message = await self._read_reply()
+        if code not in expected:
+            raise SMTPError(code, message)
+        return code, message
+
+    async def _ehlo(self):
+        _, message = await self._command("EHLO localhost")
+        self.extensions = {}
+        for line in message.splitlines()[1:]:
+            name, _, params = line.partition(" ")
+            self.extensions[name.upper()] = params
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        code, message = await self._read_reply()
+        if code != 220:
+            raise SMTPError(code, message)
+        await self._ehlo()
+        if self.starttls:
+            await self._command("STARTTLS", expected=(220,))
+            await self.writer.start_tls(ssl.create_default_context())
+            await self._ehlo()
+        if self.username:
+            token = b64encode(f"\0{self.username}\0{self.password or ''}".encode("utf-8")).decode("ascii")
+            await self._command(f"AUTH PLAIN {token}", expected=(235,))
+
+    async def send(self, sender, recipients, data):
+        """
+        Send one message on this session.
+
+        Raises:
+            SMTPError: The server refused the envelope or the message
+        """
+        commands = [f"MAIL FROM:<{sender}>"] + [f"RCPT TO:<{r}>" for r in recipients] + ["DATA"]
+        expected = [(250,)] + [(250, 251)] * len(recipients) + [(354,)]
+        replies = []
+        if self.pipelining:
+            self.writer.write("".join(c + "\r\n" for c in commands).encode("utf-8"))
+            await self.writer.drain()
+            for _ in commands:
+                replies.append(await self._read_reply())
+        else:
+            for command, ok in zip(commands, expected):
+                self.writer.write(command.encode("utf-8") + b"\r\n")
+                await self.writer.drain()
+                replies.append(await self._read_reply())
+                if replies[-1][0] not in ok:
+                    break
+
+        failure = next(
+            ((code, message) for (code, message), ok in zip(replies, expected) if code not in ok),
+            None,
+        )
+        if failure is not None:
+            if replies[-1][0] == 354:
+                # DATA was accepted despite a refused recipient: send an empty message
+                self.writer.write(b".\r\n")
+                await self.writer.drain()
+                await self._read_reply()
+            await self._command("RSET")
+            raise SMTPError(*failure)
+
+        # Dot-stuff lines starting with "." and terminate with <CRLF>.<CRLF>
+        payload = re.sub(rb"(?m)^\.", b"..", data)
+        if not payload.endswith(b"\r\n"):
+            payload += b"\r\n"
+        self.writer.write(payload + b".\r\n")
+        await self.writer.drain()
+        code, message = await self._read_reply()
+        if code != 250:
+            raise SMTPError(code, message)
+        self.messages_sent += 1
+
+    async def close(self):
+        if self.writer is None:
+            return
+        try:
+            await self._command("QUIT", expected=(221,))
+        except (SMTPError, OSError, asyncio.TimeoutError, ValueError):
+            pass
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except OSError:
+            pass
+        self.writer = None
+
+
+class SMTPPool:
+    """Pool of reusable SMTP sessions to one server."""
+
+    def __init__(self, host, port, size=4, max_messages_per_connection=100, **connection_options):
+        self.host = host
+        self.port = port
+        self.max_messages_per_connection = max_messages_per_connection
+        self.connection_options = connection_options
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+        self.connections_opened = 0
+
+    async def acquire(self):
+        await self._slots.acquire()
+        try:
+            if self._idle:
+                return self._idle.pop()
+            connection = SMTPConnection(self.host, self.port, **self.connection_options)
+            await connection.connect()
+            self.connections_opened += 1
+            return connection
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, connection, broken=False):
+        try:
+            if broken or connection.messages_sent >= self.max_messages_per_connection:
+                await connection.close()
+            else:
+                self._idle.append(connection)
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await connection.close()
+
+
+class EmailDeliveryService:
+    """
+    Async outbound email queue with pooled SMTP sessions.
+
+    Workers take emails from the queue and send them over pooled, reused
+    connections, limiting concurrent sends per recipient domain. Transient
+    failures (4xx, dropped connections) are retried with exponential backoff.
+    Permanent failures and emails out of attempts go to the dead letters,
+    which are also appended to dead_letter_path if given.
+    """
+
+    def __init__(self, host, port, sender, pool_size=4, per_domain_limit=2, max_attempts=4,
+                 retry_backoff=1.0, dead_letter_path=None, **connection_options):
+        self.sender = sender
+        self.pool = SMTPPool(host, port, size=pool_size, **connection_options)
+        self.per_domain_limit = per_domain_limit
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.dead_letter_path = dead_letter_path
+        self.dead_letters = []
+        self.stats = {"queued": 0, "sent": 0, "retried": 0, "dead_lettered": 0}
+        self._queue = asyncio.Queue()
+        self._domain_limits = {}
+        self._workers = []
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @classmethod
+    def from_env(cls, **options):
+        """Configure from SMTP_HOST, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_STARTTLS and EMAIL_SENDER."""
+        return cls(
+            os.getenv("SMTP_HOST", "localhost"),
+            int(os.getenv("SMTP_PORT", "25")),
+            os.getenv("EMAIL_SENDER", "hr@example.com"),
+            username=os.getenv("SMTP_USERNAME"),
+            password=os.getenv("SMTP_PASSWORD"),
+            starttls=os.getenv("SMTP_STARTTLS", "0") == "1",
+            **options,
+        )
+
+    def enqueue(self, recipient, subject, body, email_id=None, sender=None):
+        """Queue one email for delivery, from sender (default: the service's sender)."""
+        self._pending += 1
+        self._idle.clear()
+        self.stats["queued"] += 1
+        self._queue.put_nowait({
+            "id": email_id or make_msgid(),
+            "from": sender or self.sender,
+            "to": recipient,
+            "subject": subject,
+            "body": body,
+            "attempts": 0,
+        })
+
+    def enqueue_generated_email(self, recipient, email_text, email_id=None, sender=None):
+        """Queue the output of emailer.generate_email(), using its "Subject:" line."""
+        subject, body = parse_generated_email(email_text)
+        self.enqueue(recipient, subject, body, email_id, sender)
+
+    def _domain_limit(self, recipient):
+        domain = recipient.rpartition("@")[2].lower()
+        if domain not in self._domain_limits:
+            self._domain_limits[domain] = asyncio.Semaphore(self.per_domain_limit)
+        return self._domain_limits[domain]
+
+    def _finish(self):
+        self._pending -= 1
+        if self._pending == 0:
+            self._idle.set()
+
+    def _dead_letter(self, job, error):
+        job = dict(job, error=str(error), failed_at=time.time())
+        self.dead_letters.append(job)
+        self.stats["dead_lettered"] += 1
+        if self.dead_letter_path:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(job) + "\n")
+        self._finish()
+
+    async def _deliver(self, job):
+        data = build_message(job["from"], job["to"], job["subject"], job["body"], job["id"])
+        async with self._domain_limit(job["to"]):
+            connection = await self.pool.acquire()
+            broken = False
+            try:
+                await connection.send(job["from"], [job["to"]], data)
+            except (OSError, asyncio.TimeoutError) as e:
+                broken = True
+                raise SMTPError(None, str(e))
+            except SMTPError as e:
+                broken = e.code is None
+                raise
+            except Exception:
+                # E.g. a malformed reply: the session is out of step, don't reuse it
+                broken = True
+                raise
+            finally:
+                await self.pool.release(connection, broken=broken)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            job["attempts"] += 1
+            try:
+                await self._deliver(job)
+                self.stats["sent"] += 1
+                self._finish()
+            except (SMTPError, OSError, asyncio.TimeoutError) as e:
+                transient = not isinstance(e, SMTPError) or e.transient
+                if transient and job["attempts"] < self.max_attempts:
+                    self.stats["retried"] += 1
+                    delay = self.retry_backoff * 2 ** (job["attempts"] - 1)
+                    loop.call_later(delay, self._queue.put_nowait, job)
+                else:
+                    self._dead_letter(job, e)
+            except Exception as e:
+                # Not a delivery failure (bad message, malformed reply): retrying won't
+                # help, and letting it escape would kill the worker and hang drain()
+                self._dead_letter(job, e)
+            finally:
+                self._queue.task_done()
+
+    def start(self, workers=8):
+        """Start the delivery workers on the running event loop."""
+        for _ in range(workers):
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def drain(self):
+        """Wait until every queued email was sent or dead-lettered."""
+        await self._idle.wait()
+
+    async def close(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self.pool.close()
+
+
+async def deliver_final_states_async(states, service, workers=8):
+    """
+    Send the final_email of each final AppState.
+
+    The recipient is the state's 'candidate_email', or the first address
+    found in the profile. States without either are skipped. Emails of a
+    tenant with an email_sender are sent from it.
+
+    Returns:
+        dict: Delivery stats plus 'skipped'
+    """
+    skipped = 0
+    for state in states:
+        recipient = state.get("candidate_email") or find_email_address(state.get("user_profile"))
+        if not recipient or not state.get("final_email"):
+            skipped += 1
+            continue
+        sender = get_tenant_registry().get(state.get("tenant_id")).email_sender
+        service.enqueue_generated_email(recipient, state["final_email"], state.get("application_id"), sender)
+    service.start(workers)
+    try:
+        await service.drain()
+    finally:
+        await service.close()
+    return dict(service.stats, skipped=skipped, connections_opened=service.pool.connections_opened)
+
+
+def deliver_final_states(states, workers=8, **options):
+    """Synchronous wrapper around deliver_final_states_async using SMTP settings from the environment."""
+    async def run():
+        return await deliver_final_states_async(states, EmailDeliveryService.from_env(**options), workers)
+    return asyncio.run(run())
+
+
+class LocalSMTPSink:
+    """
+    In-process SMTP server that stores messages instead of delivering them.
+
+    Advertises PIPELINING. fail_first makes the first N messages fail with a
+    transient 451 so retries can be exercised.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, fail_first=0):
+        self.host = host
+        self.port = port
+        self.fail_first = fail_first
+        self.messages = []
+        self.connections = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        writer.write(b"220 localhost sink ready\r\n")
+        envelope = {"from": None, "to": []}
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("utf-8", "replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb in ("EHLO", "HELO"):
+                    writer.write(b"250-localhost\r\n250-PIPELINING\r\n250 8BITMIME\r\n")
+                elif verb == "MAIL":
+                    envelope = {"from": command[10:].strip("<>"), "to": []}
+                    writer.write(b"250 OK\r\n")
+                elif verb == "RCPT":
+                    envelope["to"].append(command[8:].strip("<>"))
+                    writer.write(b"250 OK\r\n")
+                elif verb == "DATA":
+                    writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                    await writer.drain()
+                    chunks = []
+                    while True:
+                        data_line = await reader.readline()
+                        if data_line in (b".\r\n", b".\n", b""):
+                            break
+                        chunks.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                    if self.fail_first > 0:
+                        self.fail_first -= 1
+                        writer.write(b"451 Try again later\r\n")
+                    else:
+                        self.messages.append(dict(envelope, data=b"".join(chunks)))
+                        writer.write(b"250 Queued\r\n")
+                elif verb in ("RSET", "NOOP"):
+                    writer.write(b"250 OK\r\n")
+                elif verb == "QUIT":
+                    writer.write(b"221 Bye\r\n")
+                    await writer.drain()
+                    break
+                else:
+                    writer.write(b"502 Command not implemented\r\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+async def _demo(count):
+    sink = await LocalSMTPSink(fail_first=3).start()
+    service = EmailDeliveryService(
+        sink.host, sink.port, "hr@example.com", pool_size=4, per_domain_limit=4, retry_backoff=0.05
+    )
+    generated = "Subject: Next steps in your application\n\nDear Candidate,\n\nYour interviews are scheduled.\n\nBest regards,\nHR Team"
+    domains = ["example.com", "mail.test", "candidates.dev"]
+    for i in range(count):
+        service.enqueue_generated_email(f"candidate{i}@{domains[i % len(domains)]}", generated)
+    started = time.perf_counter()
+    service.start(workers=8)
+    await service.drain()
+    elapsed = time.perf_counter() - started
+    await service.close()
+    await sink.stop()
+    return service, sink, elapsed
+
+
+def main():
+    """Deliver a batch of generated emails to a local SMTP sink."""
+    count = 500
+    service, sink, elapsed = asyncio.run(_demo(count))
+    print("Email Delivery Test (local SMTP sink)")
+    print("=" * 50)
+    print(f"Queued: {service.stats['queued']}")
+    print(f"Delivered to sink: {len(sink.messages)}")
+    print(f"Retried: {service.stats['retried']}")
+    print(f"Dead-lettered: {service.stats['dead_lettered']}")
+    print(f"SMTP connections opened: {service.pool.connections_opened}")
+    print(f"Throughput: {count / elapsed:.0f} emails/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,106 +1,76 @@
-import os
 import json
-from openai import OpenAI
-from dotenv import load_dotenv
+import re
 
-load_dotenv()
+from llm_circuit import LLMUnavailableError
+from llm_client import create_chat_completion
 
-_client = None
+# "Jane Doe, ..." / "Name: Jane Doe" / "My name is Jane Doe" / "I am Jane Doe"
+_NAME_PATTERNS = [
+    re.compile(r"^\s*([A-Z][a-z]+(?: [A-Z][a-z]+){1,2}),"),
+    re.compile(r"\bName:\s*([A-Z][a-z]+(?: [A-Z][a-z]+){1,2})"),
+    re.compile(r"\b(?:My name is|I am) ([A-Z][a-z]+(?: [A-Z][a-z]+){1,2})\b"),
+]
 
 
-def get_openai_client():
-    global _client
-    if _client is not None:
-        return _client
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables")
-    _client = OpenAI(api_key=api_key)
-    return _client
+def guess_candidate_name(profile_text):
+    """
+    Extract the candidate name with regex patterns, without an LLM call.
+
+    Returns:
+        str: Candidate name, or "Candidate" if none of the patterns match
+    """
+    for pattern in _NAME_PATTERNS:
+        match = pattern.search(profile_text or "")
+        if match:
+            return match.group(1)
+    return "Candidate"
 
 
-def extract_candidate_name(profile_text):
+def render_template_email(verdict, reason, candidate_name, signature="HR Team"):
     """
-    Extract candidate name from profile text using LLM.
-    
+    Build a candidate email from a fixed template, without an LLM call.
+
     Args:
-        profile_text (str): User profile containing candidate information
-        
+        verdict (str): "select" or "reject"
+        reason (str): Interview details, slots-not-found message or rejection reason
+        candidate_name (str): Name used in the greeting
+        signature (str): Sign-off, e.g. the tenant's talent team
+
     Returns:
-        str: Extracted candidate name or "Dear Candidate"
+        str: Complete email content with subject and body
     """
-    try:
-        client = get_openai_client()
-        
-        # Define function schema for name extraction
-        functions = [
-            {
-                "name": "extract_name",
-                "description": "Extract the candidate's name from the profile",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "candidate_name": {
-                            "type": "string",
-                            "description": "The candidate's full name if found, empty string if not found"
-                        }
-                    },
-                    "required": ["candidate_name"]
-                }
-            }
-        ]
-        
-        system_prompt = """You are a name extraction assistant. 
-        Extract the candidate's full name from the profile text.
-        Look for patterns like:
-        - "John Smith, Computer Science graduate..."
-        - "Name: Jane Doe"
-        - "I am Alex Johnson..."
-        - "My name is Sarah Wilson..."
-        
-        Return the full name (first and last name) if found, otherwise return empty string.
-        Do not include titles like Mr., Ms., Dr., etc."""
-        
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Extract the candidate's name from this profile:\n\n{profile_text}"}
-            ],
-            functions=functions,
-            function_call={"name": "extract_name"}
+    if verdict == "select":
+        subject = "Next steps in your application"
+        body = (
+            "Congratulations! We were impressed by your profile and would like to move you forward "
+            "to the interview stage.\n\n"
+            f"{reason}\n\n"
+            "Please reply to this email if you have any questions about the process."
         )
-        
-        # Extract function call result
-        function_call = response.choices[0].message.function_call
-        if function_call and function_call.name == "extract_name":
-            arguments = json.loads(function_call.arguments)
-            name = arguments.get("candidate_name", "").strip()
-            return name if name else "Dear Candidate"
-        else:
-            return "Dear Candidate"
-            
-    except Exception as e:
-        print(f"Error extracting name: {e}")
-        return "Dear Candidate"
+    else:
+        subject = "Update on your application"
+        body = (
+            "Thank you for your interest and for the time you invested in your application. "
+            "After careful review, we will not be moving forward with your application at this time.\n\n"
+            f"Feedback: {reason}\n\n"
+            "We encourage you to apply for future openings that match your experience."
+        )
+    return f"Subject: {subject}\n\nDear {candidate_name},\n\n{body}\n\nBest regards,\n{signature}"
 
 
-def generate_email(verdict, reason, user_profile):
+def generate_email(verdict, reason, candidate_name, signature="HR Team"):
     """
-    Generate a professional email based on verdict, reason, and user profile.
+    Generate a professional email based on verdict, reason, and candidate name.
     
     Args:
         verdict (str): "select" or "reject"
         reason (str): Reason for selection or rejection
-        user_profile (str): User profile to extract name and personalize
+        candidate_name (str): Name to personalize with, from the profile's features
+        signature (str): Sign-off, e.g. the tenant's talent team
         
     Returns:
         str: Complete email content with subject and body
     """
-    client = get_openai_client()
-    
-    # Extract candidate name
-    candidate_name = extract_candidate_name(user_profile)
     # Define function schema for LLM response
     functions = [
         {
@@ -152,12 +122,13 @@ Dear [Candidate Name],
 [Professional email body]
 
 Best regards,
-[HR Team]
+[{signature}]
 
 Return your response using the generate_email function call."""
 
     try:
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            "emailer",
             model="gpt-4",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -192,6 +163,8 @@ Return your response using the generate_email function call."""
         else:
             return "Error: Unable to generate email"
             
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         return f"Error generating email: {str(e)}"
 
@@ -201,8 +174,8 @@ def main():
     print("Email Generator Test")
     print("=" * 50)
     
-    # Sample user profile
-    sample_profile = "John Smith, Computer Science graduate from 2023. 2 years experience in Python, React, and AWS."
+    # Name extracted from the sample profile by profile_features
+    candidate_name = "John Smith"
     
     # Test scenarios
     test_cases = [
@@ -229,7 +202,7 @@ def main():
         email = generate_email(
             test_case["verdict"], 
             test_case["reason"], 
-            sample_profile
+            candidate_name
         )
         print(email)
         print("\n" + "="*60)
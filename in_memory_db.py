@@ -1,10 +1,17 @@
+import contextvars
+import csv
+import os
 import random
+import sqlite3
+import threading
+import time as _time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
 # Interview types
 INTERVIEW_TYPES = [
     "DSA",
-    "Low-level design", 
+    "Low-level design",
     "High-level design",
     "Communication",
     "Case study"
@@ -13,7 +20,7 @@ INTERVIEW_TYPES = [
 # Time slots (1-hour slots from 9 AM to 5 PM)
 TIME_SLOTS = [
     "9:00 AM - 10:00 AM",
-    "10:00 AM - 11:00 AM", 
+    "10:00 AM - 11:00 AM",
     "11:00 AM - 12:00 PM",
     "12:00 PM - 1:00 PM",
     "1:00 PM - 2:00 PM",
@@ -22,98 +29,863 @@ TIME_SLOTS = [
     "4:00 PM - 5:00 PM"
 ]
 
+# Position of each time slot within the day. Slot labels do not sort
+# correctly as strings ("10:00 AM" < "9:00 AM"), so ordering uses this.
+TIME_SLOT_ORDER = {time_slot: i for i, time_slot in enumerate(TIME_SLOTS)}
+
+# The slot database lives next to this module unless overridden.
+DEFAULT_DB_PATH = os.getenv(
+    "INTERVIEW_SLOTS_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "interview_slots.db"),
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    slot_id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    time_order INTEGER NOT NULL,
+    interview_type TEXT NOT NULL,
+    booked INTEGER NOT NULL DEFAULT 0,
+    external_id TEXT UNIQUE,
+    interviewer_id INTEGER REFERENCES interviewers (interviewer_id)
+);
+CREATE INDEX IF NOT EXISTS idx_slots_type_date
+    ON slots (booked, interview_type, date, time_order);
+CREATE INDEX IF NOT EXISTS idx_slots_date
+    ON slots (booked, date, time_order);
+CREATE TABLE IF NOT EXISTS interviewers (
+    interviewer_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    max_per_day INTEGER
+);
+CREATE TABLE IF NOT EXISTS interviewer_skills (
+    interviewer_id INTEGER NOT NULL REFERENCES interviewers (interviewer_id),
+    interview_type TEXT NOT NULL,
+    PRIMARY KEY (interviewer_id, interview_type)
+);
+CREATE TABLE IF NOT EXISTS holds (
+    hold_id TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_holds_expiry ON holds (expires_at);
+CREATE TABLE IF NOT EXISTS held_slots (
+    slot_id INTEGER PRIMARY KEY REFERENCES slots (slot_id),
+    hold_id TEXT NOT NULL REFERENCES holds (hold_id),
+    requested INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_held_slots_hold ON held_slots (hold_id);
+CREATE TABLE IF NOT EXISTS store_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO store_version (id, version) VALUES (1, 0);
+"""
+
+# Created after the interviewer_id column is migrated onto older databases
+_INTERVIEWER_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_slots_interviewer
+    ON slots (interviewer_id, date, time_order);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_slots_interviewer_booked
+    ON slots (interviewer_id, date, time_order) WHERE booked = 1;
+"""
+
+# Values of slots.booked
+FREE, BOOKED, BLOCKED, HELD = 0, 1, 2, 3
+
+_SLOT_COLUMNS = "slot_id, date, time, interview_type, interviewer_id"
+_SLOT_ORDER = "ORDER BY date, time_order, slot_id"
+
+
 def generate_interview_slots(num_slots=30):
     """
     Generate random interview slots starting from October 5th, 2025.
-    
+
     Args:
         num_slots (int): Number of slots to generate (default: 30)
-        
+
     Returns:
         list: List of interview slot dictionaries
     """
     slots = []
     start_date = datetime(2025, 10, 5)  # October 5th, 2025
-    
+
     for i in range(num_slots):
         # Random date from October 5th onwards (up to 60 days ahead)
         random_days = random.randint(0, 60)
         slot_date = start_date + timedelta(days=random_days)
-        
+
         # Random time slot and interview type
         time_slot = random.choice(TIME_SLOTS)
         interview_type = random.choice(INTERVIEW_TYPES)
-        
+
         slot = {
             "date": slot_date.strftime("%Y-%m-%d"),
             "time": time_slot,
             "interview_type": interview_type
         }
-        
+
         slots.append(slot)
-    
+
     # Sort slots by date and time for better organization
-    slots.sort(key=lambda x: (x["date"], x["time"]))
-    
+    slots.sort(key=lambda x: (x["date"], TIME_SLOT_ORDER[x["time"]]))
+
     return slots
 
-# Generate the interview slots database
-interview_slots = generate_interview_slots(30)
+
+def _row_to_slot(row):
+    return {
+        "slot_id": row[0],
+        "date": row[1],
+        "time": row[2],
+        "interview_type": row[3],
+        "interviewer_id": row[4],
+    }
+
+
+def _validate_slot(date, time, interview_type):
+    """Validate slot fields and return the time order for the slot."""
+    datetime.strptime(date, "%Y-%m-%d")
+    if time not in TIME_SLOT_ORDER:
+        raise ValueError(f"Unknown time slot: {time!r}")
+    if interview_type not in INTERVIEW_TYPES:
+        raise ValueError(f"Unknown interview type: {interview_type!r}")
+    return TIME_SLOT_ORDER[time]
+
+
+class SlotStore:
+    """
+    Durable interview slot store backed by SQLite.
+
+    Slots are indexed by (interview_type, date, time) and by (date, time), so
+    type and range lookups are served from the index instead of scanning
+    every slot. Booked slots are kept (flagged) rather than deleted.
+
+    Slots may belong to an interviewer, who has skills (the interview types
+    they can run) and an optional daily load limit. An interviewer free at
+    an hour offers one slot per skill; booking one blocks the others, so an
+    interviewer is never booked twice at the same hour, and reaching the
+    daily limit blocks the rest of their day. Slots can also be held
+    tentatively for a while (hold_slots) and then booked (confirm_hold) or
+    freed (release_hold, or expiry). Free capacity per (date, hour, type) is
+    kept in memory for constant-time lookups. Listeners registered with
+    subscribe() hear which interview types gained free slots (added slots,
+    released or expired holds), e.g. to wake a waitlist.
+    Each thread gets its own connection; the database runs in WAL mode so
+    readers do not block the writer.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        if db_path == ":memory:":
+            # Shared-cache memory DB so every thread sees the same slots
+            self._uri = f"file:slotstore_{id(self)}?mode=memory&cache=shared"
+        else:
+            self._uri = f"file:{os.path.abspath(db_path)}"
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        # Keep one connection open so a memory DB outlives idle threads
+        self._keepalive = self._connect()
+        self._keepalive.executescript(_SCHEMA)
+        columns = {row[1] for row in self._keepalive.execute("PRAGMA table_info(slots)")}
+        if "interviewer_id" not in columns:
+            self._keepalive.execute("ALTER TABLE slots ADD COLUMN interviewer_id INTEGER")
+        self._keepalive.executescript(_INTERVIEWER_INDEXES)
+        # (version, {(date, time_order, interview_type or None): free interviewers})
+        self._capacity = None
+        self._listeners = []
+
+    def _connect(self):
+        conn = sqlite3.connect(self._uri, uri=True, timeout=30, check_same_thread=False)
+        if self.db_path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    @property
+    def version(self):
+        """
+        Change counter of the slots, kept in the database.
+
+        Every write bumps it in its own transaction, so derived views
+        (availability grids, capacity counts) cached on it are invalidated
+        by writes from any store instance or process sharing the file.
+        """
+        return self.conn.execute("SELECT version FROM store_version").fetchone()[0]
+
+    def _bump_version(self):
+        """Bump the version inside the current write transaction. Returns the new version."""
+        self.conn.execute("UPDATE store_version SET version = version + 1")
+        return self.conn.execute("SELECT version FROM store_version").fetchone()[0]
+
+    def count(self, include_booked=False):
+        """Return the number of (available) slots."""
+        sql = "SELECT COUNT(*) FROM slots"
+        if not include_booked:
+            sql += " WHERE booked = 0"
+        return self.conn.execute(sql).fetchone()[0]
+
+    def iter_slots(self, interview_type=None, start_date=None, end_date=None, batch_size=500):
+        """
+        Lazily yield available slots matching the given filters, in date/time order.
+
+        Rows are fetched from the cursor in batches so large calendars are
+        never fully materialised.
+
+        Args:
+            interview_type (str): Only yield slots of this type (optional)
+            start_date (str): Inclusive lower bound, YYYY-MM-DD (optional)
+            end_date (str): Inclusive upper bound, YYYY-MM-DD (optional)
+            batch_size (int): Rows fetched from SQLite per round trip
+
+        Yields:
+            dict: Slot with 'slot_id', 'date', 'time' and 'interview_type'
+        """
+        clauses = ["booked = 0"]
+        params = []
+        if interview_type is not None:
+            clauses.append("interview_type = ?")
+            params.append(interview_type)
+        if start_date is not None:
+            clauses.append("date >= ?")
+            params.append(start_date)
+        if end_date is not None:
+            clauses.append("date <= ?")
+            params.append(end_date)
+        sql = f"SELECT {_SLOT_COLUMNS} FROM slots WHERE {' AND '.join(clauses)} {_SLOT_ORDER}"
+        cursor = self.conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield _row_to_slot(row)
+
+    def get_available_slots(self):
+        return list(self.iter_slots())
+
+    def get_slots_by_type(self, interview_type):
+        return list(self.iter_slots(interview_type=interview_type))
+
+    def get_slots_by_date(self, date):
+        return list(self.iter_slots(start_date=date, end_date=date))
+
+    def get_slots_by_date_range(self, start_date, end_date):
+        # Validate the bounds the same way the list-based store did
+        datetime.strptime(start_date, "%Y-%m-%d")
+        datetime.strptime(end_date, "%Y-%m-%d")
+        return list(self.iter_slots(start_date=start_date, end_date=end_date))
+
+    def availability_counts(self, start_date=None, end_date=None):
+        """
+        Count available slots per (interview_type, date, time_order) cell.
+
+        Aggregated in SQLite from the type/date index, so building an
+        availability grid never materialises individual slots.
+
+        Returns:
+            list: (interview_type, date, time_order, count) tuples
+        """
+        clauses = ["booked = 0"]
+        params = []
+        if start_date is not None:
+            clauses.append("date >= ?")
+            params.append(start_date)
+        if end_date is not None:
+            clauses.append("date <= ?")
+            params.append(end_date)
+        return self.conn.execute(
+            "SELECT interview_type, date, time_order, COUNT(*) FROM slots "
+            f"WHERE {' AND '.join(clauses)} GROUP BY interview_type, date, time_order",
+            params,
+        ).fetchall()
+
+    def find_slot(self, interview_type, date, time):
+        """
+        Return an available slot of a type at a date and time, or None.
+
+        Among interviewers free then, the one with the fewest bookings that
+        day is preferred.
+        """
+        slots = self.candidate_slots(interview_type, date, time)
+        return slots[0] if slots else None
+
+    def candidate_slots(self, interview_type, date, time):
+        """Every available slot of a type at a date and time, least-booked interviewer first."""
+        rows = self.conn.execute(
+            f"SELECT {_SLOT_COLUMNS} FROM slots s WHERE booked = 0 AND interview_type = ? "
+            "AND date = ? AND time_order = ? "
+            "ORDER BY (SELECT COUNT(*) FROM slots b WHERE b.booked = 1 "
+            "AND b.interviewer_id = s.interviewer_id AND b.date = s.date), slot_id",
+            (interview_type, date, TIME_SLOT_ORDER[time]),
+        ).fetchall()
+        return [_row_to_slot(row) for row in rows]
+
+    def _capacity_cells(self):
+        capacity = self._capacity
+        if capacity is not None and capacity[0] == self.version:
+            return capacity[1]
+        with self._write_lock:
+            version = self.version
+            cells = {}
+            # Anonymous slots count as one interviewer each
+            free = "COUNT(DISTINCT COALESCE(interviewer_id, -slot_id))"
+            for date, time_order, interview_type, count in self.conn.execute(
+                f"SELECT date, time_order, interview_type, {free} FROM slots "
+                "WHERE booked = 0 GROUP BY date, time_order, interview_type"
+            ):
+                cells[(date, time_order, interview_type)] = count
+            for date, time_order, count in self.conn.execute(
+                f"SELECT date, time_order, {free} FROM slots WHERE booked = 0 GROUP BY date, time_order"
+            ):
+                cells[(date, time_order, None)] = count
+            self._capacity = (version, cells)
+        return cells
+
+    def capacity(self, date, time, interview_type=None):
+        """
+        Number of interviews that can run in parallel at a date and hour.
+
+        Args:
+            date (str): YYYY-MM-DD
+            time (str): One of TIME_SLOTS
+            interview_type (str): Only count interviewers who can run this type (optional)
+
+        Returns:
+            int: Free interviewers at that hour
+        """
+        return self._capacity_cells().get((date, TIME_SLOT_ORDER[time], interview_type), 0)
+
+    def _block(self, interviewer_id, where, params):
+        """Block an interviewer's free slots matching where. Returns the blocked cells."""
+        cells = self.conn.execute(
+            "SELECT date, time_order, interview_type FROM slots "
+            f"WHERE booked = 0 AND interviewer_id = ? AND {where}",
+            (interviewer_id,) + params,
+        ).fetchall()
+        self.conn.execute(
+            f"UPDATE slots SET booked = {BLOCKED} WHERE booked = 0 AND interviewer_id = ? AND {where}",
+            (interviewer_id,) + params,
+        )
+        return cells
+
+    def _take_capacity(self, new_version, interviewer_id, cells):
+        """Update the capacity counts for cells that just stopped being free."""
+        capacity = self._capacity
+        if capacity is None or capacity[0] != new_version - 1:
+            # Stale (another writer got in between): rebuild on next use
+            self._capacity = None
+            return
+        counts = capacity[1]
+        for date, time_order, interview_type in cells:
+            counts[(date, time_order, interview_type)] -= 1
+        hours = {(date, time_order) for date, time_order, _ in cells}
+        for date, time_order in hours if interviewer_id is not None else [cells[0][:2]]:
+            counts[(date, time_order, None)] -= 1
+        self._capacity = (new_version, counts)
+
+    def book_slot_by_id(self, slot_id):
+        """
+        Atomically book a slot by id. Returns the slot, or None if unavailable.
+
+        The interviewer's other slots at that hour are blocked, and so is the
+        rest of their day once they reach max_per_day bookings.
+        """
+        with self._write_lock, self.conn:
+            updated = self.conn.execute(
+                f"UPDATE slots SET booked = {BOOKED} WHERE slot_id = ? AND booked = 0", (slot_id,)
+            ).rowcount
+            if not updated:
+                return None
+            row = self.conn.execute(
+                f"SELECT {_SLOT_COLUMNS}, time_order FROM slots WHERE slot_id = ?", (slot_id,)
+            ).fetchone()
+            slot = _row_to_slot(row)
+            date, time_order = slot["date"], row[-1]
+            taken = [(date, time_order, slot["interview_type"])]
+            interviewer_id = slot["interviewer_id"]
+            if interviewer_id is not None:
+                taken += self._block(interviewer_id, "date = ? AND time_order = ?", (date, time_order))
+                limit = self.conn.execute(
+                    "SELECT max_per_day FROM interviewers WHERE interviewer_id = ?", (interviewer_id,)
+                ).fetchone()
+                if limit and limit[0] is not None and self._load(interviewer_id, date) >= limit[0]:
+                    taken += self._block(interviewer_id, "date = ?", (date,))
+            self._take_capacity(self._bump_version(), interviewer_id, taken)
+        return slot
+
+    def book_least_loaded(self, interview_type, date, time):
+        """Book the least loaded interviewer free for a type at a date and hour. Returns the slot or None."""
+        while True:
+            slot = self.find_slot(interview_type, date, time)
+            if slot is None:
+                return None
+            booked = self.book_slot_by_id(slot["slot_id"])
+            if booked is not None:
+                return booked
+
+    def book_slot(self, slot_index):
+        """Book the slot at position slot_index of get_available_slots()."""
+        if slot_index < 0:
+            return None
+        row = self.conn.execute(
+            f"SELECT slot_id FROM slots WHERE booked = 0 {_SLOT_ORDER} LIMIT 1 OFFSET ?",
+            (slot_index,),
+        ).fetchone()
+        if row is None:
+            return None
+        return self.book_slot_by_id(row[0])
+
+    def subscribe(self, listener):
+        """
+        Call listener(store, interview_types) whenever slots become free.
+
+        interview_types is the set of types that gained free slots. Listeners
+        run in the writing thread once the write is committed, so they may
+        read or book from the store.
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _publish(self, interview_types):
+        if not interview_types:
+            return
+        interview_types = frozenset(interview_types)
+        for listener in list(self._listeners):
+            listener(self, interview_types)
+
+    def _release(self, hold_id):
+        """
+        Free the slots of a hold and drop it. Call inside a write transaction.
+
+        Returns:
+            tuple: (whether the hold existed, interview types of the freed slots)
+        """
+        freed = {row[0] for row in self.conn.execute(
+            f"SELECT DISTINCT interview_type FROM slots WHERE booked = {HELD} "
+            "AND slot_id IN (SELECT slot_id FROM held_slots WHERE hold_id = ?)",
+            (hold_id,),
+        )}
+        self.conn.execute(
+            f"UPDATE slots SET booked = {FREE} WHERE booked = {HELD} "
+            "AND slot_id IN (SELECT slot_id FROM held_slots WHERE hold_id = ?)",
+            (hold_id,),
+        )
+        self.conn.execute("DELETE FROM held_slots WHERE hold_id = ?", (hold_id,))
+        existed = self.conn.execute("DELETE FROM holds WHERE hold_id = ?", (hold_id,)).rowcount
+        return bool(existed), freed
+
+    def _changed(self):
+        """Record a write. Call inside the write transaction."""
+        self._bump_version()
+        self._capacity = None
+
+    def hold_slots(self, hold_id, slot_ids, ttl):
+        """
+        Tentatively hold a bundle of slots for ttl seconds, all or nothing.
+
+        Held slots are unavailable to everyone else, as are their
+        interviewers' other slots at the same hours. A previous hold with the
+        same id is replaced.
+
+        Args:
+            hold_id (str): Key of the hold, e.g. the application id
+            slot_ids (list): Slots to hold
+            ttl (float): Seconds until the hold is released automatically
+
+        Returns:
+            list: The held slots, or None if any of them is no longer free or
+                  an interviewer would go past max_per_day
+        """
+        with self._write_lock:
+            try:
+                with self.conn:
+                    self._release(hold_id)
+                    self.conn.execute(
+                        "INSERT INTO holds (hold_id, expires_at) VALUES (?, ?)", (hold_id, _time.time() + ttl)
+                    )
+                    slots = []
+                    for slot_id in slot_ids:
+                        if not self.conn.execute(
+                            f"UPDATE slots SET booked = {HELD} WHERE slot_id = ? AND booked = {FREE}", (slot_id,)
+                        ).rowcount:
+                            raise LookupError(slot_id)
+                        self.conn.execute(
+                            "INSERT INTO held_slots (slot_id, hold_id, requested) VALUES (?, ?, 1)", (slot_id, hold_id)
+                        )
+                        row = self.conn.execute(
+                            f"SELECT {_SLOT_COLUMNS}, time_order FROM slots WHERE slot_id = ?", (slot_id,)
+                        ).fetchone()
+                        slots.append(_row_to_slot(row))
+                        if row[4] is not None:
+                            sibling_where = f"booked = {FREE} AND interviewer_id = ? AND date = ? AND time_order = ?"
+                            self.conn.execute(
+                                "INSERT INTO held_slots (slot_id, hold_id, requested) "
+                                f"SELECT slot_id, ?, 0 FROM slots WHERE {sibling_where}",
+                                (hold_id, row[4], row[1], row[5]),
+                            )
+                            self.conn.execute(
+                                f"UPDATE slots SET booked = {HELD} WHERE {sibling_where}", (row[4], row[1], row[5])
+                            )
+                    # The bundle must not take an interviewer past their daily limit
+                    for interviewer_id, date in {(s["interviewer_id"], s["date"]) for s in slots if s["interviewer_id"]}:
+                        limit = self.conn.execute(
+                            "SELECT max_per_day FROM interviewers WHERE interviewer_id = ?", (interviewer_id,)
+                        ).fetchone()
+                        if limit and limit[0] is not None and self._committed(interviewer_id, date) > limit[0]:
+                            raise LookupError(interviewer_id)
+                    self._changed()
+            except LookupError:
+                # Rolled back: some slot was taken meanwhile
+                return None
+        return slots
+
+    def confirm_hold(self, hold_id):
+        """
+        Book the slots of a hold.
+
+        The interviewers' other slots at those hours are blocked, and so is
+        the rest of their day once they reach max_per_day bookings.
+
+        Returns:
+            list: The booked slots, or None if the hold expired or does not exist
+        """
+        with self._write_lock, self.conn:
+            row = self.conn.execute("SELECT expires_at FROM holds WHERE hold_id = ?", (hold_id,)).fetchone()
+            if row is None:
+                return None
+            expired = row[0] < _time.time()
+            if expired:
+                _, freed = self._release(hold_id)
+            else:
+                held = "SELECT slot_id FROM held_slots WHERE hold_id = ? AND requested = ?"
+                self.conn.execute(f"UPDATE slots SET booked = {BOOKED} WHERE slot_id IN ({held})", (hold_id, 1))
+                self.conn.execute(f"UPDATE slots SET booked = {BLOCKED} WHERE slot_id IN ({held})", (hold_id, 0))
+                slots = [
+                    _row_to_slot(r) for r in self.conn.execute(
+                        f"SELECT {_SLOT_COLUMNS} FROM slots WHERE slot_id IN ({held}) {_SLOT_ORDER}", (hold_id, 1)
+                    )
+                ]
+                self.conn.execute("DELETE FROM held_slots WHERE hold_id = ?", (hold_id,))
+                self.conn.execute("DELETE FROM holds WHERE hold_id = ?", (hold_id,))
+                for interviewer_id, date in {(s["interviewer_id"], s["date"]) for s in slots if s["interviewer_id"]}:
+                    limit = self.conn.execute(
+                        "SELECT max_per_day FROM interviewers WHERE interviewer_id = ?", (interviewer_id,)
+                    ).fetchone()
+                    if limit and limit[0] is not None and self._load(interviewer_id, date) >= limit[0]:
+                        self._block(interviewer_id, "date = ?", (date,))
+            self._changed()
+        if expired:
+            self._publish(freed)
+            return None
+        return slots
+
+    def release_hold(self, hold_id):
+        """Release a hold, freeing its slots. Returns True if it existed."""
+        with self._write_lock, self.conn:
+            released, freed = self._release(hold_id)
+            if released:
+                self._changed()
+        self._publish(freed)
+        return released
+
+    def release_expired_holds(self):
+        """Release every hold past its expiry. Returns the number released."""
+        with self._write_lock, self.conn:
+            expired = [row[0] for row in self.conn.execute(
+                "SELECT hold_id FROM holds WHERE expires_at < ?", (_time.time(),)
+            )]
+            freed = set()
+            for hold_id in expired:
+                freed |= self._release(hold_id)[1]
+            if expired:
+                self._changed()
+        self._publish(freed)
+        return len(expired)
+
+    def add_slot(self, date, time, interview_type, external_id=None, interviewer_id=None):
+        """Add a new slot to the database and return it."""
+        time_order = _validate_slot(date, time, interview_type)
+        if interviewer_id is not None and interview_type not in self.get_interviewer(interviewer_id)["skills"]:
+            raise ValueError(f"Interviewer {interviewer_id} cannot run {interview_type!r} interviews")
+        with self._write_lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO slots (date, time, time_order, interview_type, external_id, interviewer_id) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (date, time, time_order, interview_type, external_id, interviewer_id),
+            )
+            self._changed()
+        self._publish({interview_type})
+        return {
+            "slot_id": cursor.lastrowid,
+            "date": date,
+            "time": time,
+            "interview_type": interview_type,
+            "interviewer_id": interviewer_id,
+        }
+
+    def add_interviewer(self, name, skills, max_per_day=None):
+        """
+        Register an interviewer.
+
+        Args:
+            name (str): Unique interviewer name
+            skills (list): Interview types they can run, from INTERVIEW_TYPES
+            max_per_day (int): Most interviews they take per day (optional)
+
+        Returns:
+            int: The interviewer id
+        """
+        unknown = set(skills) - set(INTERVIEW_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown interview types: {sorted(unknown)}")
+        with self._write_lock, self.conn:
+            try:
+                interviewer_id = self.conn.execute(
+                    "INSERT INTO interviewers (name, max_per_day) VALUES (?, ?)", (name, max_per_day)
+                ).lastrowid
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Interviewer {name!r} already exists")
+            self.conn.executemany(
+                "INSERT INTO interviewer_skills (interviewer_id, interview_type) VALUES (?, ?)",
+                [(interviewer_id, skill) for skill in skills],
+            )
+        return interviewer_id
+
+    def get_interviewer(self, interviewer_id):
+        """Return an interviewer as a dict with 'skills' and 'max_per_day'."""
+        row = self.conn.execute(
+            "SELECT interviewer_id, name, max_per_day FROM interviewers WHERE interviewer_id = ?",
+            (interviewer_id,),
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown interviewer: {interviewer_id}")
+        skills = [r[0] for r in self.conn.execute(
+            "SELECT interview_type FROM interviewer_skills WHERE interviewer_id = ?", (interviewer_id,)
+        )]
+        return {"interviewer_id": row[0], "name": row[1], "skills": skills, "max_per_day": row[2]}
+
+    def list_interviewers(self):
+        ids = [row[0] for row in self.conn.execute("SELECT interviewer_id FROM interviewers ORDER BY interviewer_id")]
+        return [self.get_interviewer(interviewer_id) for interviewer_id in ids]
+
+    def _load(self, interviewer_id, date):
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM slots WHERE booked = 1 AND interviewer_id = ? AND date = ?",
+            (interviewer_id, date),
+        ).fetchone()[0]
+
+    def interviewer_load(self, interviewer_id, date):
+        """Number of interviews booked with an interviewer on a date."""
+        return self._load(interviewer_id, date)
+
+    def _committed(self, interviewer_id, date):
+        """Interviews booked or tentatively held with an interviewer on a date."""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM slots WHERE interviewer_id = ? AND date = ? AND (booked = 1 "
+            "OR slot_id IN (SELECT slot_id FROM held_slots WHERE requested = 1))",
+            (interviewer_id, date),
+        ).fetchone()[0]
+
+    def remaining_capacity(self, interviewer_id, date):
+        """Interviews an interviewer can still take on a date (counting holds), or None if unlimited."""
+        row = self.conn.execute(
+            "SELECT max_per_day FROM interviewers WHERE interviewer_id = ?", (interviewer_id,)
+        ).fetchone()
+        if not row or row[0] is None:
+            return None
+        return max(row[0] - self._committed(interviewer_id, date), 0)
+
+    def add_availability(self, interviewer_id, date, time, interview_types=None):
+        """
+        Mark an interviewer free at a date and hour.
+
+        One slot is added per interview type they can run (or per type in
+        interview_types); booking any of them takes the whole hour.
+
+        Returns:
+            list: The added slots
+        """
+        skills = self.get_interviewer(interviewer_id)["skills"]
+        return [
+            self.add_slot(date, time, interview_type, interviewer_id=interviewer_id)
+            for interview_type in (interview_types or skills)
+        ]
+
+    def import_slots(self, slots, chunk_size=5000):
+        """
+        Bulk import slots, e.g. from interviewer calendars.
+
+        Slots carrying an 'external_id' (calendar event id) are imported at
+        most once, so re-importing the same calendar export is safe.
+
+        Args:
+            slots (iterable): Dicts with 'date', 'time', 'interview_type'
+                and optionally 'external_id' and 'interviewer_id'
+            chunk_size (int): Rows written per transaction
+
+        Returns:
+            int: Number of slots inserted
+        """
+        inserted = 0
+        chunk = []
+
+        def flush():
+            nonlocal inserted
+            with self._write_lock, self.conn:
+                before = self.conn.total_changes
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO slots "
+                    "(date, time, time_order, interview_type, external_id, interviewer_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    chunk,
+                )
+                added = self.conn.total_changes - before
+                inserted += added
+                if added:
+                    self._changed()
+            if added:
+                self._publish({row[3] for row in chunk})
+            chunk.clear()
+
+        for slot in slots:
+            time_order = _validate_slot(slot["date"], slot["time"], slot["interview_type"])
+            chunk.append((
+                slot["date"],
+                slot["time"],
+                time_order,
+                slot["interview_type"],
+                slot.get("external_id") or None,
+                int(slot["interviewer_id"]) if slot.get("interviewer_id") else None,
+            ))
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+        return inserted
+
+    def import_calendar_csv(self, path):
+        """
+        Bulk import a calendar export in CSV format.
+
+        The file needs 'date', 'time' and 'interview_type' columns and may
+        have 'external_id' and 'interviewer_id' columns.
+
+        Returns:
+            int: Number of slots inserted
+        """
+        with open(path, newline="", encoding="utf-8") as f:
+            return self.import_slots(csv.DictReader(f))
+
+    def seed_random(self, num_slots=30):
+        """Fill an empty store with random demo slots. Returns slots inserted."""
+        if self.count(include_booked=True):
+            return 0
+        return self.import_slots(generate_interview_slots(num_slots))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+# Store returned by get_slot_store() inside use_slot_store(), e.g. a tenant's
+_scoped_store = contextvars.ContextVar("slot_store", default=None)
+
+
+def get_slot_store():
+    """Return the slot store in use: the one set by use_slot_store(), else the process-wide one."""
+    scoped = _scoped_store.get()
+    if scoped is not None:
+        return scoped
+    return get_default_slot_store()
+
+
+@contextmanager
+def use_slot_store(store):
+    """Make get_slot_store() return another store inside the block."""
+    token = _scoped_store.set(store)
+    try:
+        yield store
+    finally:
+        _scoped_store.reset(token)
+
+
+def get_default_slot_store():
+    """Return the process-wide slot store, seeding demo slots on first creation."""
+    global _store
+    if _store is not None:
+        return _store
+    with _store_lock:
+        if _store is None:
+            store = SlotStore(DEFAULT_DB_PATH)
+            if os.getenv("INTERVIEW_SLOTS_SEED", "1") != "0":
+                store.seed_random(30)
+            _store = store
+    return _store
+
 
 def get_available_slots():
     """Get all available interview slots."""
-    return interview_slots
+    return get_slot_store().get_available_slots()
 
 def get_slots_by_type(interview_type):
     """Get slots filtered by interview type."""
-    return [slot for slot in interview_slots if slot["interview_type"] == interview_type]
+    return get_slot_store().get_slots_by_type(interview_type)
 
 def get_slots_by_date(date):
     """Get slots filtered by specific date."""
-    return [slot for slot in interview_slots if slot["date"] == date]
+    return get_slot_store().get_slots_by_date(date)
 
 def get_slots_by_date_range(start_date, end_date):
     """Get slots within a date range."""
-    start = datetime.strptime(start_date, "%Y-%m-%d")
-    end = datetime.strptime(end_date, "%Y-%m-%d")
-    
-    return [
-        slot for slot in interview_slots 
-        if start <= datetime.strptime(slot["date"], "%Y-%m-%d") <= end
-    ]
+    return get_slot_store().get_slots_by_date_range(start_date, end_date)
 
 def book_slot(slot_index):
-    """Book a slot by removing it from available slots."""
-    if 0 <= slot_index < len(interview_slots):
-        booked_slot = interview_slots.pop(slot_index)
-        return booked_slot
-    return None
+    """Book a slot by its position in the available slots list."""
+    return get_slot_store().book_slot(slot_index)
 
 def add_slot(date, time, interview_type):
     """Add a new slot to the database."""
-    new_slot = {
-        "date": date,
-        "time": time,
-        "interview_type": interview_type
-    }
-    interview_slots.append(new_slot)
-    # Re-sort after adding
-    interview_slots.sort(key=lambda x: (x["date"], x["time"]))
+    return get_slot_store().add_slot(date, time, interview_type)
+
+def import_calendar_csv(path):
+    """Bulk import interviewer calendar slots from a CSV file."""
+    return get_slot_store().import_calendar_csv(path)
 
 def main():
-    """Display the generated interview slots."""
-    print("Generated Interview Slots:")
+    """Display the stored interview slots."""
+    slots = get_available_slots()
+    print("Available Interview Slots:")
     print("=" * 60)
-    print(f"Total slots: {len(interview_slots)}")
+    print(f"Database: {DEFAULT_DB_PATH}")
+    print(f"Total slots: {len(slots)}")
     print()
-    
-    for i, slot in enumerate(interview_slots, 1):
+
+    for i, slot in enumerate(slots, 1):
         print(f"{i:2d}. {slot['date']} | {slot['time']:20s} | {slot['interview_type']}")
-    
+
     print("\nSlots by type:")
     for interview_type in INTERVIEW_TYPES:
         count = len(get_slots_by_type(interview_type))
         print(f"  {interview_type}: {count} slots")
 
+    interviewers = get_slot_store().list_interviewers()
+    if interviewers:
+        print("\nInterviewers:")
+        for interviewer in interviewers:
+            limit = interviewer["max_per_day"] or "no limit"
+            print(f"  {interviewer['name']}: {', '.join(interviewer['skills'])} ({limit} per day)")
+
 if __name__ == "__main__":
     main()
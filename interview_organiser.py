@@ -1,75 +1,240 @@
-from in_memory_db import get_available_slots, get_slots_by_type
-import os
+from in_memory_db import TIME_SLOTS, get_slot_store
 import json
-from openai import OpenAI
-from dotenv import load_dotenv
+import os
+import threading
+import uuid
+
+from availability import get_availability
+
+from llm_circuit import LLMUnavailableError
+from llm_client import create_chat_completion
+
+# Interview rounds each interview type needs, one slot per round
+REQUIRED_TYPES = {
+    "tech": ["DSA", "Low-level design", "High-level design"],
+    "sales": ["Communication", "Case study"],
+}
+
+SLOTS_NOT_FOUND_MESSAGE = "Our interviewers are busy right now and they will try to schedule your interview as soon as possible."
+
+# Environment switches for tentative holds placed while screening runs
+#   SLOT_HOLDS              "0" to turn holds off (default on)
+#   SLOT_HOLD_TTL_SECONDS   how long a hold lasts before it is released (default 600)
+HOLD_ATTEMPTS = 3
+# Seconds a bundle stays held between picking and booking it
+BOOKING_HOLD_SECONDS = 30
+
+_hold_stats = {"placed": 0, "failed": 0, "confirmed": 0, "expired": 0, "released": 0}
+_hold_stats_lock = threading.Lock()
+
+
+def select_slots_locally(interview_type):
+    """
+    Pick slots for an interview without the LLM.
+
+    Prefers the earliest day that has every required round at distinct times;
+    otherwise takes the earliest slot of each round. Interviewers are spread
+    over the rounds so no one goes past their daily limit where possible.
+
+    Args:
+        interview_type (str): Either "tech" or "sales"
+
+    Returns:
+        list: One slot per required round (None for a round with no free
+              slot at the picked time), or None if a round has no slots
+    """
+    required_types = REQUIRED_TYPES[interview_type]
+    store = get_slot_store()
+    grid = get_availability(store)
+    if not all(grid.has_any(t) for t in required_types):
+        return None
+
+    day = grid.earliest_feasible_day(required_types)
+    if day is not None:
+        cells = [(day, hour) for hour in grid.pick_hours(required_types, day)]
+    else:
+        cells = [grid.earliest_cell(t) for t in required_types]
+    options = [store.candidate_slots(t, grid.date_of(day), TIME_SLOTS[hour])
+               for t, (day, hour) in zip(required_types, cells)]
+    return _assign_within_limits(store, options) or [opts[0] if opts else None for opts in options]
+
+
+def _assign_within_limits(store, options):
+    """Pick one slot per round so no interviewer goes past their daily limit (None if impossible)."""
+    chosen = []
+    load = {}
+
+    def fits(slot):
+        key = (slot["interviewer_id"], slot["date"])
+        remaining = store.remaining_capacity(*key) if slot["interviewer_id"] is not None else None
+        return remaining is None or load.get(key, 0) < remaining
+
+    def search(i):
+        if i == len(options):
+            return True
+        for slot in options[i]:
+            if not fits(slot):
+                continue
+            key = (slot["interviewer_id"], slot["date"])
+            load[key] = load.get(key, 0) + 1
+            chosen.append(slot)
+            if search(i + 1):
+                return True
+            chosen.pop()
+            load[key] -= 1
+        return False
+
+    return chosen if search(0) else None
+
+
+def describe_slots(slots):
+    """Render selected slots as the interview_details paragraph sent to the candidate."""
+    parts = [f"{slot['interview_type']} interview on {slot['date']} at {slot['time']}" for slot in slots]
+    return "Your interviews have been scheduled as follows: " + ", ".join(parts) + "."
+
+
+def schedule_locally(interview_type, booking_id=None):
+    """
+    Book interview slots and describe them without an LLM call (used when the budget is tight).
+
+    Args:
+        interview_type (str): Either "tech" or "sales"
+        booking_id (str): Key of the booking, e.g. the application id (optional)
+
+    Returns:
+        dict: Contains 'interview_details', 'slots_not_found' and 'booked_slots' fields
+    """
+    if interview_type not in REQUIRED_TYPES:
+        return {
+            "interview_details": "",
+            "slots_not_found": "Invalid interview type. Please specify 'tech' or 'sales'."
+        }
+    slots = book_interview(interview_type, booking_id)
+    if not slots:
+        return {"interview_details": "", "slots_not_found": SLOTS_NOT_FOUND_MESSAGE}
+    return {"interview_details": describe_slots(slots), "slots_not_found": "", "booked_slots": slots}
+
+
+def slot_holds_enabled():
+    return os.getenv("SLOT_HOLDS", "1") != "0"
+
+
+def _count_hold(outcome):
+    with _hold_stats_lock:
+        _hold_stats[outcome] += 1
+
+
+def place_hold(interview_type, hold_id, ttl=None):
+    """
+    Tentatively hold the slot bundle a candidate would most likely get.
+
+    The bundle is picked like schedule_locally() picks it. If a slot is taken
+    between picking and holding, the pick is retried a few times.
+
+    Args:
+        interview_type (str): Either "tech" or "sales"
+        hold_id (str): Key of the hold, e.g. the application id
+        ttl (float): Seconds before the hold lapses (default: SLOT_HOLD_TTL_SECONDS)
+
+    Returns:
+        list: The held slots, or None if no bundle could be held
+    """
+    if interview_type not in REQUIRED_TYPES:
+        return None
+    ttl = ttl if ttl is not None else float(os.getenv("SLOT_HOLD_TTL_SECONDS", "600"))
+    store = get_slot_store()
+    store.release_expired_holds()
+    for _ in range(HOLD_ATTEMPTS):
+        slots = select_slots_locally(interview_type)
+        if not slots or None in slots:
+            break
+        held = store.hold_slots(hold_id, [slot["slot_id"] for slot in slots], ttl)
+        if held is not None:
+            _count_hold("placed")
+            return held
+    _count_hold("failed")
+    return None
 
-load_dotenv()
 
-_client = None
+def confirm_hold(hold_id):
+    """Book the slots of a hold. Returns the booked slots, or None if the hold lapsed."""
+    booked = get_slot_store().confirm_hold(hold_id)
+    _count_hold("confirmed" if booked else "expired")
+    return booked
 
 
-def get_openai_client():
-    global _client
-    if _client is not None:
-        return _client
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables")
-    _client = OpenAI(api_key=api_key)
-    return _client
+def release_hold(hold_id):
+    """Give the slots of a hold back."""
+    if get_slot_store().release_hold(hold_id):
+        _count_hold("released")
 
 
-def organize_interview(interview_type):
+def book_interview(interview_type, booking_id=None):
+    """
+    Book a bundle of slots for an interview, every round or none.
+
+    The bundle is picked like schedule_locally() picks it, held and then
+    booked, so interviewers' daily limits and hours are respected.
+
+    Args:
+        interview_type (str): Either "tech" or "sales"
+        booking_id (str): Key of the booking, e.g. the application id (optional)
+
+    Returns:
+        list: The booked slots, or None if no bundle could be booked
+    """
+    hold_id = f"booking:{booking_id or uuid.uuid4().hex[:12]}"
+    if not place_hold(interview_type, hold_id, ttl=BOOKING_HOLD_SECONDS):
+        return None
+    return confirm_hold(hold_id)
+
+
+def hold_stats():
+    """Counts of holds placed, failed (no bundle free), confirmed, expired and released."""
+    with _hold_stats_lock:
+        return dict(_hold_stats)
+
+
+def organize_interview(interview_type, booking_id=None, slots=None):
     """
     Organize interview slots based on the interview type (tech or sales).
-    
+
+    The slots are booked first (every round or none), so no two candidates
+    are sent the same interviewer-hour; the LLM then writes the details
+    paragraph for the booked slots.
+
     Args:
         interview_type (str): Either "tech" or "sales"
-        
+        booking_id (str): Key of the booking, e.g. the application id (optional)
+        slots (list): Slots already booked for the candidate (optional)
+
     Returns:
-        dict: Contains 'interview_details' and 'slots_not_found' fields
+        dict: Contains 'interview_details', 'slots_not_found' and 'booked_slots' fields
     """
     if interview_type not in ["tech", "sales"]:
         return {
             "interview_details": "",
             "slots_not_found": "Invalid interview type. Please specify 'tech' or 'sales'."
         }
-    
-    # Get all available slots
-    all_slots = get_available_slots()
-    
-    # Define required slots based on interview type
-    if interview_type == "tech":
-        required_types = ["DSA", "Low-level design", "High-level design"]
-        required_count = 3
-    else:  # sales
-        required_types = ["Communication", "Case study"]
-        required_count = 2
-    
-    # Check if we have enough slots of each required type
-    available_slots_by_type = {}
-    for slot_type in required_types:
-        available_slots_by_type[slot_type] = get_slots_by_type(slot_type)
-        if len(available_slots_by_type[slot_type]) == 0:
-            return {
-                "interview_details": "",
-                "slots_not_found": "Our interviewers are busy right now and they will try to schedule your interview as soon as possible."
-            }
-    
-    # Prepare slots data for LLM
-    slots_data = {
-        "all_slots": all_slots,
-        "available_by_type": available_slots_by_type,
-        "required_types": required_types,
-        "interview_type": interview_type
-    }
-    
+
+    # Book before describing: the LLM's wording cannot be booked from
+    if slots is None:
+        slots = book_interview(interview_type, booking_id)
+    if not slots:
+        return {
+            "interview_details": "",
+            "slots_not_found": SLOTS_NOT_FOUND_MESSAGE
+        }
+    booked = {"interview_details": describe_slots(slots), "slots_not_found": "", "booked_slots": slots}
+    booked_summary = "\n".join(
+        f"- {slot['interview_type']}: {slot['date']} at {slot['time']}" for slot in slots
+    )
+
     # Define function schema for LLM response
     functions = [
         {
             "name": "schedule_interview",
-            "description": "Schedule interview slots based on requirements",
+            "description": "Describe the booked interview slots",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -79,69 +244,58 @@ def organize_interview(interview_type):
                     },
                     "slots_not_found": {
                         "type": "string",
-                        "description": "Message if required slots cannot be found, empty string if slots are found"
+                        "description": "Always an empty string: the slots are already booked"
                     }
                 },
                 "required": ["interview_details", "slots_not_found"]
             }
         }
     ]
-    
+
     system_prompt = f"""You are an interview scheduler for our company.
 
-Available slots data:
-{json.dumps(slots_data, indent=2)}
+Booked slots:
+{booked_summary}
 
 Requirements:
 - Interview type: {interview_type}
-- Required interview types: {', '.join(required_types)}
-- Total slots needed: {required_count}
+- Rounds: {', '.join(REQUIRED_TYPES[interview_type])}
 
 Your task:
-1. Select exactly {required_count} slots from the available slots
-2. For tech interviews: select exactly 1 DSA slot, 1 Low-level design slot, and 1 High-level design slot
-3. For sales interviews: select exactly 1 Communication slot and 1 Case study slot
-4. Prefer slots that are:
-   - On the same day if possible
-   - Scheduled as early as possible
-   - Have good time spacing between them
-5. If you cannot find the required slots, set slots_not_found to the message: "Our interviewers are busy right now and they will try to schedule your interview as soon as possible."
-
-Return your decision using the schedule_interview function call with:
-- interview_details: A detailed paragraph describing the selected slots with full details (date, time, interview type)
-- slots_not_found: Empty string if slots found, error message if not found"""
+1. Describe exactly the booked slots above to the candidate; do not change, add or drop any
+2. Mention the date, time and interview type of every round
+
+Return your answer using the schedule_interview function call with:
+- interview_details: A detailed paragraph describing the booked slots with full details (date, time, interview type)
+- slots_not_found: Empty string"""
 
     try:
-        client = get_openai_client()
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            "organiser",
             model="gpt-4",
             messages=[
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Please schedule {interview_type} interview slots based on the available slots."}
+                {"role": "user", "content": f"Please describe the booked {interview_type} interview slots."}
             ],
             functions=functions,
             function_call={"name": "schedule_interview"}
         )
-        
+
         # Extract function call result
         function_call = response.choices[0].message.function_call
         if function_call and function_call.name == "schedule_interview":
             arguments = json.loads(function_call.arguments)
-            return {
-                "interview_details": arguments.get("interview_details", ""),
-                "slots_not_found": arguments.get("slots_not_found", "")
-            }
-        else:
-            return {
-                "interview_details": "",
-                "slots_not_found": "Unable to process interview scheduling request"
-            }
-            
+            if arguments.get("interview_details"):
+                return dict(booked, interview_details=arguments["interview_details"])
+        return booked
+
+    except LLMUnavailableError:
+        # The slots are booked: describe them locally instead
+        print("LLM unavailable - describing the booked interview slots locally")
+        return booked
     except Exception as e:
-        return {
-            "interview_details": "",
-            "slots_not_found": f"Error scheduling interview: {str(e)}"
-        }
+        print(f"Error describing interview slots: {e}")
+        return booked
 
 
 def main():
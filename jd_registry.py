@@ -0,0 +1,322 @@
+import contextvars
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import tech_profile_jd_analyser
+import sales_profile_jd_analyser
+from jd_spec import jd_specs_enabled, spec_prompt
+from tenants import DEFAULT_TENANT, current_tenant
+
+# Environment switches read by the JD nodes (see lg_graph) and get_registry()
+#   JD_REGISTRY        "1" to screen the JD stage against every open role of the
+#                      tenant on the filter's track (default "0": the track's JD only)
+#   JD_REGISTRY_PATH   open roles of the default tenant, a JSON file or directory
+#                      (see load_roles); other tenants set "jd_registry_path" in their config
+
+# Analyser used for each track. Every role belongs to a track and reuses the
+# track's prompt template and function schema.
+TRACK_ANALYSERS = {
+    "tech": tech_profile_jd_analyser,
+    "sales": sales_profile_jd_analyser,
+}
+
+# Words that say nothing about a role and are ignored by the pre-ranker
+STOPWORDS = {
+    "a", "about", "an", "and", "are", "as", "at", "be", "build", "by", "close", "closely",
+    "do", "experience", "for", "from", "have", "in", "is", "it", "of", "on", "or", "our",
+    "role", "similar", "strong", "the", "their", "to", "we", "will", "with", "work",
+    "years", "you", "your",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.-]*[a-z0-9+#]|[a-z0-9]")
+
+
+def tokenize(text):
+    """Lowercase, split into skill-friendly tokens (keeps c++, c#, node.js) and drop stopwords."""
+    return {
+        token for token in _TOKEN_RE.findall(text.lower())
+        if token not in STOPWORDS and not token.isdigit()
+    }
+
+
+class JDRegistry:
+    """
+    Registry of open roles with precompiled prompts and a local pre-ranker.
+
+    Each role's system prompt is built once at registration. The pre-ranker
+    keeps an inverted index from JD term to roles, so scoring a profile only
+    touches roles that share at least one term with it. Terms are weighted
+    by inverse document frequency across roles, so words every JD uses count
+    for little.
+    """
+
+    def __init__(self):
+        self._roles = {}
+        self._index = {}
+        self._idf = {}
+        self._idf_dirty = False
+        self._lock = threading.Lock()
+
+    def register_role(self, role_id, title, track, job_description):
+        """
+        Register (or replace) an open role.
+
+        Args:
+            role_id (str): Unique requisition id
+            title (str): Human readable role title
+            track (str): "tech" or "sales"; selects the analyser prompt template
+            job_description (str): Full JD text
+
+        Returns:
+            dict: The compiled role
+        """
+        if track not in TRACK_ANALYSERS:
+            raise ValueError(f"Unknown track {track!r}. Expected one of {sorted(TRACK_ANALYSERS)}")
+        role = {
+            "role_id": role_id,
+            "title": title,
+            "track": track,
+            "job_description": job_description,
+            "system_prompt": TRACK_ANALYSERS[track].PROMPT_TEMPLATE.format(job_description=job_description),
+            "terms": tokenize(title + "\n" + job_description),
+        }
+        with self._lock:
+            if role_id in self._roles:
+                self._unindex(self._roles[role_id])
+            self._roles[role_id] = role
+            for term in role["terms"]:
+                self._index.setdefault(term, set()).add(role_id)
+            self._idf_dirty = True
+        return role
+
+    def remove_role(self, role_id):
+        with self._lock:
+            role = self._roles.pop(role_id, None)
+            if role is not None:
+                self._unindex(role)
+                self._idf_dirty = True
+
+    def _unindex(self, role):
+        for term in role["terms"]:
+            role_ids = self._index.get(term)
+            if role_ids is not None:
+                role_ids.discard(role["role_id"])
+                if not role_ids:
+                    del self._index[term]
+
+    def _refresh_idf(self):
+        total = len(self._roles)
+        self._idf = {
+            term: math.log(1 + total / len(role_ids))
+            for term, role_ids in self._index.items()
+        }
+        for role in self._roles.values():
+            role["weight"] = sum(self._idf[term] for term in role["terms"]) or 1.0
+        self._idf_dirty = False
+
+    def get_role(self, role_id):
+        return self._roles[role_id]
+
+    def list_roles(self):
+        return list(self._roles.values())
+
+    def load_roles(self, path):
+        """
+        Register roles from a JSON file (a list of roles) or a directory of JSON files.
+
+        Each role needs 'role_id', 'title', 'track' and 'job_description'.
+
+        Returns:
+            int: Number of roles registered
+        """
+        if os.path.isdir(path):
+            files = [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".json")]
+        else:
+            files = [path]
+        count = 0
+        for file_path in files:
+            with open(file_path, encoding="utf-8") as f:
+                data = json.load(f)
+            for role in data if isinstance(data, list) else [data]:
+                self.register_role(role["role_id"], role["title"], role["track"], role["job_description"])
+                count += 1
+        return count
+
+    def signature(self, track=None):
+        """Hash of the roles (optionally of one track), so cached JD results change with them."""
+        with self._lock:
+            roles = sorted((role["role_id"], role["track"], role["title"], role["job_description"])
+                           for role in self._roles.values() if track is None or role["track"] == track)
+        return hashlib.sha256(json.dumps(roles).encode("utf-8")).hexdigest()
+
+    def prerank(self, profile_text, top_n=3, min_score=0.03, relative_cutoff=0.5, track=None):
+        """
+        Cheap local ranking of roles for a profile.
+
+        Score is the IDF-weighted share of a role's JD terms found in the profile.
+        Short profiles cover little of any JD, so besides the absolute floor a
+        role must also score within relative_cutoff of the best role.
+
+        Args:
+            profile_text (str): Candidate profile
+            top_n (int): Maximum number of roles to return
+            min_score (float): Roles scoring below this are dropped
+            relative_cutoff (float): Roles scoring below this fraction of the best are dropped
+            track (str): Only roles of this track (default: all)
+
+        Returns:
+            list: (role_id, score) tuples, best first
+        """
+        with self._lock:
+            if self._idf_dirty:
+                self._refresh_idf()
+            scores = {}
+            for term in tokenize(profile_text):
+                role_ids = self._index.get(term)
+                if not role_ids:
+                    continue
+                weight = self._idf[term]
+                for role_id in role_ids:
+                    if track is None or self._roles[role_id]["track"] == track:
+                        scores[role_id] = scores.get(role_id, 0.0) + weight
+            ranked = sorted(
+                ((role_id, score / self._roles[role_id]["weight"]) for role_id, score in scores.items()),
+                key=lambda item: item[1],
+                reverse=True,
+            )
+        if not ranked:
+            return []
+        floor = max(min_score, ranked[0][1] * relative_cutoff)
+        return [(role_id, score) for role_id, score in ranked[:top_n] if score >= floor]
+
+    def analyze(self, role_id, profile_text):
+        """Run the LLM analyser for one role with its precompiled prompt (built from the JD spec with JD_SPEC on)."""
+        role = self._roles[role_id]
+        analyser = TRACK_ANALYSERS[role["track"]]
+        system_prompt = spec_prompt(analyser, role["job_description"]) if jd_specs_enabled() else role["system_prompt"]
+        return analyser.analyze_profile_against_jd(profile_text, system_prompt=system_prompt)
+
+    def match_profile(self, profile_text, top_n=3, min_score=0.03, max_workers=4, track=None):
+        """
+        Evaluate a profile against the open roles that plausibly match it.
+
+        Roles are narrowed by prerank() first; only the survivors are sent to
+        the LLM, concurrently.
+
+        Args:
+            profile_text (str): Candidate profile
+            top_n (int): Maximum number of roles to send to the LLM
+            min_score (float): Minimum pre-rank score for a role to be analysed
+            max_workers (int): Concurrent LLM calls
+            track (str): Only roles of this track (default: all)
+
+        Returns:
+            list: Dicts with 'role_id', 'title', 'track', 'prerank_score',
+                  'verdict' and 'rejection_reason', selected roles first
+        """
+        candidates = self.prerank(profile_text, top_n=top_n, min_score=min_score, track=track)
+        if not candidates:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(candidates)))) as pool:
+            # Run each call in a copy of the caller's context so usage is
+            # charged to the caller's application
+            futures = [
+                pool.submit(contextvars.copy_context().run, self.analyze, role_id, profile_text)
+                for role_id, _ in candidates
+            ]
+            verdicts = [future.result() for future in futures]
+
+        matches = []
+        for (role_id, score), res in zip(candidates, verdicts):
+            role = self._roles[role_id]
+            matches.append({
+                "role_id": role_id,
+                "title": role["title"],
+                "track": role["track"],
+                "prerank_score": round(score, 3),
+                "verdict": res.get("verdict"),
+                "rejection_reason": res.get("rejection_reason", ""),
+            })
+        matches.sort(key=lambda m: (m["verdict"] != "select", -m["prerank_score"]))
+        return matches
+
+
+# Tenant id -> its registry
+_registries = {}
+_registry_lock = threading.Lock()
+
+
+def registry_routing_enabled():
+    return os.getenv("JD_REGISTRY", "0") == "1"
+
+
+def get_registry():
+    """Return the current tenant's registry, seeded with its tech and sales JDs and its open roles."""
+    tenant = current_tenant()
+    registry = _registries.get(tenant.tenant_id)
+    if registry is not None:
+        return registry
+    with _registry_lock:
+        registry = _registries.get(tenant.tenant_id)
+        if registry is None:
+            registry = JDRegistry()
+            registry.register_role("tech", "Senior Software Engineer (Backend)", "tech",
+                                   tenant.job_description("tech_jd"))
+            registry.register_role("sales", "Account Executive (B2B SaaS)", "sales",
+                                   tenant.job_description("sales_jd"))
+            roles_path = tenant.config.get("jd_registry_path")
+            if roles_path is None and tenant.tenant_id == DEFAULT_TENANT:
+                roles_path = os.getenv("JD_REGISTRY_PATH")
+            if roles_path:
+                registry.load_roles(roles_path)
+            _registries[tenant.tenant_id] = registry
+    return registry
+
+
+def match_profile(profile_text, top_n=3, min_score=0.03, track=None):
+    """Evaluate a profile against the current tenant's roles that plausibly match it."""
+    return get_registry().match_profile(profile_text, top_n=top_n, min_score=min_score, track=track)
+
+
+def match_result(profile_text, track):
+    """
+    JD stage result of a profile against the current tenant's open roles of a track.
+
+    Returns:
+        tuple: (analyser result with 'verdict' and 'rejection_reason', the
+               matches from match_profile()), or (None, []) if no role
+               plausibly matches
+    """
+    matches = match_profile(profile_text, track=track)
+    if not matches:
+        return None, []
+    best = matches[0]
+    if best["verdict"] == "select":
+        return {"verdict": "select", "rejection_reason": ""}, matches
+    return {"verdict": "reject", "rejection_reason": best["rejection_reason"]}, matches
+
+
+def main():
+    """Pre-rank and match sample profiles against the registered roles."""
+    samples = [
+        "BS CS 2021, 4y backend in Python, FastAPI, Postgres, AWS, Docker; built scalable APIs.",
+        "B2B SaaS AE, 3y experience, $1.2M ARR closed, Salesforce/HubSpot, MEDDICC, quota attainment.",
+        "Pastry chef with 6 years in fine dining kitchens."
+    ]
+    registry = get_registry()
+    print(f"Registered roles: {len(registry.list_roles())}")
+    for i, profile in enumerate(samples, 1):
+        print(f"\nSample {i}: {profile}")
+        print(f"Pre-rank: {registry.prerank(profile)}")
+        for match in registry.match_profile(profile):
+            print(f"  {match['role_id']}: {match['verdict']} (pre-rank {match['prerank_score']}) {match['rejection_reason']}")
+        print("-" * 40)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import statistics
+import threading
+import time
+from typing import List, Optional, TypedDict
+
+from llm_circuit import LLMUnavailableError
+from llm_client import create_chat_completion
+from profile_compactor import estimate_tokens
+from skill_automaton import HEADING_RE, get_skill_automaton
+from stage_results import get_stage_result_store
+
+# Environment switches read by the JD analysers' prompts (see tenants and jd_registry)
+#   JD_SPEC                 send the JD analysers a requirement spec compiled once from the JD
+#                           instead of the JD prose (default "1", "0" sends the prose)
+#   JD_SPEC_RETRY_SECONDS   how long a spec compiled by local rules is reused before
+#                           the LLM is asked again (default 300)
+
+# Stages whose prompt embeds a JD
+JD_STAGES = ("tech_jd", "sales_jd")
+
+
+class JDSpec(TypedDict, total=False):
+    role: str
+    min_years: Optional[float]
+    max_years: Optional[float]
+    core_requirements: List[str]
+    responsibilities: List[str]
+    nice_to_have: List[str]
+    education: str
+    # "llm", or "local" when compiled with rules while the LLM was unavailable
+    source: str
+
+
+functions = [
+    {
+        "name": "jd_spec",
+        "description": "Record the requirements of a job description that candidate screening checks",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "role": {
+                    "type": "string",
+                    "description": "Role title"
+                },
+                "min_years": {
+                    "type": ["number", "null"],
+                    "description": "Minimum years of experience required; null if not stated"
+                },
+                "max_years": {
+                    "type": ["number", "null"],
+                    "description": "Upper end of the required experience range; null if open-ended or not stated"
+                },
+                "core_requirements": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Each required qualification other than years of experience, in at most eight "
+                                   "words; keep alternatives together (\"PostgreSQL or MySQL\")"
+                },
+                "responsibilities": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Each responsibility of the role, in at most eight words"
+                },
+                "nice_to_have": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Preferred but optional qualifications, in at most six words each"
+                },
+                "education": {
+                    "type": "string",
+                    "description": "Education requirement; empty string if none"
+                }
+            },
+            "required": ["role", "min_years", "max_years", "core_requirements", "responsibilities",
+                         "nice_to_have", "education"]
+        }
+    }
+]
+
+SYSTEM_PROMPT = """You compile job descriptions into compact requirement specs for a candidate screening pipeline.
+Keep every requirement the JD states, in as few words as possible. Leave out company descriptions,
+selling points and soft skills; they are screened elsewhere.
+
+Return the spec using the jd_spec function call."""
+
+_SECTIONS = {
+    "core requirements": "core_requirements",
+    "requirements": "core_requirements",
+    "responsibilities": "responsibilities",
+    "nice to have": "nice_to_have",
+    "education": "education",
+}
+
+_YEARS_RE = re.compile(r"\b(\d{1,2})(?:\s*[–-]\s*(\d{1,2}))?\+?\s*(?:years?|yrs?)\b", re.IGNORECASE)
+# Lead-ins that carry no requirement ("Strong proficiency in Python" -> "Python")
+_FILLER_RE = re.compile(
+    r"^(?:(?:strong|solid|excellent|good|proven)\s+)?"
+    r"(?:proficiency in|experience with|understanding of|familiarity with|knowledge of|comfortable with)\s+",
+    re.IGNORECASE,
+)
+
+_specs = {}
+# JD hash -> (spec compiled by local rules, monotonic time to ask the LLM again)
+_local_specs = {}
+_stats = {"llm": 0, "local": 0, "cached": 0}
+_lock = threading.Lock()
+
+
+def jd_specs_enabled():
+    return os.getenv("JD_SPEC", "1") != "0"
+
+
+def local_spec_retry_seconds():
+    return float(os.getenv("JD_SPEC_RETRY_SECONDS", "300"))
+
+
+def spec_stats():
+    """JD specs compiled by the LLM, by local rules, and served from the cache."""
+    with _lock:
+        return dict(_stats)
+
+
+def jd_hash(job_description):
+    """Cache key of a JD's spec: the compilation prompt plus the JD text."""
+    payload = json.dumps([SYSTEM_PROMPT, functions], sort_keys=True) + "\0" + (job_description or "")
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _years(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0 else None
+
+
+def _items(values):
+    return [value.strip() for value in values or [] if isinstance(value, str) and value.strip()]
+
+
+def _normalize(arguments):
+    return {
+        "role": (arguments.get("role") or "").strip(),
+        "min_years": _years(arguments.get("min_years")),
+        "max_years": _years(arguments.get("max_years")),
+        "core_requirements": _items(arguments.get("core_requirements")),
+        "responsibilities": _items(arguments.get("responsibilities")),
+        "nice_to_have": _items(arguments.get("nice_to_have")),
+        "education": (arguments.get("education") or "").strip(),
+    }
+
+
+def compile_jd_locally(job_description):
+    """
+    Compile a JD into a spec with its section headings, without the LLM.
+
+    Relies on the JD layout the tenants use: a "Role:" line and headed
+    bullet sections. The overview and soft skills are left out.
+
+    Returns:
+        JDSpec: The spec
+    """
+    sections = {}
+    role = ""
+    section = None
+    for line in (job_description or "").splitlines():
+        line = line.strip()
+        if line.lower().startswith("role:"):
+            role = line.split(":", 1)[1].strip()
+            continue
+        heading = HEADING_RE.match(line)
+        if heading:
+            section = _SECTIONS.get(heading.group(1).strip().lower())
+            continue
+        if section and line.startswith("-"):
+            sections.setdefault(section, []).append(line.lstrip("- ").strip())
+
+    min_years = max_years = None
+    core = []
+    for line in sections.get("core_requirements", []):
+        years = _YEARS_RE.search(line)
+        if years and min_years is None:
+            min_years = float(years.group(1))
+            max_years = float(years.group(2)) if years.group(2) else None
+            # The years are in the spec's own fields; keep what else the line asks for
+            rest = _YEARS_RE.sub("", line, count=1).strip(" ,;")
+            rest = re.sub(r"^(?:of|in)\s+", "", rest, flags=re.IGNORECASE)
+            if get_skill_automaton().skills(rest) or len(rest.split()) > 2:
+                core.append(rest)
+            continue
+        core.append(_FILLER_RE.sub("", line))
+    return {
+        "role": role,
+        "min_years": min_years,
+        "max_years": max_years,
+        "core_requirements": core,
+        "responsibilities": sections.get("responsibilities", []),
+        "nice_to_have": [_FILLER_RE.sub("", line) for line in sections.get("nice_to_have", [])],
+        "education": "; ".join(sections.get("education", [])),
+        "source": "local",
+    }
+
+
+def compile_jd(job_description):
+    """
+    Compile a JD into a structured requirement spec with one LLM call.
+
+    Args:
+        job_description (str): Full JD text
+
+    Returns:
+        JDSpec: role, years range, core requirements, responsibilities,
+                nice to have and education
+
+    Raises:
+        LLMUnavailableError: The provider is down or the circuit is open
+    """
+    try:
+        response = create_chat_completion(
+            "jd_spec",
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": f"Job Description:\n\n{job_description}"}
+            ],
+            functions=functions,
+            function_call={"name": "jd_spec"}
+        )
+        function_call = response.choices[0].message.function_call
+        if function_call and function_call.name == "jd_spec":
+            return dict(_normalize(json.loads(function_call.arguments or "{}")), source="llm")
+        print("JD compilation returned no function call - using local rules")
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error compiling JD: {e}")
+    return compile_jd_locally(job_description)
+
+
+def get_jd_spec(job_description):
+    """
+    Spec of a JD, compiled once and cached by JD hash in memory and in the stage result store.
+
+    Specs compiled by local rules (LLM unavailable or its reply unusable)
+    are only kept in memory for JD_SPEC_RETRY_SECONDS, after which the next
+    prompt built from the JD asks the LLM again.
+
+    Returns:
+        tuple: (JDSpec, "cached", "llm" or "local")
+    """
+    key = jd_hash(job_description)
+    with _lock:
+        spec = _specs.get(key)
+        if spec is None and key in _local_specs and _local_specs[key][1] > time.monotonic():
+            spec = _local_specs[key][0]
+    if spec is None:
+        spec = get_stage_result_store().get_jd_spec(key)
+        if spec is not None:
+            with _lock:
+                _specs[key] = spec
+    if spec is not None:
+        with _lock:
+            _stats["cached"] += 1
+        return spec, "cached"
+    try:
+        spec = compile_jd(job_description)
+    except LLMUnavailableError:
+        spec = compile_jd_locally(job_description)
+    if spec["source"] == "llm":
+        get_stage_result_store().save_jd_spec(key, spec)
+    with _lock:
+        if spec["source"] == "llm":
+            _specs[key] = spec
+            _local_specs.pop(key, None)
+        else:
+            _local_specs[key] = (spec, time.monotonic() + local_spec_retry_seconds())
+        _stats[spec["source"]] += 1
+    return spec, spec["source"]
+
+
+def render_spec(spec):
+    """Render a spec as the text a JD analyser's prompt embeds instead of the JD."""
+    low, high = spec.get("min_years"), spec.get("max_years")
+    if low is None:
+        years = "not stated"
+    else:
+        years = f"{low:g}" + (f"-{high:g}" if high is not None and high != low else "+") + " years"
+    lines = [f"Role: {spec.get('role') or 'not stated'}", f"Experience required: {years}"]
+    for label, field in (("Core requirements", "core_requirements"), ("Responsibilities", "responsibilities"),
+                         ("Nice to have", "nice_to_have")):
+        if spec.get(field):
+            lines.append(f"{label}: " + "; ".join(spec[field]))
+    if spec.get("education"):
+        lines.append(f"Education: {spec['education']}")
+    return "\n".join(lines)
+
+
+def spec_prompt(module, job_description):
+    """
+    System prompt of a JD analyser module with the JD's spec in place of the JD text.
+
+    Args:
+        module: tech_profile_jd_analyser or sales_profile_jd_analyser
+        job_description (str): Full JD text
+
+    Returns:
+        str: The analyser's PROMPT_TEMPLATE filled with the rendered spec
+    """
+    spec, _ = get_jd_spec(job_description)
+    return module.PROMPT_TEMPLATE.format(job_description=render_spec(spec))
+
+
+def compare_prompts(samples, runs=1):
+    """
+    Run each sample through a JD analyser with the prose prompt and with the spec prompt.
+
+    Args:
+        samples (list): (stage, profile_text) pairs, stage "tech_jd" or "sales_jd"
+        runs (int): Calls per prompt and sample; latency is the median
+
+    Returns:
+        dict: Per stage, 'prompt_tokens' and 'latency' (median seconds) for
+              'prose' and 'spec', 'agreement' (share of samples with the
+              same verdict) and 'disagreements' ((profile, prose, spec) verdicts)
+    """
+    from tenants import current_tenant, stage_module
+
+    report = {}
+    for stage, profile in samples:
+        module = stage_module(stage)
+        job_description = current_tenant().job_description(stage)
+        prompts = {
+            "prose": module.PROMPT_TEMPLATE.format(job_description=job_description),
+            "spec": spec_prompt(module, job_description),
+        }
+        entry = report.setdefault(stage, {
+            "samples": 0,
+            "agreed": 0,
+            "prompt_tokens": {name: estimate_tokens(prompt) for name, prompt in prompts.items()},
+            "latencies": {name: [] for name in prompts},
+            "disagreements": [],
+        })
+        verdicts = {}
+        for name, prompt in prompts.items():
+            for _ in range(runs):
+                started = time.perf_counter()
+                result = module.analyze_profile_against_jd(profile, system_prompt=prompt)
+                entry["latencies"][name].append(time.perf_counter() - started)
+            verdicts[name] = result["verdict"]
+        entry["samples"] += 1
+        if verdicts["prose"] == verdicts["spec"]:
+            entry["agreed"] += 1
+        else:
+            entry["disagreements"].append((profile, verdicts["prose"], verdicts["spec"]))
+
+    for entry in report.values():
+        entry["latency"] = {name: statistics.median(values) for name, values in entry.pop("latencies").items()}
+        entry["agreement"] = entry.pop("agreed") / entry["samples"]
+    return report
+
+
+def main():
+    """
+    Compile the JDs and compare analyser prompt tokens, latency and verdicts against the prose prompts.
+
+    Pass --profiles with a JSON file of {"stage": "tech_jd"|"sales_jd",
+    "user_profile": ...} entries to compare on real applications.
+    """
+    parser = argparse.ArgumentParser(description="Compare JD analyser prompts built from the JD prose and from its spec")
+    parser.add_argument("--profiles", help="JSON file of {stage, user_profile} entries (default: built-in samples)")
+    parser.add_argument("--runs", type=int, default=1, help="Calls per prompt and profile")
+    args = parser.parse_args()
+
+    if args.profiles:
+        with open(args.profiles, encoding="utf-8") as f:
+            samples = [(entry["stage"], entry["user_profile"]) for entry in json.load(f)]
+    else:
+        samples = [
+            ("tech_jd", "BS CS 2019, 5y backend in Python, FastAPI, Postgres, AWS, Docker; built scalable APIs."),
+            ("tech_jd", "BS CS 2023, 1y frontend in React and TypeScript; some Node.js."),
+            ("tech_jd", "MBA Marketing 2020, 3y growth marketing; no coding; SEO/SEM; HubSpot, GA."),
+            ("sales_jd", "B2B SaaS AE, 3y experience, $1.2M ARR closed, 110% of quota, Salesforce, MEDDICC."),
+            ("sales_jd", "Retail store associate for 2 years; customer service and cash handling."),
+            ("sales_jd", "Data Scientist, Python/ML, no sales experience, Kaggle medals."),
+        ]
+
+    from tenants import current_tenant
+
+    for stage in JD_STAGES:
+        spec, source = get_jd_spec(current_tenant().job_description(stage))
+        print(f"{stage} spec ({source}):\n{render_spec(spec)}\n")
+
+    report = compare_prompts(samples, runs=args.runs)
+    print("JD Prompt Comparison:")
+    print("=" * 50)
+    for stage, entry in report.items():
+        tokens, latency = entry["prompt_tokens"], entry["latency"]
+        print(f"{stage}: {entry['samples']} profiles, verdict agreement {entry['agreement']:.0%}")
+        print(f"  system prompt tokens: prose {tokens['prose']}, spec {tokens['spec']} "
+              f"({1 - tokens['spec'] / tokens['prose']:.0%} fewer)")
+        print(f"  median latency: prose {latency['prose']:.2f}s, spec {latency['spec']:.2f}s")
+        for profile, prose, spec in entry["disagreements"]:
+            print(f"  differs: prose {prose}, spec {spec}: {profile[:70]}")
+    print(f"\nSpecs: {spec_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,37 @@
-from typing import TypedDict, Optional, Literal, Dict, Any
+import itertools
+import time
+import uuid
+from typing import TypedDict, Optional, Literal, Dict, Any, Iterable, List
 
 # External logic modules
-from profile_filter import filter_profile
+from profile_filter import filter_profile, filter_profile_locally
 from tech_profile_jd_analyser import analyze_profile_against_jd as analyze_tech
 from sales_profile_jd_analyser import analyze_profile_against_jd as analyze_sales
 from cultural_fit_analyzer import analyze_cultural_fit
-from interview_organiser import organize_interview
-from emailer import generate_email
+from jd_registry import match_result, registry_routing_enabled
+from interview_organiser import (
+    SLOTS_NOT_FOUND_MESSAGE,
+    confirm_hold,
+    describe_slots,
+    organize_interview,
+    place_hold,
+    release_hold,
+    schedule_locally,
+    slot_holds_enabled,
+)
+from emailer import generate_email, render_template_email
+from email_delivery import find_email_address
+from budget import get_budget_governor
+from llm_circuit import LLMUnavailableError, get_circuit_breaker
+from profile_compactor import compact_application, get_compaction_stats, node_input, record_sent
+from profile_features import ProfileFeatures, apply_profile_features, candidate_name, filter_from_features
+from results_store import ResultsWriter, get_result_store
+from skill_automaton import skill_precheck
+from pipeline_profiler import get_pipeline_profiler, profiled
+from stage_results import get_stage_result_store, record_stage_result, screening_decision
+from tenants import current_tenant, get_tenant_metrics, tenant_scope
+from admission import timed
+from waitlist import get_waitlist, waitlist_enabled
 
 
 from langgraph.graph import StateGraph, END
@@ -16,6 +41,22 @@ class AppState(TypedDict, total=False):
     # Inputs
     user_profile: str
     cover_letter: str
+    application_id: Optional[str]
+    # Company or business unit the application is for (see tenants)
+    tenant_id: Optional[str]
+    scoring_mode: Optional[bool]
+    # Drop large fields once no later node reads them (see stream_batch)
+    streaming: Optional[bool]
+    # Recipient for email delivery; found in the profile when not given
+    candidate_email: Optional[str]
+
+    # Compacted inputs per node, tokens saved against the raw inputs, and raw input tokens
+    compacted_inputs: Optional[Dict[str, str]]
+    compaction_savings: Optional[Dict[str, int]]
+    raw_tokens: Optional[Dict[str, int]]
+
+    # Facts extracted once from the profile and read by every later node
+    profile_features: Optional[ProfileFeatures]
 
     # Filter outcome
     filter_verdict: Optional[Literal["reject", "tech", "sales"]]
@@ -24,12 +65,22 @@ class AppState(TypedDict, total=False):
     # JD analyser outcome
     jd_verdict: Optional[Literal["select", "reject"]]
     jd_reason: Optional[str]
+    jd_score: Optional[int]
+    # Open roles the profile was matched against with JD_REGISTRY on, selected first
+    matched_roles: Optional[List[Dict[str, Any]]]
 
     # Cultural fit outcome
     cultural_verdict: Optional[Literal["select", "reject"]]
     cultural_reason: Optional[str]
+    cultural_score: Optional[int]
 
-    # Scheduling
+    # Shortlist ranking (scoring mode)
+    score: Optional[float]
+
+    # Scheduling: slots held tentatively while screening runs, and the
+    # slots booked from the hold once the candidate passed
+    slot_hold_id: Optional[str]
+    booked_slots: Optional[List[Dict[str, Any]]]
     interview_type: Optional[Literal["tech", "sales"]]
     interview_details: Optional[str]
     slots_not_found: Optional[str]
@@ -37,14 +88,56 @@ class AppState(TypedDict, total=False):
     # Email
     final_email: Optional[str]
 
+    # LLM outage handling: stages decided by local rules, and where the
+    # application was parked (no decision, no email) until the LLM is back
+    degraded_stages: Optional[List[str]]
+    parked_stage: Optional[Literal["filter", "jd", "cultural"]]
+    parked_reason: Optional[str]
+
+
+def _park(state: AppState, stage: str, error: Exception) -> AppState:
+    state["parked_stage"] = stage
+    state["parked_reason"] = str(error)
+    print(f"   ⛔ LLM unavailable - application parked at {stage} for later")
+    return state
+
+
+def _compact_node(state: AppState) -> AppState:
+    print("\n🗜️  COMPACT NODE - Compacting profile and cover letter...")
+    state.update(compact_application(state))
+    print(f"✅ COMPACT NODE OUTPUT:")
+    print(f"   Tokens saved by node: {state.get('compaction_savings')}")
+    print(f"   Total saved so far: {get_compaction_stats().snapshot()['tokens_saved']}")
+    return state
+
+
+def _features_node(state: AppState) -> AppState:
+    print("\n🧬 FEATURES NODE - Extracting profile features...")
+    source = apply_profile_features(state)
+    features = state["profile_features"]
+    print(f"✅ FEATURES NODE OUTPUT ({source}):")
+    print(f"   Name: {features.get('name') or '-'}")
+    print(f"   Graduation year: {features.get('graduation_year')}, experience: {features.get('years_experience')}")
+    print(f"   Domain: {features.get('domain')}, skills: {', '.join(features.get('skills') or [])}")
+    return state
+
 
 def _filter_node(state: AppState) -> AppState:
     print("\n🔍 FILTER NODE - Analyzing profile...")
-    profile_text = state.get("user_profile", "")
+    profile_text = node_input(state, "filter")
     try:
         res = filter_profile(profile_text)
+        record_sent(state, "filter")
         state["filter_verdict"] = res.get("verdict")  # reject|tech|sales
         state["filter_reason"] = res.get("rejection_reason", "")
+    except LLMUnavailableError as e:
+        res = filter_from_features(state.get("profile_features")) or filter_profile_locally(profile_text)
+        if res is None:
+            return _park(state, "filter", e)
+        print("   ⚠️  LLM unavailable - filtered with local rules")
+        state["filter_verdict"] = res["verdict"]
+        state["filter_reason"] = res["rejection_reason"]
+        state["degraded_stages"] = (state.get("degraded_stages") or []) + ["filter"]
     except Exception as e:
         state["filter_verdict"] = "reject"
         state["filter_reason"] = f"Filter error: {e}"
@@ -55,14 +148,49 @@ def _filter_node(state: AppState) -> AppState:
     return state
 
 
+def apply_stage_result(stage: str, state: AppState, res: Dict[str, Any]) -> AppState:
+    """Copy an analyser result (verdict, rejection_reason, score) into the state fields of a stage."""
+    if stage == "cultural":
+        state["cultural_verdict"] = res.get("verdict")  # select|reject
+        state["cultural_reason"] = res.get("rejection_reason", "")
+        state["cultural_score"] = res.get("score")
+        return state
+    state["jd_verdict"] = res.get("verdict")  # select|reject
+    state["jd_reason"] = res.get("rejection_reason", "")
+    state["jd_score"] = res.get("score")
+    if state["jd_verdict"] == "select":
+        state["interview_type"] = "tech" if stage == "tech_jd" else "sales"
+    return state
+
+
+def _match_roles(stage: str, state: AppState) -> Optional[Dict[str, Any]]:
+    """Screen against the tenant's open roles of the track (JD_REGISTRY); None if no role plausibly matches."""
+    res, matches = match_result(node_input(state, stage), "tech" if stage == "tech_jd" else "sales")
+    if res is None:
+        return None
+    record_sent(state, stage)
+    state["matched_roles"] = matches
+    print(f"   🗂️  Matched open roles: {', '.join(m['role_id'] + ' ' + str(m['verdict']) for m in matches)}")
+    return res
+
+
 def _tech_jd_node(state: AppState) -> AppState:
     print("\n💻 TECH JD NODE - Analyzing tech profile match...")
     try:
-        res = analyze_tech(state.get("user_profile", ""))
-        state["jd_verdict"] = res.get("verdict")  # select|reject
-        state["jd_reason"] = res.get("rejection_reason", "")
-        if state["jd_verdict"] == "select":
-            state["interview_type"] = "tech"
+        # Clear misses on core skills are rejected without the LLM
+        res = skill_precheck("tech_jd", node_input(state, "tech_jd"), scoring=bool(state.get("scoring_mode")))
+        if res is None and registry_routing_enabled() and not state.get("scoring_mode"):
+            res = _match_roles("tech_jd", state)
+        if res is None:
+            res = analyze_tech(
+                node_input(state, "tech_jd"),
+                system_prompt=current_tenant().system_prompt("tech_jd"),
+                scoring=bool(state.get("scoring_mode")),
+            )
+            record_sent(state, "tech_jd")
+        apply_stage_result("tech_jd", state, res)
+    except LLMUnavailableError as e:
+        return _park(state, "jd", e)
     except Exception as e:
         state["jd_verdict"] = "reject"
         state["jd_reason"] = f"Tech JD error: {e}"
@@ -70,6 +198,8 @@ def _tech_jd_node(state: AppState) -> AppState:
     print(f"✅ TECH JD NODE OUTPUT:")
     print(f"   Verdict: {state.get('jd_verdict')}")
     print(f"   Reason: {state.get('jd_reason')}")
+    if state.get("scoring_mode"):
+        print(f"   Score: {state.get('jd_score')}")
     print(f"   Interview Type: {state.get('interview_type')}")
     return state
 
@@ -77,11 +207,20 @@ def _tech_jd_node(state: AppState) -> AppState:
 def _sales_jd_node(state: AppState) -> AppState:
     print("\n💼 SALES JD NODE - Analyzing sales profile match...")
     try:
-        res = analyze_sales(state.get("user_profile", ""))
-        state["jd_verdict"] = res.get("verdict")  # select|reject
-        state["jd_reason"] = res.get("rejection_reason", "")
-        if state["jd_verdict"] == "select":
-            state["interview_type"] = "sales"
+        # Clear misses on core skills are rejected without the LLM
+        res = skill_precheck("sales_jd", node_input(state, "sales_jd"), scoring=bool(state.get("scoring_mode")))
+        if res is None and registry_routing_enabled() and not state.get("scoring_mode"):
+            res = _match_roles("sales_jd", state)
+        if res is None:
+            res = analyze_sales(
+                node_input(state, "sales_jd"),
+                system_prompt=current_tenant().system_prompt("sales_jd"),
+                scoring=bool(state.get("scoring_mode")),
+            )
+            record_sent(state, "sales_jd")
+        apply_stage_result("sales_jd", state, res)
+    except LLMUnavailableError as e:
+        return _park(state, "jd", e)
     except Exception as e:
         state["jd_verdict"] = "reject"
         state["jd_reason"] = f"Sales JD error: {e}"
@@ -89,6 +228,8 @@ def _sales_jd_node(state: AppState) -> AppState:
     print(f"✅ SALES JD NODE OUTPUT:")
     print(f"   Verdict: {state.get('jd_verdict')}")
     print(f"   Reason: {state.get('jd_reason')}")
+    if state.get("scoring_mode"):
+        print(f"   Score: {state.get('jd_score')}")
     print(f"   Interview Type: {state.get('interview_type')}")
     return state
 
@@ -96,9 +237,15 @@ def _sales_jd_node(state: AppState) -> AppState:
 def _cultural_node(state: AppState) -> AppState:
     print("\n🎭 CULTURAL NODE - Analyzing cultural fit...")
     try:
-        res = analyze_cultural_fit(state.get("cover_letter", ""))
-        state["cultural_verdict"] = res.get("verdict")  # select|reject
-        state["cultural_reason"] = res.get("rejection_reason", "")
+        res = analyze_cultural_fit(
+            node_input(state, "cultural"),
+            scoring=bool(state.get("scoring_mode")),
+            system_prompt=current_tenant().system_prompt("cultural"),
+        )
+        record_sent(state, "cultural")
+        apply_stage_result("cultural", state, res)
+    except LLMUnavailableError as e:
+        return _park(state, "cultural", e)
     except Exception as e:
         state["cultural_verdict"] = "reject"
         state["cultural_reason"] = f"Cultural fit error: {e}"
@@ -106,6 +253,8 @@ def _cultural_node(state: AppState) -> AppState:
     print(f"✅ CULTURAL NODE OUTPUT:")
     print(f"   Verdict: {state.get('cultural_verdict')}")
     print(f"   Reason: {state.get('cultural_reason')}")
+    if state.get("scoring_mode"):
+        print(f"   Score: {state.get('cultural_score')}")
     return state
 
 
@@ -113,9 +262,23 @@ def _organiser_node(state: AppState) -> AppState:
     print("\n📅 ORGANISER NODE - Scheduling interviews...")
     try:
         itype = state.get("interview_type") or "tech"
-        res = organize_interview(itype)
+        if state.get("booked_slots"):
+            print("   📌 Slots already booked from the tentative hold")
+            res = {"interview_details": describe_slots(state["booked_slots"]), "slots_not_found": ""}
+        elif get_budget_governor().should_degrade("llm_organiser"):
+            print("   💰 Budget cap reached - scheduling locally without the LLM")
+            res = schedule_locally(itype, state.get("application_id"))
+        else:
+            # Books the slots itself (and describes them locally if the LLM is unavailable)
+            res = organize_interview(itype, state.get("application_id"))
+        if res.get("booked_slots"):
+            state["booked_slots"] = res["booked_slots"]
         state["interview_details"] = res.get("interview_details", "")
         state["slots_not_found"] = res.get("slots_not_found", "")
+        if state["slots_not_found"] == SLOTS_NOT_FOUND_MESSAGE and waitlist_enabled():
+            # Shortlisted candidates with a higher score get first pick of freed slots
+            get_waitlist().add(state, priority=state.get("score") or 0)
+            print("   🕒 Waitlisted - interviews are scheduled as soon as slots open")
     except Exception as e:
         state["interview_details"] = ""
         state["slots_not_found"] = f"Organizer error: {e}"
@@ -155,8 +318,21 @@ def _emailer_node(state: AppState) -> AppState:
                 "Our interviewers are busy right now and they will try to schedule your interview as soon as possible.",
             )
 
+    signature = current_tenant().email_signature
+
+    def template_email():
+        return render_template_email(verdict, reason, candidate_name(state), signature)
+
     try:
-        email = generate_email(verdict, reason, state.get("user_profile", ""))
+        if get_budget_governor().should_degrade("llm_email"):
+            print("   💰 Budget cap reached - using the template email")
+            email = template_email()
+        else:
+            try:
+                email = generate_email(verdict, reason, candidate_name(state), signature)
+            except LLMUnavailableError:
+                print("   ⚠️  LLM unavailable - using the template email")
+                email = template_email()
         print(f"✅ EMAILER NODE OUTPUT:", email)
         state["final_email"] = email
     except Exception as e:
@@ -170,6 +346,8 @@ def _emailer_node(state: AppState) -> AppState:
 
 
 def _after_filter_router(state: AppState) -> str:
+    if state.get("parked_stage"):
+        return "parked"
     v = state.get("filter_verdict")
     if v == "reject":
         return "emailer"
@@ -181,72 +359,369 @@ def _after_filter_router(state: AppState) -> str:
 
 
 def _after_tech_jd_router(state: AppState) -> str:
+    if state.get("parked_stage"):
+        return "parked"
     return "cultural" if state.get("jd_verdict") == "select" else "emailer"
 
 
 def _after_sales_jd_router(state: AppState) -> str:
+    if state.get("parked_stage"):
+        return "parked"
     return "cultural" if state.get("jd_verdict") == "select" else "emailer"
 
 
 def _after_cultural_router(state: AppState) -> str:
+    if state.get("parked_stage"):
+        return "parked"
     return "organiser" if state.get("cultural_verdict") == "select" else "emailer"
 
 
-def build_graph():
+# Screening stages whose results are cached per application, with the router
+# that picks the next stage. Used by the graph and by reevaluate.py.
+SCREENING_STAGES = {
+    "filter": (_filter_node, _after_filter_router),
+    "tech_jd": (_tech_jd_node, _after_tech_jd_router),
+    "sales_jd": (_sales_jd_node, _after_sales_jd_router),
+    "cultural": (_cultural_node, _after_cultural_router),
+}
+
+
+def _recorded(stage, node):
+    """Wrap a screening node so its result is stored with the hash of its inputs.
+
+    Parked stages and stages decided by local rules are not stored, so they
+    are re-run with the LLM on re-evaluation.
+    """
+    def run(state: AppState) -> AppState:
+        state = node(state)
+        if (state.get("application_id") and not state.get("parked_stage")
+                and stage not in (state.get("degraded_stages") or [])):
+            record_stage_result(stage, state)
+        return state
+    return run
+
+
+def _holding(stage, node):
+    """Wrap a screening node to hold interview slots speculatively.
+
+    Once the filter routes a candidate to tech or sales, the slot bundle
+    they would most likely get is held. A JD or cultural reject (or parking)
+    releases it; passing the cultural check books it, so the organiser needs
+    no LLM round trip. Holds that are never resolved lapse after their TTL.
+    """
+    def run(state: AppState) -> AppState:
+        state = node(state)
+        if not slot_holds_enabled():
+            return state
+        hold_id = state.get("slot_hold_id")
+        if stage == "filter":
+            if state.get("filter_verdict") in ("tech", "sales") and not state.get("parked_stage"):
+                hold_id = state.get("application_id") or f"hold-{uuid.uuid4().hex[:12]}"
+                if place_hold(state["filter_verdict"], hold_id):
+                    state["slot_hold_id"] = hold_id
+                    print(f"   📌 Tentatively holding {state['filter_verdict']} interview slots")
+            return state
+        if not hold_id:
+            return state
+        verdict = state.get("cultural_verdict" if stage == "cultural" else "jd_verdict")
+        if state.get("parked_stage") or verdict != "select":
+            release_hold(hold_id)
+            state["slot_hold_id"] = None
+        elif stage == "cultural":
+            state["booked_slots"] = confirm_hold(hold_id)
+            state["slot_hold_id"] = None
+            if not state["booked_slots"]:
+                print("   ⌛ Tentative hold lapsed - scheduling from scratch")
+        return state
+    return run
+
+
+# Nodes that may still run after each node. In streaming mode the compacted
+# inputs of nodes that can no longer run are dropped after every node, and
+# the raw profile and cover letter right after compaction (they stay in the
+# stage result store under the application id).
+_LATER_NODES = {
+    "compact": ("features", "filter", "tech_jd", "sales_jd", "cultural"),
+    "features": ("filter", "tech_jd", "sales_jd", "cultural"),
+    "filter": ("tech_jd", "sales_jd", "cultural"),
+    "tech_jd": ("cultural",),
+    "sales_jd": ("cultural",),
+    "cultural": (),
+    "organiser": (),
+    "emailer": (),
+}
+
+
+def _released(name, node):
+    """Wrap a node so that, in streaming mode, fields no later node reads are dropped after it."""
+    def run(state: AppState) -> AppState:
+        state = node(state)
+        if not state.get("streaming"):
+            return state
+        if name == "compact":
+            # Keep the recipient; the profile it is found in is dropped
+            if not state.get("candidate_email"):
+                state["candidate_email"] = find_email_address(state.get("user_profile"))
+            state["user_profile"] = None
+            state["cover_letter"] = None
+        live = _LATER_NODES[name]
+        compacted = state.get("compacted_inputs") or {}
+        state["compacted_inputs"] = {n: text for n, text in compacted.items() if n in live} or None
+        return state
+    return run
+
+
+def build_graph(screen_only: bool = False):
+    """Build the application graph.
+
+    With screen_only, the graph stops after screening (filter, JD, cultural)
+    and never schedules or emails; finalize_application() does that later,
+    e.g. only for a shortlist.
+    """
     graph = StateGraph(AppState)
 
     # Nodes
-    graph.add_node("filter", _filter_node)
-    graph.add_node("tech_jd", _tech_jd_node)
-    graph.add_node("sales_jd", _sales_jd_node)
-    graph.add_node("cultural", _cultural_node)
-    graph.add_node("organiser", _organiser_node)
-    graph.add_node("emailer", _emailer_node)
-
-    # Entry
-    graph.set_entry_point("filter")
+    graph.add_node("compact", profiled("compact", timed("compact", _released("compact", _compact_node))))
+    graph.add_node("features", profiled("features", timed("features", _released("features", _features_node))))
+    for stage, (node, _) in SCREENING_STAGES.items():
+        node = _recorded(stage, node)
+        if not screen_only:
+            # A screen-only run schedules later, and only for its shortlist
+            node = _holding(stage, node)
+        graph.add_node(stage, profiled(stage, timed(stage, _released(stage, node))))
+    if not screen_only:
+        graph.add_node("organiser", profiled("organiser", timed("organiser", _released("organiser", _organiser_node))))
+        graph.add_node("emailer", profiled("emailer", timed("emailer", _released("emailer", _emailer_node))))
+    emailer = END if screen_only else "emailer"
+    organiser = END if screen_only else "organiser"
+
+    # Entry: inputs are compacted and the profile's features extracted once, then screened
+    graph.set_entry_point("compact")
+    graph.add_edge("compact", "features")
+    graph.add_edge("features", "filter")
 
     # Conditional edges
     graph.add_conditional_edges("filter", _after_filter_router, {
-        "emailer": "emailer",
+        "emailer": emailer,
         "tech_jd": "tech_jd",
         "sales_jd": "sales_jd",
+        "parked": END,
     })
 
     graph.add_conditional_edges("tech_jd", _after_tech_jd_router, {
         "cultural": "cultural",
-        "emailer": "emailer",
+        "emailer": emailer,
+        "parked": END,
     })
 
     graph.add_conditional_edges("sales_jd", _after_sales_jd_router, {
         "cultural": "cultural",
-        "emailer": "emailer",
+        "emailer": emailer,
+        "parked": END,
     })
 
     graph.add_conditional_edges("cultural", _after_cultural_router, {
-        "organiser": "organiser",
-        "emailer": "emailer",
+        "organiser": organiser,
+        "emailer": emailer,
+        "parked": END,
     })
 
-    # From organiser we always email
-    graph.add_edge("organiser", "emailer")
-    graph.add_edge("emailer", END)
+    if not screen_only:
+        # From organiser we always email
+        graph.add_edge("organiser", "emailer")
+        graph.add_edge("emailer", END)
 
     return graph.compile()
 
 
-def run_once(user_profile: str, cover_letter: str) -> Dict[str, Any]:
-    """Run the full flow once and return final state using LangGraph."""
+_graphs: Dict[bool, Any] = {}
+
+
+def get_graph(screen_only: bool = False):
+    """Return a compiled graph, building it once per process."""
+    if screen_only not in _graphs:
+        _graphs[screen_only] = build_graph(screen_only=screen_only)
+    return _graphs[screen_only]
+
+
+def new_application_state(user_profile: str, cover_letter: str, application_id: Optional[str] = None,
+                          scoring_mode: bool = False, streaming: bool = False,
+                          tenant_id: Optional[str] = None) -> AppState:
+    """Build the initial state for an application, storing its inputs when it has an id."""
     initial: AppState = {
         "user_profile": user_profile,
         "cover_letter": cover_letter,
     }
-
-    app = build_graph()
-    final_state = app.invoke(initial)
+    if tenant_id:
+        initial["tenant_id"] = tenant_id
+    if scoring_mode:
+        initial["scoring_mode"] = True
+    if streaming:
+        initial["streaming"] = True
+    if application_id:
+        initial["application_id"] = application_id
+        get_stage_result_store().save_application(application_id, user_profile, cover_letter, tenant_id)
+    return initial
+
+
+def finalize_application(state: AppState) -> AppState:
+    """Run the scheduling and email steps for an already screened application."""
+    if state.get("parked_stage"):
+        return state
+    with tenant_scope(state.get("tenant_id")):
+        if screening_decision(state) == "select":
+            state = profiled("organiser", _organiser_node)(state)
+        return profiled("emailer", _emailer_node)(state)
+
+
+def run_once(user_profile: str, cover_letter: str, application_id: Optional[str] = None,
+             streaming: bool = False, tenant_id: Optional[str] = None) -> Dict[str, Any]:
+    """Run the full flow once and return final state using LangGraph.
+
+    When application_id is given, the inputs and every screening stage result
+    are stored so the application can later be re-evaluated incrementally.
+    Applications parked during an LLM outage are always stored (with a
+    generated id if needed) so reevaluate.resume_parked() can finish them.
+    With streaming, large fields are dropped once no later node reads them,
+    so the final state holds no profile, cover letter or compacted inputs.
+    The application runs with its tenant's JDs, culture, slot store and
+    email settings (default tenant when tenant_id is not given).
+    """
+    started = time.monotonic()
+    with tenant_scope(tenant_id) as tenant:
+        initial = new_application_state(user_profile, cover_letter, application_id, streaming=streaming,
+                                        tenant_id=tenant_id)
+        app = get_graph()
+        with get_budget_governor().application(application_id or id(initial)), get_pipeline_profiler().application():
+            final_state = app.invoke(initial)
+    if final_state.get("parked_stage") and not application_id:
+        application_id = f"parked-{uuid.uuid4().hex[:12]}"
+        final_state["application_id"] = application_id
+        get_stage_result_store().save_application(application_id, user_profile, cover_letter, tenant_id)
+    decision = screening_decision(final_state)
+    if application_id:
+        get_stage_result_store().save_decision(application_id, decision)
+    get_tenant_metrics().record_application(tenant.tenant_id, time.monotonic() - started, decision)
     return dict(final_state)
 
 
+def run_filter_only(user_profile: str, cover_letter: str, application_id: Optional[str] = None,
+                    tenant_id: Optional[str] = None) -> Dict[str, Any]:
+    """Compact, extract features and filter an application now, deferring the rest of the flow.
+
+    Used by admission control under overload: the inputs and the filter
+    result are stored and the application is marked 'deferred' (with a
+    generated id if needed), so reevaluate.resume_deferred() later runs the
+    JD and cultural stages, scheduling and email from where it stopped. No
+    slots are held and no email is sent.
+    """
+    application_id = application_id or f"deferred-{uuid.uuid4().hex[:12]}"
+    with tenant_scope(tenant_id):
+        state = new_application_state(user_profile, cover_letter, application_id, tenant_id=tenant_id)
+        with get_budget_governor().application(application_id), get_pipeline_profiler().application():
+            state = profiled("compact", timed("compact", _compact_node))(state)
+            state = profiled("features", timed("features", _features_node))(state)
+            state = profiled("filter", timed("filter", _recorded("filter", _filter_node)))(state)
+    decision = "deferred" if not state.get("parked_stage") else screening_decision(state)
+    get_stage_result_store().save_decision(application_id, decision)
+    return dict(state)
+
+
+def run_batch(applications: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Run many applications, pausing admission once the budget's hard cap is reached.
+
+    Each application is a dict with 'user_profile', 'cover_letter' and
+    optionally 'application_id' and 'tenant_id'. Returns the final states, whether the batch
+    was paused, the applications still pending (an iterator, so a paused batch
+    can be resumed with a new budget), the number parked during an LLM outage
+    and the budget snapshot. Every final state is also appended to the
+    result store.
+    """
+    governor = get_budget_governor()
+    results = []
+    iterator = iter(applications)
+    with ResultsWriter(get_result_store()) as writer:
+        for application in iterator:
+            if not governor.admit():
+                print(f"\n⏸️  Budget hard cap reached - admission paused. {governor.format_burn_down()}")
+                return {
+                    "results": results,
+                    "paused": True,
+                    "parked": sum(1 for state in results if state.get("parked_stage")),
+                    "pending": itertools.chain([application], iterator),
+                    "budget": governor.snapshot(),
+                }
+            final_state = run_once(
+                application["user_profile"],
+                application["cover_letter"],
+                application.get("application_id"),
+                tenant_id=application.get("tenant_id"),
+            )
+            writer.add(final_state)
+            results.append(final_state)
+            print(governor.format_burn_down())
+    profiler = get_pipeline_profiler()
+    if profiler.enabled:
+        print(f"\n🔬 Pipeline profile written to {profiler.write_report()}")
+    parked = sum(1 for state in results if state.get("parked_stage"))
+    if parked:
+        print(f"\n⛔ {parked} applications parked while the LLM was unavailable "
+              f"(circuit {get_circuit_breaker().snapshot()['state']}). Run reevaluate.py --parked to finish them.")
+    return {"results": results, "paused": False, "pending": iter(()), "parked": parked,
+            "budget": governor.snapshot()}
+
+
+def stream_batch(applications: Iterable[Dict[str, Any]], on_result=None) -> Dict[str, Any]:
+    """Run applications with memory that stays flat however many there are.
+
+    Applications are pulled from the iterable one at a time, so it can be a
+    lazy reader (see streaming.read_applications). Every application gets an
+    id (generated if missing) so its inputs are kept in the stage result
+    store and can be dropped from the state right after compaction; other
+    fields are dropped once no later node reads them. Each final state is
+    handed to the result store writer and on_result(state), then released;
+    only counts are kept. Pauses like run_batch at the budget's hard cap.
+
+    Returns:
+        dict: 'processed', 'decisions' (decision -> count), 'paused',
+              'pending', 'parked' and 'budget'
+    """
+    governor = get_budget_governor()
+    decisions: Dict[str, int] = {}
+    processed = 0
+    iterator = iter(applications)
+
+    def summary(paused, pending):
+        return {
+            "processed": processed,
+            "decisions": decisions,
+            "paused": paused,
+            "pending": pending,
+            "parked": sum(count for decision, count in decisions.items() if decision.startswith("parked:")),
+            "budget": governor.snapshot(),
+        }
+
+    with ResultsWriter(get_result_store()) as writer:
+        for application in iterator:
+            if not governor.admit():
+                print(f"\n⏸️  Budget hard cap reached - admission paused. {governor.format_burn_down()}")
+                return summary(True, itertools.chain([application], iterator))
+            final_state = run_once(
+                application["user_profile"],
+                application["cover_letter"],
+                application.get("application_id") or f"app-{uuid.uuid4().hex[:12]}",
+                streaming=True,
+                tenant_id=application.get("tenant_id"),
+            )
+            writer.add(final_state)
+            if on_result is not None:
+                on_result(final_state)
+            decision = screening_decision(final_state)
+            decisions[decision] = decisions.get(decision, 0) + 1
+            processed += 1
+    return summary(False, iter(()))
+
+
 if __name__ == "__main__":
     # Test profiles and cover letters for experimentation
     
@@ -278,37 +753,43 @@ if __name__ == "__main__":
     print("=" * 80)
     print("TESTING PROFILE 1: HR Professional")
     print("=" * 80)
-    out = run_once(profile_1, cover_letter_1)
+    out = run_once(profile_1, cover_letter_1, application_id="demo-1")
+    get_result_store().write(out)
     #print("Final Email:\n", out.get("final_email", "<no email>"))
     
     print("\n" + "=" * 80)
     print("TESTING PROFILE 2: B.Tech Student")
     print("=" * 80)
-    out = run_once(profile_2, cover_letter_2)
+    out = run_once(profile_2, cover_letter_2, application_id="demo-2")
+    get_result_store().write(out)
     #print("Final Email:\n", out.get("final_email", "<no email>"))
     
     print("\n" + "=" * 80)
     print("TESTING PROFILE 3: Seasoned Software Engineer")
     print("=" * 80)
-    out = run_once(profile_3, cover_letter_3)
+    out = run_once(profile_3, cover_letter_3, application_id="demo-3")
+    get_result_store().write(out)
     #print("Final Email:\n", out.get("final_email", "<no email>"))
     
     print("\n" + "=" * 80)
     print("TESTING PROFILE 4: Software Engineer (WFH preference)")
     print("=" * 80)
-    out = run_once(profile_4, cover_letter_4)
+    out = run_once(profile_4, cover_letter_4, application_id="demo-4")
+    get_result_store().write(out)
     #print("Final Email:\n", out.get("final_email", "<no email>"))
     
     print("\n" + "=" * 80)
     print("TESTING PROFILE 5: B2C Sales (doesn't match)")
     print("=" * 80)
-    out = run_once(profile_5, cover_letter_5)
+    out = run_once(profile_5, cover_letter_5, application_id="demo-5")
+    get_result_store().write(out)
     #print("Final Email:\n", out.get("final_email", "<no email>"))
     
     print("\n" + "=" * 80)
     print("TESTING PROFILE 6: B2B Sales (matches)")
     print("=" * 80)
-    out = run_once(profile_6, cover_letter_6)
+    out = run_once(profile_6, cover_letter_6, application_id="demo-6")
+    get_result_store().write(out)
     #print("Final Email:\n", out.get("final_email", "<no email>"))
 
 
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+# Environment switches read by get_cassette()
+#   LLM_CASSETTE          path of the cassette file (JSON lines)
+#   LLM_CASSETTE_MODE     "record" or "replay"
+#   LLM_REPLAY_LATENCY    "recorded" to sleep as long as the live call took,
+#                         a number of milliseconds, or 0 (default) for no delay
+#   LLM_REPLAY_ON_MISS    "error" (default) or "node": serve another recording
+#                         of the same node and function for unseen requests
+MODES = ("record", "replay")
+MISS_POLICIES = ("error", "node")
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+def request_key(kwargs):
+    """Stable hash of a chat.completions.create request."""
+    payload = json.dumps(kwargs, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def serialize_response(response):
+    """Turn a chat completion (SDK object) into plain JSON-able data."""
+    choices = []
+    for choice in response.choices:
+        message = choice.message
+        function_call = getattr(message, "function_call", None)
+        choices.append({
+            "finish_reason": getattr(choice, "finish_reason", None),
+            "message": {
+                "role": getattr(message, "role", "assistant"),
+                "content": getattr(message, "content", None),
+                "function_call": {
+                    "name": function_call.name,
+                    "arguments": function_call.arguments,
+                } if function_call else None,
+            },
+        })
+    usage = getattr(response, "usage", None)
+    return {
+        "model": getattr(response, "model", None),
+        "choices": choices,
+        "usage": {
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0),
+            "completion_tokens": getattr(usage, "completion_tokens", 0),
+            "total_tokens": getattr(usage, "total_tokens", 0),
+        } if usage else None,
+    }
+
+
+def deserialize_response(data):
+    """Rebuild an object with the attributes the pipeline reads from a chat completion."""
+    choices = []
+    for choice in data["choices"]:
+        message = choice["message"]
+        function_call = message.get("function_call")
+        choices.append(SimpleNamespace(
+            finish_reason=choice.get("finish_reason"),
+            message=SimpleNamespace(
+                role=message.get("role", "assistant"),
+                content=message.get("content"),
+                function_call=SimpleNamespace(**function_call) if function_call else None,
+            ),
+        ))
+    usage = data.get("usage")
+    return SimpleNamespace(
+        model=data.get("model"),
+        choices=choices,
+        usage=SimpleNamespace(**usage) if usage else None,
+    )
+
+
+def _function_name(kwargs):
+    function_call = kwargs.get("function_call")
+    return function_call.get("name") if isinstance(function_call, dict) else None
+
+
+class Cassette:
+    """
+    Recorded LLM request/response pairs in a JSON-lines file.
+
+    In record mode every live call is appended with its latency. In replay
+    mode responses are served from memory, keyed by a hash of the full
+    request, so a replayed run makes no network calls and, without
+    simulated latency, runs as fast as the local node logic allows.
+    """
+
+    def __init__(self, path, mode="replay", latency="0", on_miss="error"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}. Expected one of {MODES}")
+        if on_miss not in MISS_POLICIES:
+            raise ValueError(f"Unknown miss policy {on_miss!r}. Expected one of {MISS_POLICIES}")
+        self.path = path
+        self.mode = mode
+        self.latency = str(latency)
+        self.on_miss = on_miss
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._by_node = {}
+        self._next = {}
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._add(json.loads(line))
+
+    def _add(self, entry):
+        self._entries.setdefault(entry["key"], []).append(entry)
+        self._by_node.setdefault((entry["node"], entry.get("function")), []).append(entry)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def record(self, node, kwargs, response, latency):
+        """Append a live request/response pair to the cassette."""
+        entry = {
+            "key": request_key(kwargs),
+            "node": node,
+            "function": _function_name(kwargs),
+            "request": kwargs,
+            "response": serialize_response(response),
+            "latency": round(latency, 4),
+        }
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._add(entry)
+            self.recorded += 1
+
+    def _pick(self, candidates, key):
+        # Cycle through repeated recordings of the same request
+        i = self._next.get(key, 0)
+        self._next[key] = i + 1
+        return candidates[i % len(candidates)]
+
+    def replay(self, node, kwargs):
+        """
+        Serve the recorded response for a request.
+
+        Raises:
+            CassetteMiss: No recording matches and on_miss is "error"
+        """
+        key = request_key(kwargs)
+        with self._lock:
+            if key in self._entries:
+                entry = self._pick(self._entries[key], key)
+                self.hits += 1
+            else:
+                self.misses += 1
+                node_key = (node, _function_name(kwargs))
+                if self.on_miss != "node" or node_key not in self._by_node:
+                    raise CassetteMiss(f"No recorded response for {node} request {key[:12]}")
+                entry = self._pick(self._by_node[node_key], node_key)
+
+        delay = entry.get("latency", 0) if self.latency == "recorded" else float(self.latency) / 1000
+        if delay > 0:
+            time.sleep(delay)
+        return deserialize_response(entry["response"])
+
+    def stats(self):
+        with self._lock:
+            by_node = {}
+            for (node, _), entries in self._by_node.items():
+                by_node[node] = by_node.get(node, 0) + len(entries)
+            return {
+                "path": self.path,
+                "mode": self.mode,
+                "entries": len(self),
+                "by_node": by_node,
+                "hits": self.hits,
+                "misses": self.misses,
+                "recorded": self.recorded,
+            }
+
+
+_cassette = None
+_cassette_loaded = False
+_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    """Return the process-wide cassette configured from the environment, or None."""
+    global _cassette, _cassette_loaded
+    if _cassette_loaded:
+        return _cassette
+    with _cassette_lock:
+        if not _cassette_loaded:
+            path = os.getenv("LLM_CASSETTE")
+            if path:
+                _cassette = Cassette(
+                    path,
+                    mode=os.getenv("LLM_CASSETTE_MODE", "replay"),
+                    latency=os.getenv("LLM_REPLAY_LATENCY", "0"),
+                    on_miss=os.getenv("LLM_REPLAY_ON_MISS", "error"),
+                )
+            _cassette_loaded = True
+    return _cassette
+
+
+def set_cassette(cassette):
+    """Use a specific cassette (or None for live calls) for this process."""
+    global _cassette, _cassette_loaded
+    with _cassette_lock:
+        _cassette = cassette
+        _cassette_loaded = True
+
+
+def main():
+    """Summarise the cassette named by LLM_CASSETTE."""
+    cassette = get_cassette()
+    if cassette is None:
+        print("Set LLM_CASSETTE to a cassette path (and LLM_CASSETTE_MODE=record|replay).")
+        return
+    stats = cassette.stats()
+    print(f"Cassette: {stats['path']} ({stats['mode']} mode)")
+    print(f"Recorded calls: {stats['entries']}")
+    for node, count in sorted(stats["by_node"].items()):
+        print(f"  {node}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+
+# Environment switches read by get_circuit_breaker()
+#   LLM_BREAKER_FAILURES        consecutive outage errors that open the circuit (default 5)
+#   LLM_BREAKER_RESET_SECONDS   how long the circuit stays open before a probe call (default 30)
+
+# OpenAI SDK errors that mean the provider is unavailable rather than the request being wrong
+OUTAGE_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "InternalServerError",
+    "RateLimitError",
+    "ServiceUnavailableError",
+}
+
+
+class LLMUnavailableError(RuntimeError):
+    """
+    The LLM provider cannot be reached, or the circuit breaker is open.
+
+    Nodes catch this to take their degraded path instead of turning the
+    failure into a rejection.
+    """
+
+
+def is_outage_error(error):
+    """True for connection problems, timeouts, rate limiting and 5xx responses."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if type(error).__name__ in OUTAGE_ERROR_NAMES:
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and status >= 500
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker around live LLM calls.
+
+    Closed: calls go through; failure_threshold consecutive outage errors
+    open the circuit. Open: calls fail immediately with LLMUnavailableError
+    for reset_timeout seconds. Half-open: one probe call is let through;
+    success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self.times_opened = 0
+        self.short_circuited = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+        )
+
+    def _admit(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "closed" or (self.state == "half_open" and not self._probing):
+                if self.state == "half_open":
+                    self._probing = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def _on_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def _on_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def call(self, fn):
+        """
+        Run fn() through the breaker.
+
+        Raises:
+            LLMUnavailableError: The circuit is open, or fn() failed with an outage error
+        """
+        if not self._admit():
+            raise LLMUnavailableError("LLM circuit open: provider unavailable")
+        try:
+            result = fn()
+        except Exception as e:
+            if not is_outage_error(e):
+                # The provider answered; the request itself was bad
+                self._on_success()
+                raise
+            self._on_failure()
+            raise LLMUnavailableError(f"LLM provider unavailable: {e}") from e
+        self._on_success()
+        return result
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.times_opened,
+                "short_circuited": self.short_circuited,
+            }
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker():
+    """Return the process-wide circuit breaker, configured from the environment on first use."""
+    global _breaker
+    if _breaker is not None:
+        return _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker.from_env()
+    return _breaker
+
+
+def set_circuit_breaker(breaker):
+    global _breaker
+    with _breaker_lock:
+        _breaker = breaker
@@ -0,0 +1,90 @@
+import os
+import time
+from openai import OpenAI
+from dotenv import load_dotenv
+
+from budget import get_budget_governor
+from llm_cassette import get_cassette
+from llm_circuit import get_circuit_breaker
+from llm_hedging import get_hedger
+from llm_singleflight import get_single_flight
+from tenants import current_tenant_id, get_fair_share_limiter, get_tenant_metrics
+
+load_dotenv()
+
+_client = None
+
+
+def get_openai_client():
+    global _client
+    if _client is not None:
+        return _client
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY not found in environment variables")
+    _client = OpenAI(api_key=api_key)
+    return _client
+
+
+def _live_completion(node, kwargs):
+    started = time.perf_counter()
+    response = get_openai_client().chat.completions.create(**kwargs)
+    cassette = get_cassette()
+    if cassette is not None:
+        cassette.record(node, kwargs, response, time.perf_counter() - started)
+    return response
+
+
+def create_chat_completion(node, **kwargs):
+    """
+    Call chat.completions.create on behalf of a pipeline node.
+
+    Every LLM call in the pipeline goes through here, so usage can be
+    charged to the budget governor per node and per application. With a
+    cassette configured (LLM_CASSETTE), calls are recorded to it or
+    replayed from it instead of reaching the API. Live calls of nodes
+    listed in LLM_HEDGE_NODES are hedged (see llm_hedging), and all live
+    calls go through the circuit breaker (see llm_circuit). Identical live
+    requests in flight at the same time share one upstream call, which is
+    billed once (see llm_singleflight). Live calls wait for a place in the
+    LLM concurrency shared fairly between tenants, and usage is also
+    charged to the current tenant (see tenants).
+
+    Args:
+        node (str): Pipeline step making the call, e.g. "filter" or "emailer"
+        **kwargs: Arguments for chat.completions.create
+
+    Returns:
+        The chat completion response
+
+    Raises:
+        LLMUnavailableError: The provider is down or the circuit is open
+    """
+    governor = get_budget_governor()
+    tenant_id = current_tenant_id()
+
+    def bill(response):
+        usage = getattr(response, "usage", None)
+        cost = governor.record_usage(node, kwargs.get("model"), usage)
+        get_tenant_metrics().record_llm(tenant_id, usage, cost)
+
+    cassette = get_cassette()
+    if cassette is not None and cassette.mode == "replay":
+        response = cassette.replay(node, kwargs)
+    else:
+        response, shared = get_single_flight().call(node, kwargs, lambda: get_fair_share_limiter().call(
+            tenant_id,
+            lambda: get_circuit_breaker().call(
+                lambda: get_hedger().call(
+                    node,
+                    kwargs,
+                    lambda request: _live_completion(node, request),
+                    # Duplicates that lost are still billed
+                    on_extra=bill,
+                )
+            ),
+        ))
+        if shared:
+            return response
+    bill(response)
+    return response
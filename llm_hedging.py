@@ -0,0 +1,287 @@
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from budget import estimate_cost
+
+# Environment switches read by get_hedger()
+#   LLM_HEDGE_NODES             comma-separated nodes to hedge, or "all" (default: none)
+#   LLM_HEDGE_PERCENTILE        fire the duplicate after this latency percentile (default 95)
+#   LLM_HEDGE_MAX_EXTRA_RATIO   most duplicate calls per call of a node (default 0.1)
+#   LLM_HEDGE_MAX_EXTRA_USD     most spent on duplicate calls that lost (optional)
+MIN_SAMPLES = 20
+WINDOW = 500
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q / 100), len(ordered) - 1)]
+
+
+def is_valid_response(kwargs, response):
+    """A response counts if it carries the requested function call with JSON arguments, or any content."""
+    try:
+        message = response.choices[0].message
+    except (AttributeError, IndexError):
+        return False
+    requested = kwargs.get("function_call")
+    if isinstance(requested, dict):
+        function_call = getattr(message, "function_call", None)
+        if function_call is None or function_call.name != requested.get("name"):
+            return False
+        try:
+            json.loads(function_call.arguments)
+        except (TypeError, ValueError):
+            return False
+        return True
+    return bool(getattr(message, "content", None) or getattr(message, "function_call", None))
+
+
+class Hedger:
+    """
+    Opt-in request hedging for slow LLM nodes.
+
+    For a hedged node, a call that has not returned within the node's
+    observed latency percentile gets a duplicate, and the first valid
+    response wins. The loser still runs to completion (and is billed), so
+    duplicates are capped both as a share of the node's calls and in USD.
+    Latencies of the original requests are kept, so the report can compare
+    the tail latency the pipeline saw with the tail it would have seen
+    without hedging.
+    """
+
+    def __init__(self, nodes=(), percentile=95, max_extra_ratio=0.1, max_extra_usd=None, max_workers=32):
+        self.nodes = set(nodes)
+        self.percentile = percentile
+        self.max_extra_ratio = max_extra_ratio
+        self.max_extra_usd = max_extra_usd
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.extra_cost = 0.0
+
+    @classmethod
+    def from_env(cls):
+        nodes = [n.strip() for n in os.getenv("LLM_HEDGE_NODES", "").split(",") if n.strip()]
+        max_extra_usd = os.getenv("LLM_HEDGE_MAX_EXTRA_USD")
+        return cls(
+            nodes=nodes,
+            percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")),
+            max_extra_ratio=float(os.getenv("LLM_HEDGE_MAX_EXTRA_RATIO", "0.1")),
+            max_extra_usd=float(max_extra_usd) if max_extra_usd else None,
+        )
+
+    def enabled(self, node):
+        return "all" in self.nodes or node in self.nodes
+
+    def _node_stats(self, node):
+        stats = self._stats.get(node)
+        if stats is None:
+            stats = self._stats[node] = {
+                "calls": 0,
+                "hedges": 0,
+                "hedge_wins": 0,
+                "extra_cost": 0.0,
+                "original": deque(maxlen=WINDOW),
+                "observed": deque(maxlen=WINDOW),
+            }
+        return stats
+
+    def hedge_delay(self, node):
+        """Seconds to wait before duplicating a call, or None until enough latencies are known."""
+        with self._lock:
+            original = self._node_stats(node)["original"]
+            if len(original) < MIN_SAMPLES:
+                return None
+            return _percentile(original, self.percentile)
+
+    def _may_hedge(self, node):
+        with self._lock:
+            stats = self._node_stats(node)
+            if stats["hedges"] + 1 > self.max_extra_ratio * max(stats["calls"], 1):
+                return False
+            if self.max_extra_usd is not None and self.extra_cost >= self.max_extra_usd:
+                return False
+            stats["hedges"] += 1
+            return True
+
+    def _record_original(self, node, latency):
+        with self._lock:
+            self._node_stats(node)["original"].append(latency)
+
+    def _record_extra(self, node, kwargs, response, on_extra):
+        usage = getattr(response, "usage", None)
+        cost = estimate_cost(
+            kwargs.get("model"),
+            getattr(usage, "prompt_tokens", 0) or 0,
+            getattr(usage, "completion_tokens", 0) or 0,
+        )
+        with self._lock:
+            self._node_stats(node)["extra_cost"] += cost
+            self.extra_cost += cost
+        if on_extra is not None:
+            on_extra(response)
+
+    def _submit(self, fn, *args):
+        # Run in a copy of the caller's context so usage is charged to its application
+        return self._pool.submit(contextvars.copy_context().run, fn, *args)
+
+    def call(self, node, kwargs, call_fn, on_extra=None):
+        """
+        Make an LLM call, hedging it if the node is enabled and has a latency profile.
+
+        Args:
+            node (str): Pipeline node making the call
+            kwargs (dict): Arguments for call_fn
+            call_fn: Function making the live call: call_fn(kwargs) -> response
+            on_extra: Called with the response of a duplicate that lost
+
+        Returns:
+            The first valid response
+        """
+        started = time.perf_counter()
+        delay = self.hedge_delay(node) if self.enabled(node) else None
+        with self._lock:
+            self._node_stats(node)["calls"] += 1
+
+        def timed():
+            begun = time.perf_counter()
+            response = call_fn(kwargs)
+            return response, time.perf_counter() - begun
+
+        if delay is None:
+            response, latency = timed()
+            self._record_original(node, latency)
+            with self._lock:
+                self._node_stats(node)["observed"].append(latency)
+            return response
+
+        original = self._submit(timed)
+        original.add_done_callback(
+            lambda f: f.exception() is None and self._record_original(node, f.result()[1])
+        )
+        done, _ = wait([original], timeout=delay)
+        pending = [original]
+        if not done and self._may_hedge(node):
+            pending.append(self._submit(timed))
+
+        # First valid response wins; an invalid one is only returned if nothing better arrives
+        winner, fallback, error = None, None, None
+        while pending and winner is None:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                if future.exception() is not None:
+                    error = error or future.exception()
+                elif winner is None and is_valid_response(kwargs, future.result()[0]):
+                    winner = future
+                elif winner is None and fallback is None:
+                    fallback = future
+                else:
+                    self._record_extra(node, kwargs, future.result()[0], on_extra)
+        if winner is None:
+            winner = fallback
+        elif fallback is not None:
+            self._record_extra(node, kwargs, fallback.result()[0], on_extra)
+
+        # A still-running duplicate is billed when it finishes
+        for future in pending:
+            future.add_done_callback(
+                lambda f: f.exception() is None and self._record_extra(node, kwargs, f.result()[0], on_extra)
+            )
+        with self._lock:
+            stats = self._node_stats(node)
+            stats["observed"].append(time.perf_counter() - started)
+            if winner is not None and winner is not original:
+                stats["hedge_wins"] += 1
+        if winner is None:
+            raise error
+        return winner.result()[0]
+
+    def report(self):
+        """
+        Tail latency with hedging against the original requests, per node.
+
+        Returns:
+            dict: Per node: calls, hedges, hedge_wins, extra_call_ratio,
+                  extra_cost_usd, and p50/p95/p99 of original and observed latency
+        """
+        with self._lock:
+            report = {}
+            for node, stats in self._stats.items():
+                original, observed = list(stats["original"]), list(stats["observed"])
+                entry = {
+                    "calls": stats["calls"],
+                    "hedges": stats["hedges"],
+                    "hedge_wins": stats["hedge_wins"],
+                    "extra_call_ratio": round(stats["hedges"] / stats["calls"], 3) if stats["calls"] else 0.0,
+                    "extra_cost_usd": round(stats["extra_cost"], 4),
+                }
+                for q in (50, 95, 99):
+                    entry[f"original_p{q}"] = _percentile(original, q)
+                    entry[f"observed_p{q}"] = _percentile(observed, q)
+                report[node] = entry
+            return report
+
+
+_hedger = None
+_hedger_lock = threading.Lock()
+
+
+def get_hedger():
+    """Return the process-wide hedger, configured from the environment on first use."""
+    global _hedger
+    if _hedger is not None:
+        return _hedger
+    with _hedger_lock:
+        if _hedger is None:
+            _hedger = Hedger.from_env()
+    return _hedger
+
+
+def set_hedger(hedger):
+    global _hedger
+    with _hedger_lock:
+        _hedger = hedger
+
+
+def main():
+    """Hedge a simulated heavy-tailed LLM endpoint and report the effect."""
+    from types import SimpleNamespace
+
+    def slow_call(kwargs):
+        # Mostly ~50ms, with 1 in 20 calls stalling for ~1s
+        time.sleep(1.0 if random.random() < 0.05 else random.uniform(0.03, 0.07))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(
+                content=None,
+                function_call=SimpleNamespace(name="schedule_interview", arguments="{}"),
+            ))],
+            usage=SimpleNamespace(prompt_tokens=800, completion_tokens=150),
+        )
+
+    hedger = Hedger(nodes=["organiser"], percentile=90, max_extra_ratio=0.15)
+    kwargs = {"model": "gpt-4", "function_call": {"name": "schedule_interview"}}
+    for _ in range(300):
+        hedger.call("organiser", kwargs, slow_call)
+
+    stats = hedger.report()["organiser"]
+    print("Hedged Requests (simulated organiser endpoint):")
+    print("=" * 50)
+    print(f"Calls: {stats['calls']}, duplicates fired: {stats['hedges']} "
+          f"({stats['extra_call_ratio']:.1%}), duplicates won: {stats['hedge_wins']}")
+    print(f"Extra spend on losing calls: ${stats['extra_cost_usd']:.4f}")
+    for q in (50, 95, 99):
+        print(f"p{q}: {stats[f'original_p{q}'] * 1000:.0f}ms without hedging -> "
+              f"{stats[f'observed_p{q}'] * 1000:.0f}ms with hedging")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+
+from budget import estimate_cost
+from llm_cassette import request_key
+
+# Environment switches read by get_single_flight()
+#   LLM_SINGLE_FLIGHT           "0" to turn coalescing off (default on)
+#   LLM_SINGLE_FLIGHT_EXCLUDE   comma-separated nodes that always call upstream
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical LLM requests that are in flight at the same time.
+
+    The first caller of a request (same node, same full request) makes the
+    upstream call; callers arriving before it returns wait and receive the
+    same response, or the same error. Only the upstream call is billed.
+    Nothing is cached once the call completes, so later identical requests
+    call upstream again.
+    """
+
+    def __init__(self, enabled=True, excluded=()):
+        self.enabled = enabled
+        self.excluded = set(excluded)
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._stats = {}
+
+    @classmethod
+    def from_env(cls):
+        excluded = [n.strip() for n in os.getenv("LLM_SINGLE_FLIGHT_EXCLUDE", "").split(",") if n.strip()]
+        return cls(enabled=os.getenv("LLM_SINGLE_FLIGHT", "1") != "0", excluded=excluded)
+
+    def _node_stats(self, node):
+        stats = self._stats.get(node)
+        if stats is None:
+            stats = self._stats[node] = {"calls": 0, "upstream": 0, "coalesced": 0, "saved_usd": 0.0}
+        return stats
+
+    def call(self, node, kwargs, fn):
+        """
+        Run fn() unless an identical request is already in flight.
+
+        Returns:
+            tuple: (response, shared), shared being True if the response
+                   came from another caller's upstream call
+        """
+        if not self.enabled or node in self.excluded:
+            return fn(), False
+
+        key = (node, request_key(kwargs))
+        with self._lock:
+            self._node_stats(node)["calls"] += 1
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+                self._node_stats(node)["upstream"] += 1
+
+        if not leader:
+            call.done.wait()
+            with self._lock:
+                stats = self._node_stats(node)
+                stats["coalesced"] += 1
+                if call.response is not None:
+                    usage = getattr(call.response, "usage", None)
+                    stats["saved_usd"] += estimate_cost(
+                        kwargs.get("model"),
+                        getattr(usage, "prompt_tokens", 0) or 0,
+                        getattr(usage, "completion_tokens", 0) or 0,
+                    )
+            if call.error is not None:
+                raise call.error
+            return call.response, True
+
+        try:
+            call.response = fn()
+            return call.response, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+
+    def snapshot(self):
+        """Per node: calls, upstream calls made, calls coalesced and USD saved."""
+        with self._lock:
+            return {
+                node: dict(stats, saved_usd=round(stats["saved_usd"], 4))
+                for node, stats in self._stats.items()
+            }
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight():
+    """Return the process-wide single-flight layer, configured from the environment on first use."""
+    global _single_flight
+    if _single_flight is not None:
+        return _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight.from_env()
+    return _single_flight
+
+
+def set_single_flight(single_flight):
+    global _single_flight
+    with _single_flight_lock:
+        _single_flight = single_flight
+
+
+def main():
+    """Coalesce simulated duplicate submissions arriving together."""
+    from concurrent.futures import ThreadPoolExecutor
+    from types import SimpleNamespace
+
+    def upstream():
+        time.sleep(0.2)
+        return SimpleNamespace(usage=SimpleNamespace(prompt_tokens=600, completion_tokens=80))
+
+    single_flight = SingleFlight()
+    requests = [
+        {"model": "gpt-4", "messages": [{"role": "user", "content": f"cover letter {i % 5}"}]}
+        for i in range(50)
+    ]
+    with ThreadPoolExecutor(max_workers=50) as pool:
+        list(pool.map(lambda kwargs: single_flight.call("cultural", kwargs, upstream), requests))
+
+    stats = single_flight.snapshot()["cultural"]
+    print("Single-flight Coalescing (50 concurrent requests, 5 distinct):")
+    print("=" * 50)
+    print(f"Upstream calls: {stats['upstream']}")
+    print(f"Coalesced calls: {stats['coalesced']}")
+    print(f"Saved: ${stats['saved_usd']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+import json
+import threading
+
+import cultural_fit_analyzer
+import sales_profile_jd_analyser
+import tech_profile_jd_analyser
+from llm_circuit import LLMUnavailableError
+from llm_client import create_chat_completion
+from profile_compactor import estimate_tokens
+from skill_automaton import skill_precheck
+from tenants import current_tenant
+
+# Stage -> (analyser module, single-candidate analyse function, heading of the candidate text)
+PACKABLE_STAGES = {
+    "tech_jd": (tech_profile_jd_analyser, tech_profile_jd_analyser.analyze_profile_against_jd, "Candidate Profile"),
+    "sales_jd": (sales_profile_jd_analyser, sales_profile_jd_analyser.analyze_profile_against_jd, "Candidate Profile"),
+    "cultural": (cultural_fit_analyzer, cultural_fit_analyzer.analyze_cultural_fit, "Candidate Cover Letter"),
+}
+
+# gpt-4 context window, and the completion tokens reserved per packed candidate
+CONTEXT_BUDGET = 8192
+OUTPUT_TOKENS_PER_ITEM = 90
+MAX_PACK_SIZE = 20
+
+PACKED_INSTRUCTIONS = """
+You will be given several candidates at once, each starting with a line "### Candidate <id>".
+Judge every candidate independently against the criteria above, exactly as if it were the only one.
+Instead of finalverdict, return one entry per candidate with its exact id via the batchverdicts function call.
+"""
+
+
+def packed_functions(scoring=False):
+    """Function schema returning an array of {id, verdict, rejection_reason} (plus score)."""
+    properties = {
+        "id": {"type": "string"},
+        "verdict": {"type": "string", "enum": ["select", "reject"]},
+        "rejection_reason": {
+            "type": "string",
+            "description": "Reason for rejection if verdict is reject; empty otherwise"
+        },
+    }
+    required = ["id", "verdict", "rejection_reason"]
+    if scoring:
+        properties["score"] = {"type": "integer", "minimum": 0, "maximum": 100}
+        required.append("score")
+    return [
+        {
+            "name": "batchverdicts",
+            "description": "Return a verdict for every candidate",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "results": {
+                        "type": "array",
+                        "items": {"type": "object", "properties": properties, "required": required}
+                    }
+                },
+                "required": ["results"]
+            }
+        }
+    ]
+
+
+def validate_item(item, scoring=False):
+    """
+    Turn one packed entry into an analyser result, or None if it is malformed.
+
+    Returns:
+        dict: 'verdict' and 'rejection_reason', plus 'score' in scoring mode
+    """
+    if not isinstance(item, dict) or item.get("verdict") not in ("select", "reject"):
+        return None
+    reason = item.get("rejection_reason", "")
+    if not isinstance(reason, str):
+        return None
+    result = {"verdict": item["verdict"], "rejection_reason": "" if item["verdict"] == "select" else reason}
+    if scoring:
+        score = item.get("score")
+        if isinstance(score, bool) or not isinstance(score, (int, float)):
+            return None
+        result["score"] = max(0, min(100, int(score)))
+    return result
+
+
+class PackedAnalyzer:
+    """
+    Evaluates many candidates per request for the JD and cultural-fit stages.
+
+    Candidates are packed greedily until the request would exceed the
+    context budget (system prompt, candidate texts and the completion
+    reserved per candidate) or the pack size cap, so the system prompt is
+    paid once per pack instead of once per candidate. Entries that are
+    missing, duplicated or malformed are re-run as single calls, and a pack
+    with any bad entry halves the cap for the stage; clean packs grow it
+    back by one.
+    """
+
+    def __init__(self, context_budget=CONTEXT_BUDGET, max_pack_size=MAX_PACK_SIZE):
+        self.context_budget = context_budget
+        self.max_pack_size = max_pack_size
+        self._lock = threading.Lock()
+        self._pack_caps = {}
+        self.stats = {"requests": 0, "packed_requests": 0, "items": 0, "fallback_items": 0,
+                      "system_tokens_saved": 0}
+
+    def _system_prompt(self, stage, scoring):
+        module = PACKABLE_STAGES[stage][0]
+        system_prompt = current_tenant().system_prompt(stage)
+        return system_prompt + (module.SCORING_INSTRUCTIONS if scoring else "") + PACKED_INSTRUCTIONS
+
+    def plan_packs(self, stage, items, scoring=False):
+        """
+        Split (id, text) pairs into packs that fit the context budget.
+
+        Returns:
+            list: Lists of (id, text) pairs
+        """
+        available = self.context_budget - estimate_tokens(self._system_prompt(stage, scoring))
+        with self._lock:
+            cap = self._pack_caps.get(stage, self.max_pack_size)
+        packs, current, used = [], [], 0
+        for item_id, text in items:
+            cost = estimate_tokens(text) + 10 + OUTPUT_TOKENS_PER_ITEM
+            if current and (used + cost > available or len(current) >= cap):
+                packs.append(current)
+                current, used = [], 0
+            current.append((item_id, text))
+            used += cost
+        if current:
+            packs.append(current)
+        return packs
+
+    def _call_pack(self, stage, pack, scoring):
+        heading = PACKABLE_STAGES[stage][2]
+        ids = {f"c{i}": item_id for i, (item_id, _) in enumerate(pack, 1)}
+        content = "\n\n".join(
+            f"### Candidate c{i}\n{heading}:\n{text}" for i, (_, text) in enumerate(pack, 1)
+        )
+        try:
+            resp = create_chat_completion(
+                stage,
+                model="gpt-4",
+                messages=[
+                    {"role": "system", "content": self._system_prompt(stage, scoring)},
+                    {"role": "user", "content": content}
+                ],
+                functions=packed_functions(scoring),
+                function_call={"name": "batchverdicts"}
+            )
+            fc = resp.choices[0].message.function_call
+            if not fc or fc.name != "batchverdicts":
+                return {}
+            entries = json.loads(fc.arguments or "{}").get("results")
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            print(f"Packed {stage} request failed, falling back to single calls: {e}")
+            return {}
+        if not isinstance(entries, list):
+            return {}
+
+        results = {}
+        seen = set()
+        for entry in entries:
+            packed_id = entry.get("id") if isinstance(entry, dict) else None
+            if not isinstance(packed_id, str):
+                continue
+            if packed_id in seen:
+                # Conflicting answers for one candidate: trust neither
+                results.pop(ids.get(packed_id), None)
+                continue
+            seen.add(packed_id)
+            result = validate_item(entry, scoring)
+            if packed_id in ids and result is not None:
+                results[ids[packed_id]] = result
+        return results
+
+    def analyze(self, stage, items, scoring=False, on_sent=None, partial=False):
+        """
+        Analyse many candidates for one stage.
+
+        Args:
+            stage (str): One of PACKABLE_STAGES
+            items (dict): Candidate id -> text (profile for JD stages, cover letter
+                          for cultural), all of the current tenant
+            scoring (bool): Also ask for 0-100 scores
+            on_sent (callable): Called with each candidate id whose text is sent to the LLM
+            partial (bool): If the LLM becomes unavailable, return the results
+                obtained so far (already paid for) instead of raising
+
+        Returns:
+            dict: Candidate id -> analyser result, as the single-call analyser returns it
+
+        Raises:
+            LLMUnavailableError: The LLM is unavailable (unless partial)
+        """
+        analyse_single = PACKABLE_STAGES[stage][1]
+        system_prompt = current_tenant().system_prompt(stage)
+
+        def single(text, scoring):
+            return analyse_single(text, scoring=scoring, system_prompt=system_prompt)
+
+        system_tokens = estimate_tokens(self._system_prompt(stage, scoring))
+        results = {}
+        for item_id, text in items.items():
+            rejected = skill_precheck(stage, text, scoring=scoring)
+            if rejected is not None:
+                results[item_id] = rejected
+        pending = [(item_id, text) for item_id, text in items.items() if item_id not in results]
+        try:
+            self._analyze_packs(stage, pending, scoring, single, system_tokens, results, on_sent or (lambda item_id: None))
+        except LLMUnavailableError:
+            if not partial:
+                raise
+        return results
+
+    def _analyze_packs(self, stage, pending, scoring, single, system_tokens, results, on_sent):
+        for pack in self.plan_packs(stage, pending, scoring):
+            if len(pack) == 1:
+                item_id, text = pack[0]
+                results[item_id] = single(text, scoring=scoring)
+                on_sent(item_id)
+                with self._lock:
+                    self.stats["requests"] += 1
+                    self.stats["items"] += 1
+                continue
+
+            packed = self._call_pack(stage, pack, scoring)
+            for item_id, _ in pack:
+                on_sent(item_id)
+            missing = [(item_id, text) for item_id, text in pack if item_id not in packed]
+            with self._lock:
+                cap = self._pack_caps.get(stage, self.max_pack_size)
+                if missing:
+                    self._pack_caps[stage] = max(1, len(pack) // 2)
+                else:
+                    self._pack_caps[stage] = min(self.max_pack_size, cap + 1)
+                self.stats["requests"] += 1 + len(missing)
+                self.stats["packed_requests"] += 1
+                self.stats["items"] += len(pack)
+                self.stats["fallback_items"] += len(missing)
+                self.stats["system_tokens_saved"] += system_tokens * (len(pack) - 1 - len(missing))
+            results.update(packed)
+            for item_id, text in missing:
+                results[item_id] = single(text, scoring=scoring)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, pack_caps=dict(self._pack_caps))
+
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+
+def get_packed_analyzer():
+    """Return the process-wide packed analyzer."""
+    global _analyzer
+    if _analyzer is not None:
+        return _analyzer
+    with _analyzer_lock:
+        if _analyzer is None:
+            _analyzer = PackedAnalyzer()
+    return _analyzer
+
+
+def main():
+    """Analyse sample cover letters for cultural fit in packed requests."""
+    cover_letters = {
+        "demo-1": "I take ownership end-to-end, work backwards from customers and enjoy collaborating in the office.",
+        "demo-2": "I value transparency, continuous learning and high standards, and I like working closely with my team on site.",
+        "demo-3": "I prefer working from home and keeping communication to a minimum.",
+    }
+    analyzer = get_packed_analyzer()
+    print("Packed Cultural Fit Analysis:")
+    print("=" * 50)
+    for item_id, result in analyzer.analyze("cultural", cover_letters).items():
+        print(f"{item_id}: {result['verdict']} {result['rejection_reason']}")
+    stats = analyzer.snapshot()
+    print(f"\nRequests: {stats['requests']} for {stats['items']} candidates "
+          f"({stats['fallback_items']} fell back to single calls)")
+    print(f"System prompt tokens saved: {stats['system_tokens_saved']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+import heapq
+import itertools
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+
+# Environment switches read by PriorityScheduler.from_env()
+#   PRIORITY_WEIGHTS        class=weight pairs, e.g. "referral=6,priority_role=3,bulk=1"
+#   PRIORITY_SLA_SECONDS    class=seconds pairs: time-to-email target of each class
+#   PRIORITY_URGENCY_SECONDS  serve by deadline once one is this close (default 300)
+
+# Weighted share of the pipeline and time-to-email target per priority class.
+# Unknown or missing classes are treated as bulk.
+DEFAULT_CLASSES = {
+    "referral": {"weight": 6, "sla_seconds": 3600},
+    "priority_role": {"weight": 3, "sla_seconds": 4 * 3600},
+    "bulk": {"weight": 1, "sla_seconds": 48 * 3600},
+}
+DEFAULT_CLASS = "bulk"
+LATENCY_WINDOW = 10000
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q / 100), len(ordered) - 1)]
+
+
+def _parse_pairs(text):
+    pairs = {}
+    for part in (text or "").split(","):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            pairs[name.strip()] = float(value)
+    return pairs
+
+
+class _Entry:
+    __slots__ = ("application", "priority_class", "submitted_at", "deadline")
+
+    def __init__(self, application, priority_class, submitted_at, deadline):
+        self.application = application
+        self.priority_class = priority_class
+        self.submitted_at = submitted_at
+        self.deadline = deadline
+
+
+class PriorityScheduler:
+    """
+    Priority queue in front of the graph.
+
+    Classes share the workers by weight (start-time fair queueing: each class
+    carries a virtual time that advances by 1/weight per application served,
+    and the backlogged class with the lowest virtual time goes next), so bulk
+    keeps a share however many referrals arrive. Within a class, applications
+    are ordered by deadline: an explicit one (e.g. a competing offer) or the
+    class SLA counted from submission. Once the earliest deadline in any
+    class is within the urgency window it is served first, which is also
+    what keeps long-waiting bulk applications from starving.
+    """
+
+    def __init__(self, classes=None, urgency_seconds=300.0, default_class=DEFAULT_CLASS, clock=time.monotonic):
+        self.classes = classes or DEFAULT_CLASSES
+        self.default_class = default_class
+        self.urgency_seconds = urgency_seconds
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._queues = {name: [] for name in self.classes}
+        self._tags = {name: 0.0 for name in self.classes}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        self._closed = False
+        self._stats = {
+            name: {"submitted": 0, "completed": 0, "failed": 0, "urgent": 0, "missed": 0,
+                   "latencies": deque(maxlen=LATENCY_WINDOW)}
+            for name in self.classes
+        }
+
+    @classmethod
+    def from_env(cls):
+        weights = _parse_pairs(os.getenv("PRIORITY_WEIGHTS"))
+        slas = _parse_pairs(os.getenv("PRIORITY_SLA_SECONDS"))
+        classes = {
+            name: {
+                "weight": weights.get(name, spec["weight"]),
+                "sla_seconds": slas.get(name, spec["sla_seconds"]),
+            }
+            for name, spec in DEFAULT_CLASSES.items()
+        }
+        return cls(classes=classes, urgency_seconds=float(os.getenv("PRIORITY_URGENCY_SECONDS", "300")))
+
+    def submit(self, application, priority_class=None, deadline=None):
+        """
+        Queue an application.
+
+        Args:
+            application (dict): Application with 'user_profile' and 'cover_letter'
+            priority_class (str): Class name (default: application['priority_class'], else the default class)
+            deadline (float): Latest time to email, on the scheduler clock
+                              (default: application['deadline'], else the class SLA)
+        """
+        name = priority_class or application.get("priority_class")
+        if name not in self.classes:
+            name = self.default_class
+        now = self.clock()
+        deadline = deadline if deadline is not None else application.get("deadline")
+        sla_deadline = now + self.classes[name]["sla_seconds"]
+        entry = _Entry(application, name, now, min(deadline, sla_deadline) if deadline else sla_deadline)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            queue = self._queues[name]
+            if not queue:
+                # A class that was idle gets no credit for the time it had nothing queued
+                self._tags[name] = max(self._tags[name], self._virtual_time)
+            heapq.heappush(queue, (entry.deadline, next(self._seq), entry))
+            self._stats[name]["submitted"] += 1
+            self._cond.notify()
+
+    def close(self):
+        """No more submissions; workers exit once the queues are empty."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def _pick(self):
+        backlogged = [name for name, queue in self._queues.items() if queue]
+        if not backlogged:
+            return None
+        urgent = min(backlogged, key=lambda name: self._queues[name][0][:2])
+        if self._queues[urgent][0][0] - self.clock() <= self.urgency_seconds:
+            name = urgent
+            self._stats[name]["urgent"] += 1
+        else:
+            name = min(backlogged, key=lambda n: self._tags[n])
+        self._virtual_time = self._tags[name]
+        self._tags[name] += 1.0 / self.classes[name]["weight"]
+        return heapq.heappop(self._queues[name])[2]
+
+    def next(self, timeout=None):
+        """
+        Take the next application to run, waiting for one if needed.
+
+        Returns:
+            _Entry: The entry, or None once the scheduler is closed and drained
+                    (or the timeout expired)
+        """
+        with self._cond:
+            while True:
+                entry = self._pick()
+                if entry is not None or self._closed:
+                    return entry
+                if not self._cond.wait(timeout):
+                    return None
+
+    def drain(self):
+        """Remove and return every queued application, in scheduling order."""
+        with self._cond:
+            entries = []
+            entry = self._pick()
+            while entry is not None:
+                entries.append(entry.application)
+                entry = self._pick()
+            return entries
+
+    def complete(self, entry):
+        """Record that an application's email went out."""
+        now = self.clock()
+        with self._cond:
+            stats = self._stats[entry.priority_class]
+            stats["completed"] += 1
+            stats["latencies"].append(now - entry.submitted_at)
+            if now > entry.deadline:
+                stats["missed"] += 1
+
+    def fail(self, entry, error):
+        """Record that an application failed and will not be emailed."""
+        with self._cond:
+            self._stats[entry.priority_class]["failed"] += 1
+        print(f"Scheduled application failed ({entry.priority_class}): {error}")
+
+    def run(self, process, workers=4, on_result=None):
+        """
+        Run queued applications with worker threads until the scheduler is
+        closed and drained, or process() returns None (e.g. budget exhausted).
+        An application whose process() raises is recorded as failed and the
+        worker moves on.
+
+        Args:
+            process: process(application) -> final state, or None to stop
+            workers (int): Applications in flight at once
+            on_result: Called with every final state
+
+        Returns:
+            list: Applications taken but not run because process() stopped
+        """
+        stopped = threading.Event()
+        refused = []
+        refused_lock = threading.Lock()
+
+        def worker():
+            while not stopped.is_set():
+                entry = self.next(timeout=0.5)
+                if entry is None:
+                    if self._closed:
+                        return
+                    continue
+                try:
+                    state = process(entry.application)
+                except Exception as e:
+                    self.fail(entry, e)
+                    continue
+                if state is None:
+                    stopped.set()
+                    with refused_lock:
+                        refused.append(entry.application)
+                    return
+                self.complete(entry)
+                if on_result is not None:
+                    on_result(state)
+
+        threads = [threading.Thread(target=worker, name=f"priority-worker-{i}", daemon=True) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return refused
+
+    def report(self):
+        """
+        Time-to-email per class.
+
+        Returns:
+            dict: Per class: submitted, completed, failed, queued, served_urgent,
+                  missed_deadline and p50/p95/p99 seconds from submission to email
+        """
+        with self._cond:
+            report = {}
+            for name, stats in self._stats.items():
+                latencies = list(stats["latencies"])
+                entry = {
+                    "submitted": stats["submitted"],
+                    "completed": stats["completed"],
+                    "failed": stats["failed"],
+                    "queued": len(self._queues[name]),
+                    "served_urgent": stats["urgent"],
+                    "missed_deadline": stats["missed"],
+                }
+                for q in (50, 95, 99):
+                    value = _percentile(latencies, q)
+                    entry[f"p{q}_s"] = round(value, 3) if value is not None else None
+                report[name] = entry
+            return report
+
+
+def schedule_batch(applications, workers=4, scheduler=None, on_result=None):
+    """
+    Run applications through the graph in priority order.
+
+    Applications may carry 'priority_class' (referral, priority_role, bulk)
+    and 'deadline' (time.monotonic() seconds). Final states are appended to
+    the result store. Admission stops at the budget's hard cap like
+    lg_graph.run_batch.
+
+    Returns:
+        dict: 'results', 'pending' (applications not run), 'report' (time-to-email
+              per class) and 'budget'
+    """
+    from budget import get_budget_governor
+    from lg_graph import run_once
+    from results_store import ResultsWriter, get_result_store
+
+    scheduler = scheduler or PriorityScheduler.from_env()
+    governor = get_budget_governor()
+    results = []
+    results_lock = threading.Lock()
+
+    def process(application):
+        if not governor.admit():
+            return None
+        return run_once(application["user_profile"], application["cover_letter"], application.get("application_id"),
+                        tenant_id=application.get("tenant_id"))
+
+    for application in applications:
+        scheduler.submit(application)
+    scheduler.close()
+    with ResultsWriter(get_result_store()) as writer:
+        def collect(state):
+            writer.add(state)
+            with results_lock:
+                results.append(state)
+            if on_result is not None:
+                on_result(state)
+
+        refused = scheduler.run(process, workers=workers, on_result=collect)
+    pending = refused + scheduler.drain()
+    if pending:
+        print(f"\n⏸️  Budget hard cap reached - {len(pending)} applications left in the queue. "
+              f"{governor.format_burn_down()}")
+    return {"results": results, "pending": pending, "report": scheduler.report(), "budget": governor.snapshot()}
+
+
+def main():
+    """Compare p95 time-to-email per class with FIFO and with the priority scheduler under saturation."""
+    # Scaled-down simulation: 4 workers at ~20ms per application serve ~200/s
+    # while 300/s arrive (10% referral, 20% priority role, 70% bulk)
+    classes = {
+        "referral": {"weight": 6, "sla_seconds": 0.5},
+        "priority_role": {"weight": 3, "sla_seconds": 2.0},
+        "bulk": {"weight": 1, "sla_seconds": 60.0},
+    }
+    mix = ["referral"] * 1 + ["priority_role"] * 2 + ["bulk"] * 7
+    arrivals = [{"priority_class": random.choice(mix), "seq": i} for i in range(1500)]
+
+    def process(application):
+        time.sleep(random.uniform(0.015, 0.025))
+        return application
+
+    def feed(scheduler):
+        for application in arrivals:
+            scheduler.submit(application)
+            time.sleep(1 / 300)
+        scheduler.close()
+
+    def simulate(scheduler):
+        feeder = threading.Thread(target=feed, args=(scheduler,))
+        feeder.start()
+        scheduler.run(process, workers=4)
+        feeder.join()
+        return scheduler.report()
+
+    # FIFO: one class, latencies regrouped by the real class afterwards
+    fifo = PriorityScheduler(classes={"fifo": {"weight": 1, "sla_seconds": math.inf}}, urgency_seconds=0,
+                             default_class="fifo")
+    fifo_latency = {name: [] for name in classes}
+    fifo_complete = fifo.complete
+
+    def complete(entry):
+        fifo_complete(entry)
+        fifo_latency[entry.application["priority_class"]].append(fifo.clock() - entry.submitted_at)
+
+    fifo.complete = complete
+    simulate(fifo)
+
+    prioritized = simulate(PriorityScheduler(classes=classes, urgency_seconds=0.2))
+
+    print("Priority Scheduling under saturation (1500 applications, 300/s in, ~200/s served):")
+    print("=" * 50)
+    for name in classes:
+        fifo_p95 = _percentile(fifo_latency[name], 95)
+        stats = prioritized[name]
+        print(f"{name:14s} p95 time-to-email: FIFO {fifo_p95:.2f}s -> prioritized {stats['p95_s']:.2f}s "
+              f"(SLA {classes[name]['sla_seconds']}s, missed {stats['missed_deadline']}/{stats['completed']})")
+
+
+if __name__ == "__main__":
+    main()
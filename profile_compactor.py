@@ -0,0 +1,209 @@
+import re
+import threading
+
+try:
+    import tiktoken
+    _encoding = tiktoken.encoding_for_model("gpt-4")
+except Exception:
+    # Not installed, or the encoding could not be downloaded (offline): estimate
+    _encoding = None
+
+# Which input each node reads and how many tokens of it the node needs.
+# Only feature extraction reads the full profile (see profile_features); the
+# filter then gets just the features (its budget applies when none were
+# extracted) and the JD analysers the features plus an excerpt. The emailer
+# reads no profile, only the extracted name.
+NODE_INPUT_BUDGETS = {
+    "features": ("user_profile", 900),
+    "filter": ("user_profile", 350),
+    "tech_jd": ("user_profile", 500),
+    "sales_jd": ("user_profile", 500),
+    "cultural": ("cover_letter", 700),
+}
+
+# Lines or sentences that carry no information about the candidate
+BOILERPLATE_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in (
+        r"^references( are)? available (up)?on request\.?$",
+        r"^(curriculum vitae|resume|résumé|cv)\s*:?$",
+        r"^page \d+( of \d+)?$",
+        r"^(strictly )?(private (and|&) )?confidential\.?$",
+        r"^i hereby declare\b.*",
+        r"^declaration\s*:?.*true to the best of my knowledge.*",
+        r"^this (cv|resume|résumé) was (created|generated|made) (with|using|by|on) .*",
+        r"^sent from my \w+\.?$",
+        r"^(thank you for (your )?(time and )?consideration|thanks for reading)[.!]?$",
+    )
+]
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_INLINE_SPACE = re.compile(r"[ \t\f\v\u00a0]+")
+
+
+def estimate_tokens(text):
+    """Token count of text; exact with tiktoken installed, otherwise ~4 characters per token."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _dedupe_key(sentence):
+    return re.sub(r"[^a-z0-9]+", "", sentence.lower())
+
+
+def clean_text(text):
+    """
+    Normalize whitespace, drop boilerplate and repeated sentences.
+
+    Line structure is kept so section headings stay readable; a sentence or
+    heading that already appeared earlier in the text is dropped.
+
+    Args:
+        text (str): Raw profile or cover letter
+
+    Returns:
+        str: Cleaned text
+    """
+    seen = set()
+    lines = []
+    for raw_line in (text or "").splitlines():
+        line = _INLINE_SPACE.sub(" ", raw_line).strip()
+        if not line:
+            continue
+        kept = []
+        for sentence in _SENTENCE_SPLIT.split(line):
+            if any(pattern.match(sentence) for pattern in BOILERPLATE_PATTERNS):
+                continue
+            key = _dedupe_key(sentence)
+            if len(key) >= 3:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(sentence)
+        if kept:
+            lines.append(" ".join(kept))
+    return "\n".join(lines)
+
+
+def trim_to_budget(text, max_tokens):
+    """Keep whole sentences from the start of text until max_tokens is reached."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    kept = []
+    used = 0
+    for line in text.split("\n"):
+        sentences = []
+        line_sentences = _SENTENCE_SPLIT.split(line)
+        for sentence in line_sentences:
+            cost = estimate_tokens(sentence) + 1
+            if used + cost > max_tokens:
+                break
+            sentences.append(sentence)
+            used += cost
+        if sentences:
+            kept.append(" ".join(sentences))
+        if len(sentences) < len(line_sentences):
+            break
+    if not kept:
+        # A single sentence longer than the budget: cut it by characters
+        return text[: max_tokens * 4]
+    return "\n".join(kept)
+
+
+class CompactionStats:
+    """Running totals of tokens saved by compaction, per node, over the inputs actually sent."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inputs_sent = {}
+        self.tokens_saved = {}
+
+    def add(self, node, saved):
+        with self._lock:
+            self.inputs_sent[node] = self.inputs_sent.get(node, 0) + 1
+            self.tokens_saved[node] = self.tokens_saved.get(node, 0) + saved
+
+    def snapshot(self):
+        with self._lock:
+            return {"inputs_sent": dict(self.inputs_sent), "tokens_saved": dict(self.tokens_saved)}
+
+
+_stats = CompactionStats()
+
+
+def get_compaction_stats():
+    """Process-wide tokens-saved totals."""
+    return _stats
+
+
+def compact_application(state):
+    """
+    Compact an application's inputs once, for every node that reads them.
+
+    Nothing is added to the process-wide totals here: a node's saving is
+    counted when it sends its input (see record_sent).
+
+    Args:
+        state (dict): Application state with 'user_profile' and 'cover_letter'
+
+    Returns:
+        dict: 'compacted_inputs' (node -> text the node should send),
+              'compaction_savings' (node -> tokens the node would save against the raw input)
+              and 'raw_tokens' (node -> tokens of the raw input)
+    """
+    cleaned = {}
+    compacted = {}
+    savings = {}
+    raw_tokens = {}
+    for node, (field, budget) in NODE_INPUT_BUDGETS.items():
+        raw = state.get(field, "") or ""
+        if field not in cleaned:
+            cleaned[field] = clean_text(raw)
+        compacted[node] = trim_to_budget(cleaned[field], budget)
+        raw_tokens[node] = estimate_tokens(raw)
+        savings[node] = max(raw_tokens[node] - estimate_tokens(compacted[node]), 0)
+    return {"compacted_inputs": compacted, "compaction_savings": savings, "raw_tokens": raw_tokens}
+
+
+def node_input(state, node):
+    """Text a node should send to the LLM: its compacted input if available, else the raw field."""
+    compacted = state.get("compacted_inputs") or {}
+    if node in compacted:
+        return compacted[node]
+    return state.get(NODE_INPUT_BUDGETS[node][0], "") or ""
+
+
+def record_sent(state, node):
+    """
+    Add the tokens a node saves to the process-wide totals; call when it sends its input to the LLM.
+
+    The raw size is taken from the counts kept at compaction, since streaming
+    mode drops the raw profile and cover letter right after it.
+    """
+    raw_tokens = (state.get("raw_tokens") or {}).get(node)
+    if raw_tokens is None:
+        raw_tokens = estimate_tokens(state.get(NODE_INPUT_BUDGETS[node][0], "") or "")
+    _stats.add(node, max(raw_tokens - estimate_tokens(node_input(state, node)), 0))
+
+
+def main():
+    """Show compaction of a padded sample profile."""
+    profile = """CURRICULUM VITAE
+    Michael   Chen, Senior Software Engineer with 5 years of experience in backend development.
+
+
+    Expert in Python, FastAPI, Django, PostgreSQL, and AWS.
+    Page 1 of 2
+    Expert in Python, FastAPI, Django, PostgreSQL, and AWS.
+    I hereby declare that the above information is true to the best of my knowledge.
+    References available upon request."""
+    result = compact_application({"user_profile": profile, "cover_letter": "Thank you for your consideration."})
+    print("Compacted filter input:")
+    print(result["compacted_inputs"]["filter"])
+    print(f"\nTokens saved by node: {result['compaction_savings']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+import hashlib
+import json
+import re
+import threading
+from typing import List, Literal, Optional, TypedDict
+
+from emailer import guess_candidate_name
+from llm_circuit import LLMUnavailableError
+from llm_client import create_chat_completion
+from profile_compactor import estimate_tokens, node_input, record_sent
+from profile_filter import (
+    GRADUATION_YEAR_RE,
+    LATEST_GRADUATION_YEAR,
+    SALES_KEYWORDS,
+    TECH_KEYWORDS,
+    keyword_hits,
+)
+from skill_automaton import get_skill_automaton
+from stage_results import get_stage_result_store
+
+
+class ProfileFeatures(TypedDict, total=False):
+    name: str
+    graduation_year: Optional[int]
+    years_experience: Optional[float]
+    skills: List[str]
+    domain: Optional[Literal["tech", "sales", "other"]]
+    # "llm", or "local" when extracted with rules while the LLM was unavailable
+    source: str
+
+
+functions = [
+    {
+        "name": "profile_features",
+        "description": "Record the facts of a candidate profile that screening needs",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "name": {
+                    "type": "string",
+                    "description": "Candidate's full name without titles (Mr., Dr., ...); empty string if not found"
+                },
+                "graduation_year": {
+                    "type": ["integer", "null"],
+                    "description": "Year of the latest graduation (expected year if still studying); null if not stated"
+                },
+                "years_experience": {
+                    "type": ["number", "null"],
+                    "description": "Years of professional experience; null if not stated"
+                },
+                "skills": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Technical and sales skills, languages, tools and methodologies, in lower case"
+                },
+                "domain": {
+                    "type": "string",
+                    "enum": ["tech", "sales", "other"],
+                    "description": "tech for software or engineering backgrounds, sales for sales or business development, other otherwise"
+                }
+            },
+            "required": ["name", "graduation_year", "years_experience", "skills", "domain"]
+        }
+    }
+]
+
+SYSTEM_PROMPT = """You extract facts from candidate profiles for a screening pipeline.
+Only record what the profile states; do not guess missing values.
+
+Return the facts using the profile_features function call."""
+
+# Feature fields each node's prompt gets instead of the profile. The JD
+# analysers still read a shorter excerpt for role and responsibility evidence;
+# the emailer only needs the name and reads no profile at all.
+NODE_FEATURES = {
+    "filter": ("graduation_year", "domain", "skills"),
+    "tech_jd": ("years_experience", "graduation_year", "skills"),
+    "sales_jd": ("years_experience", "graduation_year", "skills"),
+}
+EXCERPT_NODES = ("tech_jd", "sales_jd")
+
+_FIELD_LABELS = {
+    "graduation_year": "Graduation year",
+    "years_experience": "Years of experience",
+    "domain": "Domain",
+    "skills": "Skills",
+}
+
+_YEARS_EXPERIENCE_RE = re.compile(r"\b(\d{1,2}(?:\.\d)?)\+?\s*(?:years?|yrs?|y)\b", re.IGNORECASE)
+
+_stats = {"llm": 0, "local": 0, "cached": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(source):
+    with _stats_lock:
+        _stats[source] += 1
+
+
+def feature_stats():
+    """Feature records extracted by the LLM, by local rules, and served from the cache."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def profile_hash(profile_text):
+    """Cache key of a profile's features: the extraction prompt plus the (compacted) profile text."""
+    payload = json.dumps([SYSTEM_PROMPT, functions], sort_keys=True) + "\0" + (profile_text or "")
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _normalize(arguments, profile_text):
+    year = arguments.get("graduation_year")
+    experience = arguments.get("years_experience")
+    skills = {skill.strip().lower() for skill in arguments.get("skills") or [] if isinstance(skill, str)}
+    domain = arguments.get("domain")
+    return {
+        "name": (arguments.get("name") or "").strip(),
+        "graduation_year": int(year) if isinstance(year, (int, float)) and 1950 <= year <= 2100 else None,
+        "years_experience": float(experience) if isinstance(experience, (int, float)) and experience >= 0 else None,
+        # Canonical names keep the skill prechecks and prompts consistent
+        "skills": sorted((skills - {""}) | get_skill_automaton().skills(profile_text)),
+        "domain": domain if domain in ("tech", "sales", "other") else None,
+    }
+
+
+def extract_features_locally(profile_text):
+    """
+    Extract profile features with regex patterns and the skill automaton, without the LLM.
+
+    Returns:
+        ProfileFeatures: The record; domain is None when the keywords do not decide it
+    """
+    text = profile_text or ""
+    years = [int(year) for year in GRADUATION_YEAR_RE.findall(text)]
+    experience = [float(value) for value in _YEARS_EXPERIENCE_RE.findall(text)]
+    lowered = text.lower()
+    tech, sales = keyword_hits(lowered, TECH_KEYWORDS), keyword_hits(lowered, SALES_KEYWORDS)
+    domain = None
+    if tech >= 2 and tech >= 2 * sales:
+        domain = "tech"
+    elif sales >= 2 and sales >= 2 * tech:
+        domain = "sales"
+    name = guess_candidate_name(text)
+    return {
+        "name": "" if name == "Candidate" else name,
+        "graduation_year": max(years) if years else None,
+        "years_experience": max(experience) if experience else None,
+        "skills": sorted(get_skill_automaton().skills(text)),
+        "domain": domain,
+        "source": "local",
+    }
+
+
+def extract_features(profile_text):
+    """
+    Extract the screening features of a profile with one LLM call.
+
+    Args:
+        profile_text (str): Candidate profile (compacted)
+
+    Returns:
+        ProfileFeatures: name, graduation_year, years_experience, skills and domain
+
+    Raises:
+        LLMUnavailableError: The provider is down or the circuit is open
+    """
+    try:
+        response = create_chat_completion(
+            "features",
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": f"Candidate Profile:\n\n{profile_text}"}
+            ],
+            functions=functions,
+            function_call={"name": "profile_features"}
+        )
+        function_call = response.choices[0].message.function_call
+        if function_call and function_call.name == "profile_features":
+            return dict(_normalize(json.loads(function_call.arguments or "{}"), profile_text), source="llm")
+        print("Feature extraction returned no function call - using local rules")
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error extracting profile features: {e}")
+    return extract_features_locally(profile_text)
+
+
+def get_profile_features(profile_text):
+    """
+    Features of a profile, extracted once and cached by profile hash in the stage result store.
+
+    Records extracted by local rules (LLM unavailable) are not cached, so
+    the next run asks the LLM again.
+
+    Returns:
+        tuple: (ProfileFeatures, "cached", "llm" or "local")
+    """
+    key = profile_hash(profile_text)
+    store = get_stage_result_store()
+    features = store.get_features(key)
+    if features is not None:
+        _count("cached")
+        return features, "cached"
+    try:
+        features = extract_features(profile_text)
+    except LLMUnavailableError:
+        features = extract_features_locally(profile_text)
+    if features["source"] == "llm":
+        store.save_features(key, features)
+    _count(features["source"])
+    return features, features["source"]
+
+
+def describe_features(features, fields):
+    """Render feature fields as the short text a node sends instead of the profile."""
+    lines = []
+    for field in fields:
+        value = features.get(field)
+        if isinstance(value, list):
+            value = ", ".join(value)
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        lines.append(f"{_FIELD_LABELS[field]}: {value if value not in (None, '') else 'not stated'}")
+    return "\n".join(lines)
+
+
+def apply_profile_features(state):
+    """
+    Extract (or fetch) an application's features and point the screening nodes at them.
+
+    Sets state['profile_features'] and replaces the compacted inputs of the
+    filter and JD nodes with the feature fields they need (plus the profile
+    excerpt for the JD analysers), so every later prompt, stage hash and
+    packed request uses the smaller inputs.
+
+    Args:
+        state (dict): Application state after compaction
+
+    Returns:
+        str: "cached", "llm" or "local"
+    """
+    features, source = get_profile_features(node_input(state, "features"))
+    if source == "llm":
+        record_sent(state, "features")
+    state["profile_features"] = features
+    compacted = dict(state.get("compacted_inputs") or {})
+    for node, fields in NODE_FEATURES.items():
+        summary = describe_features(features, fields)
+        if node in EXCERPT_NODES and compacted.get(node):
+            summary += f"\n\nProfile excerpt:\n{compacted[node]}"
+        compacted[node] = summary
+    state["compacted_inputs"] = compacted
+    return source
+
+
+def filter_from_features(features):
+    """
+    Filter verdict from a feature record, used while the LLM is unavailable.
+
+    Returns:
+        dict: 'verdict' and 'rejection_reason', or None if the record does not decide it
+    """
+    if not features:
+        return None
+    year = features.get("graduation_year")
+    if year is not None and year > LATEST_GRADUATION_YEAR:
+        return {"verdict": "reject", "rejection_reason": f"Graduation year {year} is after {LATEST_GRADUATION_YEAR}."}
+    if features.get("domain") in ("tech", "sales"):
+        return {"verdict": features["domain"], "rejection_reason": ""}
+    if features.get("domain") == "other" and features.get("source") == "llm":
+        return {"verdict": "reject", "rejection_reason": "Profile is not for a tech or sales role."}
+    return None
+
+
+def candidate_name(state):
+    """Name for the email greeting: from the feature record, else "Candidate"."""
+    return (state.get("profile_features") or {}).get("name") or "Candidate"
+
+
+def main():
+    """Extract the features of a sample profile and compare node input sizes with and without them."""
+    from profile_compactor import compact_application
+
+    profile = "\n".join([
+        "James Thompson, Account Executive with 4 years of experience in B2B SaaS sales.",
+        "Graduated in 2020 with a degree in Business Administration.",
+        "Experience with Salesforce CRM, MEDDICC methodology, and complex sales cycles.",
+    ] + [
+        f"{2020 + i % 5}: Closed {12 + i} enterprise deals at account {i} in the {region} region, "
+        f"running discovery, demos and negotiation with procurement and finance stakeholders."
+        for i, region in enumerate(["EMEA", "North America", "APAC", "LATAM"] * 6)
+    ])
+    state = {"user_profile": profile, "cover_letter": ""}
+    state.update(compact_application(state))
+    print("Local extraction:", extract_features_locally(profile))
+    source = apply_profile_features(state)
+    print(f"Features ({source}):", state["profile_features"])
+    print(f"\nThe profile is {estimate_tokens(profile)} tokens; feature extraction reads "
+          f"{estimate_tokens(node_input(state, 'features'))} of them once. Tokens each node then sends:")
+    for node in NODE_FEATURES:
+        print(f"  {node:10s} {estimate_tokens(node_input(state, node)):4d}")
+    print(f"  {'emailer':10s}    0 (no name extraction call; the greeting uses {candidate_name(state)!r})")
+    print("\nFilter input:\n" + node_input(state, "filter"))
+
+
+if __name__ == "__main__":
+    main()
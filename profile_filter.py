@@ -1,74 +1,119 @@
-import os
 import json
-from openai import OpenAI
-from dotenv import load_dotenv
+import re
 
-# Load environment variables
-load_dotenv()
+from llm_circuit import LLMUnavailableError
+from llm_client import create_chat_completion
 
-def get_openai_client():
-    """Get OpenAI client with API key from environment."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables")
-    return OpenAI(api_key=api_key)
 
-def filter_profile(profile_text):
-    """
-    Filter user profile to determine if they should be shortlisted for tech or sales roles.
-    
-    Args:
-        profile_text (str): User profile as a string containing all information
-        
-    Returns:
-        dict: Contains 'verdict' and 'rejection_reason' fields
-    """
-    client = get_openai_client()
-    
-    # Define the function schema for the LLM to call
-    functions = [
-        {
-            "name": "finalverdict",
-            "description": "Determine if a candidate should be shortlisted for tech or sales roles",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "verdict": {
-                        "type": "string",
-                        "enum": ["reject", "tech", "sales"],
-                        "description": "Final decision: reject if graduation year > 2025 or role mismatch, tech for technical roles, sales for sales roles"
-                    },
-                    "rejection_reason": {
-                        "type": "string",
-                        "description": "Reason for rejection if verdict is 'reject', empty string otherwise"
-                    }
+# Function schema for the LLM to call
+functions = [
+    {
+        "name": "finalverdict",
+        "description": "Determine if a candidate should be shortlisted for tech or sales roles",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "verdict": {
+                    "type": "string",
+                    "enum": ["reject", "tech", "sales"],
+                    "description": "Final decision: reject if graduation year > 2025 or role mismatch, tech for technical roles, sales for sales roles"
                 },
-                "required": ["verdict", "rejection_reason"]
-            }
+                "rejection_reason": {
+                    "type": "string",
+                    "description": "Reason for rejection if verdict is 'reject', empty string otherwise"
+                }
+            },
+            "required": ["verdict", "rejection_reason"]
         }
-    ]
-    
-    system_prompt = """You are a profile filter for shortlisting candidates for tech and sales roles.
+    }
+]
+
+
+SYSTEM_PROMPT = """You are a profile filter for shortlisting candidates for tech and sales roles.
+
+You are given the facts extracted from a candidate's profile: graduation year, domain and skills.
 
-Your task is to analyze the user profile and determine:
+Your task is to determine:
 1. If the candidate's graduation year is 2025 or earlier (if later, reject)
 2. If the profile is for tech, sales, or other roles (reject if other roles). we are looking for tech and sales roles only.
 
 Rules:
 - Only consider candidates who graduated in 2025 or earlier
-- Look for tech indicators: technical degrees, programming skills, software development experience, engineering background, etc.
-- Look for sales indicators: sales experience, business development, customer relations, B2B/B2C sales etc.
+- Look for tech indicators: a tech domain, programming languages, frameworks and engineering tools among the skills
+- Look for sales indicators: a sales domain, sales methodologies, CRM tools, B2B/B2C sales among the skills
 - Reject profiles that don't fit tech or sales roles (e.g., pure marketing, HR, finance, etc.)
 - Reject profiles with graduation year after 2025
 
 Return your decision using the finalverdict function call."""
 
+
+# Deterministic fallback used while the LLM is unavailable
+LATEST_GRADUATION_YEAR = 2025
+
+GRADUATION_YEAR_RE = re.compile(
+    r"\b(?:graduat\w*|class of|batch of|expected)\b\D{0,40}?\b((?:19|20)\d{2})\b",
+    re.IGNORECASE,
+)
+
+TECH_KEYWORDS = (
+    "software", "developer", "engineer", "engineering", "programming", "python", "java",
+    "javascript", "react", "backend", "frontend", "full-stack", "computer science", "cloud",
+    "aws", "devops", "machine learning", "data structures", "algorithms", "api", "sql",
+)
+SALES_KEYWORDS = (
+    "sales", "account executive", "business development", "quota", "b2b", "b2c", "crm",
+    "salesforce", "pipeline", "lead generation", "closing", "deals", "customer acquisition",
+)
+
+
+def keyword_hits(text, keywords):
+    """Number of keywords found as whole words in a lowercased text."""
+    return sum(1 for keyword in keywords if re.search(rf"\b{re.escape(keyword)}\b", text))
+
+
+def filter_profile_locally(profile_text):
+    """
+    Filter a profile with deterministic rules, without the LLM.
+
+    Rejects graduation years after LATEST_GRADUATION_YEAR and picks the
+    track by keyword overlap. Anything the rules cannot decide returns None
+    so the caller can park the application until the LLM is back.
+
+    Returns:
+        dict: 'verdict' and 'rejection_reason', or None if undecided
+    """
+    years = [int(year) for year in GRADUATION_YEAR_RE.findall(profile_text or "")]
+    if years and max(years) > LATEST_GRADUATION_YEAR:
+        return {
+            "verdict": "reject",
+            "rejection_reason": f"Graduation year {max(years)} is after {LATEST_GRADUATION_YEAR}.",
+        }
+    text = (profile_text or "").lower()
+    tech, sales = keyword_hits(text, TECH_KEYWORDS), keyword_hits(text, SALES_KEYWORDS)
+    if tech >= 2 and tech >= 2 * sales:
+        return {"verdict": "tech", "rejection_reason": ""}
+    if sales >= 2 and sales >= 2 * tech:
+        return {"verdict": "sales", "rejection_reason": ""}
+    return None
+
+
+def filter_profile(profile_text):
+    """
+    Filter user profile to determine if they should be shortlisted for tech or sales roles.
+    
+    Args:
+        profile_text (str): Profile features (see profile_features), or the profile itself
+        
+    Returns:
+        dict: Contains 'verdict' and 'rejection_reason' fields
+    """
     try:
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            "filter",
             model="gpt-4",
             messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Analyze this profile:\n\n{profile_text}"}
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": f"Analyze this candidate:\n\n{profile_text}"}
             ],
             functions=functions,
             function_call={"name": "finalverdict"}
@@ -89,6 +134,8 @@ Return your decision using the finalverdict function call."""
                 "rejection_reason": "Unable to process profile"
             }
             
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         print(f"Error processing profile: {e}")
         return {
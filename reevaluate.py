@@ -0,0 +1,300 @@
+import argparse
+import itertools
+
+from jd_registry import registry_routing_enabled
+from lg_graph import SCREENING_STAGES, apply_stage_result, finalize_application
+from packed_analysis import PACKABLE_STAGES, get_packed_analyzer
+from profile_compactor import compact_application, node_input, record_sent
+from profile_features import apply_profile_features
+from skill_automaton import SKILL_STAGES, skill_precheck
+from stage_results import (
+    get_stage_result_store,
+    record_stage_result,
+    screening_decision,
+    stage_input_hash,
+)
+from tenants import tenant_scope
+
+# LLM calls made by the steps after screening: the organiser (only for
+# selected candidates) and the emailer (the name comes from the profile features).
+ORGANISER_CALLS = 1
+EMAILER_CALLS = 1
+# Applications walked together by reevaluate_packed(); bounds the states in memory
+PACKED_CHUNK = 100
+
+
+class _Walk:
+    """Progress of one application through the screening stages."""
+
+    def __init__(self, application):
+        self.application = application
+        self.application_id = application["application_id"]
+        self.tenant_id = application.get("tenant_id")
+        self.state = {
+            "application_id": self.application_id,
+            "user_profile": application["user_profile"],
+            "cover_letter": application["cover_letter"],
+        }
+        if self.tenant_id:
+            self.state["tenant_id"] = self.tenant_id
+        self.stage = "filter"
+        self.rerun_stages = []
+        self.packed_stages = []
+        self.llm_calls = 0
+        self.llm_calls_avoided = 0
+        # Hashes are taken over the compacted inputs and features, as in the graph
+        self.state.update(compact_application(self.state))
+        with self.scope():
+            source = apply_profile_features(self.state)
+        if source == "llm":
+            self.llm_calls += 1
+        elif source == "cached":
+            self.llm_calls_avoided += 1
+
+    def scope(self):
+        """Context in which the application's stages run: its tenant's prompts and slots."""
+        return tenant_scope(self.tenant_id)
+
+    @property
+    def screening(self):
+        return self.stage in SCREENING_STAGES
+
+    def reuse_stored(self):
+        """Reuse the stored result of the current stage if its input hash matches. Returns True if reused."""
+        stored = get_stage_result_store().get_stage(self.application_id, self.stage)
+        if stored is None or stored[0] != stage_input_hash(self.stage, self.state):
+            return False
+        self.state.update(stored[1])
+        self.llm_calls_avoided += 1
+        self.stage = SCREENING_STAGES[self.stage][1](self.state)
+        return True
+
+    def run(self, packed_result=None):
+        """Run the current stage, or apply a result already obtained from a packed request."""
+        node, router = SCREENING_STAGES[self.stage]
+        prechecked = None
+        if packed_result is None:
+            prechecked = skill_precheck(self.stage, node_input(self.state, self.stage),
+                                        scoring=bool(self.state.get("scoring_mode")))
+        if packed_result is not None:
+            self.state = apply_stage_result(self.stage, self.state, packed_result)
+            self.packed_stages.append(self.stage)
+        elif prechecked is not None:
+            # A clear skill miss: rejected without the LLM, as the node would
+            self.state = apply_stage_result(self.stage, self.state, prechecked)
+            self.llm_calls_avoided += 1
+        else:
+            self.state = node(self.state)
+            self.llm_calls += 1
+        if not self.state.get("parked_stage") and self.stage not in (self.state.get("degraded_stages") or []):
+            record_stage_result(self.stage, self.state)
+        self.rerun_stages.append(self.stage)
+        self.stage = router(self.state)
+
+    def finish(self, notify):
+        state = self.state
+        decision = screening_decision(state)
+        downstream_calls = EMAILER_CALLS + (ORGANISER_CALLS if decision == "select" else 0)
+        result = {
+            "application_id": self.application_id,
+            "rerun_stages": self.rerun_stages,
+            "packed_stages": self.packed_stages,
+            "previous_decision": self.application["decision"],
+            "decision": decision,
+        }
+        if notify and decision != self.application["decision"] and not decision.startswith("parked:"):
+            # Only notified applications keep their state in the report
+            result["state"] = finalize_application(state)
+            self.llm_calls += downstream_calls
+        else:
+            self.llm_calls_avoided += downstream_calls
+        get_stage_result_store().save_decision(self.application_id, decision)
+        result.update(llm_calls=self.llm_calls, llm_calls_avoided=self.llm_calls_avoided)
+        return result
+
+
+def reevaluate_application(application, notify=False):
+    """
+    Re-run only the screening stages whose prompt inputs changed for one application.
+
+    Stages are walked along the routing of the graph. A stage whose stored
+    input hash still matches is reused; any other stage is re-run and stored.
+    Scheduling and email are only redone when notify is set and the
+    screening decision changed.
+
+    Args:
+        application (dict): Stored application from StageResultStore.iter_applications()
+        notify (bool): Schedule and email candidates whose decision changed
+
+    Returns:
+        dict: 'application_id', 'rerun_stages', 'packed_stages', 'llm_calls',
+              'llm_calls_avoided', 'previous_decision' and 'decision', plus
+              'state' when the candidate was notified of a changed decision
+    """
+    walk = _Walk(application)
+    with walk.scope():
+        while walk.screening:
+            if not walk.reuse_stored():
+                walk.run()
+        return walk.finish(notify)
+
+
+def reevaluate_packed(applications, notify=False, chunk_size=PACKED_CHUNK):
+    """
+    Re-evaluate many applications stage by stage, packing the JD and cultural
+    stages of all applications that need them into multi-candidate requests.
+
+    Applications are walked chunk_size at a time, so only one chunk of
+    states is in memory however many applications are stored.
+
+    Returns:
+        tuple: (per-application results, LLM requests made by the packed analyzer)
+    """
+    analyzer = get_packed_analyzer()
+    requests_before = analyzer.snapshot()["requests"]
+    applications = iter(applications)
+    results = []
+    while True:
+        walks = [_Walk(application) for application in itertools.islice(applications, chunk_size)]
+        if not walks:
+            break
+        results.extend(_reevaluate_walks(analyzer, walks, notify))
+    return results, analyzer.snapshot()["requests"] - requests_before
+
+
+def _reevaluate_walks(analyzer, walks, notify):
+    """Walk one chunk of applications through screening in packed waves."""
+    while True:
+        by_stage = {}
+        for walk in walks:
+            with walk.scope():
+                while walk.screening and walk.reuse_stored():
+                    pass
+            if walk.screening:
+                # Only applications of the same tenant share a prompt, and so a pack
+                key = (walk.stage, bool(walk.state.get("scoring_mode")), walk.tenant_id)
+                by_stage.setdefault(key, []).append(walk)
+        if not by_stage:
+            break
+        for (stage, scoring, tenant_id), group in by_stage.items():
+            packed = {}
+            # With JD_REGISTRY on, the JD stages screen against several roles per candidate
+            packable = stage in PACKABLE_STAGES and not (stage in SKILL_STAGES and registry_routing_enabled())
+            if packable and len(group) > 1:
+                with tenant_scope(tenant_id):
+                    walks_by_id = {walk.application_id: walk for walk in group}
+                    # On an outage keep the packs already answered; the rest run
+                    # singly below and take their node's degraded path
+                    packed = analyzer.analyze(
+                        stage, {walk.application_id: node_input(walk.state, stage) for walk in group}, scoring,
+                        on_sent=lambda application_id: record_sent(walks_by_id[application_id].state, stage),
+                        partial=True,
+                    )
+            for walk in group:
+                with walk.scope():
+                    walk.run(packed.get(walk.application_id))
+    results = []
+    for walk in walks:
+        with walk.scope():
+            results.append(walk.finish(notify))
+    return results
+
+
+def reevaluate(application_ids=None, notify=False, parked_only=False, packed=False, tenant_id=None,
+               deferred_only=False):
+    """
+    Incrementally re-evaluate stored applications after a JD or culture edit.
+
+    Args:
+        application_ids (list): Only re-evaluate these applications (default: all)
+        notify (bool): Schedule and email candidates whose decision changed
+        parked_only (bool): Only applications parked during an LLM outage
+        tenant_id (str): Only applications of this tenant
+        deferred_only (bool): Only applications deferred by admission control
+        packed (bool): Send the JD and cultural stages of many applications
+            in multi-candidate requests (see packed_analysis)
+
+    Returns:
+        dict: Totals plus the per-application results (ids, stages and
+              decisions; states only for notified decision changes)
+    """
+    store = get_stage_result_store()
+    applications = store.iter_applications(application_ids, parked_only=parked_only, tenant_id=tenant_id,
+                                           deferred_only=deferred_only)
+    packed_requests = 0
+    if packed:
+        results, packed_requests = reevaluate_packed(applications, notify=notify)
+    else:
+        results = [reevaluate_application(application, notify=notify) for application in applications]
+    return {
+        "applications": len(results),
+        "affected": sum(1 for r in results if r["rerun_stages"]),
+        "decision_changes": [r for r in results if r["decision"] != r["previous_decision"]],
+        "llm_calls": sum(r["llm_calls"] for r in results) + packed_requests,
+        "packed_requests": packed_requests,
+        "llm_calls_avoided": sum(r["llm_calls_avoided"] for r in results),
+        "results": results,
+    }
+
+
+def resume_parked():
+    """
+    Finish applications parked during an LLM outage: screen, schedule and email them.
+
+    Applications that hit the outage again stay parked.
+    """
+    return reevaluate(notify=True, parked_only=True)
+
+
+def resume_deferred(application_ids=None):
+    """
+    Finish applications that admission control only filtered: run the
+    remaining screening stages (reusing the stored filter result), then
+    schedule and email them.
+
+    Args:
+        application_ids (list): Only these applications (default: every deferred one)
+    """
+    return reevaluate(application_ids, notify=True, deferred_only=True)
+
+
+def main():
+    """Re-evaluate stored applications and report the LLM calls avoided."""
+    parser = argparse.ArgumentParser(description="Re-run only the screening stages whose inputs changed.")
+    parser.add_argument("application_ids", nargs="*", help="Applications to re-evaluate (default: all)")
+    parser.add_argument("--notify", action="store_true",
+                        help="Schedule and email candidates whose decision changed")
+    parser.add_argument("--parked", action="store_true",
+                        help="Finish applications parked during an LLM outage (implies --notify)")
+    parser.add_argument("--packed", action="store_true",
+                        help="Evaluate the JD and cultural stages of many applications per request")
+    parser.add_argument("--tenant", help="Only applications of this tenant, e.g. after editing its JD")
+    parser.add_argument("--deferred", action="store_true",
+                        help="Finish applications that admission control only filtered (implies --notify)")
+    args = parser.parse_args()
+
+    if args.parked:
+        report = resume_parked()
+    elif args.deferred:
+        report = resume_deferred(args.application_ids or None)
+    else:
+        report = reevaluate(args.application_ids or None, notify=args.notify, packed=args.packed,
+                            tenant_id=args.tenant)
+
+    print("\nRe-evaluation Report:")
+    print("=" * 50)
+    for r in report["results"]:
+        stages = ", ".join(r["rerun_stages"]) or "none"
+        print(f"{r['application_id']}: re-ran [{stages}] | {r['previous_decision']} -> {r['decision']}")
+    print("-" * 50)
+    print(f"Applications checked: {report['applications']}")
+    print(f"Applications affected: {report['affected']}")
+    print(f"Decisions changed: {len(report['decision_changes'])}")
+    print(f"LLM calls made: {report['llm_calls']}")
+    if report["packed_requests"]:
+        print(f"  of which packed analyzer requests: {report['packed_requests']}")
+    print(f"LLM calls avoided: {report['llm_calls_avoided']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+
+from stage_results import screening_decision
+from tenants import DEFAULT_TENANT
+
+# The results database lives next to this module unless overridden.
+DEFAULT_DB_PATH = os.getenv(
+    "RESULTS_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.db"),
+)
+
+# Long free-text AppState fields, stored zlib-compressed
+TEXT_FIELDS = ("user_profile", "cover_letter", "interview_details", "final_email")
+
+# Fields derived from the inputs that are not worth storing again
+DERIVED_FIELDS = ("compacted_inputs", "raw_tokens")
+
+# Short AppState fields stored as plain, queryable columns
+COLUMN_FIELDS = (
+    "application_id", "tenant_id",
+    "filter_verdict", "filter_reason",
+    "jd_verdict", "jd_reason", "jd_score",
+    "cultural_verdict", "cultural_reason", "cultural_score",
+    "score", "interview_type", "slots_not_found",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    created_at INTEGER NOT NULL,
+    track TEXT,
+    decided_stage TEXT NOT NULL,
+    final_verdict TEXT NOT NULL,
+    reason TEXT,
+    application_id TEXT,
+    tenant_id TEXT,
+    filter_verdict TEXT,
+    filter_reason TEXT,
+    jd_verdict TEXT,
+    jd_reason TEXT,
+    jd_score INTEGER,
+    cultural_verdict TEXT,
+    cultural_reason TEXT,
+    cultural_score INTEGER,
+    score REAL,
+    interview_type TEXT,
+    slots_not_found TEXT,
+    user_profile_z BLOB,
+    cover_letter_z BLOB,
+    interview_details_z BLOB,
+    final_email_z BLOB,
+    extra_z BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_results_outcome
+    ON results (decided_stage, final_verdict, track, created_at, reason);
+CREATE INDEX IF NOT EXISTS idx_results_track ON results (track, created_at);
+CREATE INDEX IF NOT EXISTS idx_results_created ON results (created_at);
+CREATE INDEX IF NOT EXISTS idx_results_application ON results (application_id);
+"""
+
+# Created once the tenant_id column exists (databases from before tenants gain it)
+_TENANT_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_results_tenant ON results (tenant_id, created_at);
+"""
+
+_INSERT_COLUMNS = (
+    ("created_at", "track", "decided_stage", "final_verdict", "reason")
+    + COLUMN_FIELDS
+    + tuple(f"{field}_z" for field in TEXT_FIELDS)
+    + ("extra_z",)
+)
+_INSERT_SQL = (
+    f"INSERT INTO results ({', '.join(_INSERT_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(_INSERT_COLUMNS))})"
+)
+
+# Columns a caller may group aggregates by
+GROUPABLE_COLUMNS = {"track", "decided_stage", "final_verdict", "reason", "interview_type", "tenant_id", "day"}
+
+
+def _compress(text):
+    # Level 1: most of the size win on prose at a fraction of the CPU cost
+    return zlib.compress(text.encode("utf-8"), 1) if text else None
+
+
+def _decompress(blob):
+    return zlib.decompress(blob).decode("utf-8") if blob else ""
+
+
+def _to_epoch(value):
+    """Accept epoch seconds, datetime or an ISO date/datetime string."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return int(value.timestamp())
+
+
+def outcome(state):
+    """
+    Where an application was decided and how.
+
+    Returns:
+        tuple: (decided_stage, final_verdict, reason)
+    """
+    decision = screening_decision(state)
+    if decision.startswith("parked:"):
+        return state["parked_stage"], "parked", state.get("parked_reason") or ""
+    if decision == "select":
+        return "organiser", "select", state.get("slots_not_found") or ""
+    stage = decision.split(":", 1)[1]
+    reason_field = {"filter": "filter_reason", "jd": "jd_reason", "cultural": "cultural_reason"}[stage]
+    return stage, "reject", state.get(reason_field) or ""
+
+
+def _row_for(state, created_at):
+    decided_stage, final_verdict, reason = outcome(state)
+    track = state.get("interview_type") or (
+        state.get("filter_verdict") if state.get("filter_verdict") in ("tech", "sales") else None
+    )
+    known = set(COLUMN_FIELDS) | set(TEXT_FIELDS) | set(DERIVED_FIELDS)
+    extra = {key: value for key, value in state.items() if key not in known}
+    return (
+        (created_at, track, decided_stage, final_verdict, reason)
+        + tuple(state.get(field) for field in COLUMN_FIELDS)
+        + tuple(_compress(state.get(field) or "") for field in TEXT_FIELDS)
+        + (_compress(json.dumps(extra, default=str)) if extra else None,)
+    )
+
+
+class ResultStore:
+    """
+    Append-optimized SQLite store of final AppState records.
+
+    Outcome columns (decided stage, verdict, track, time) carry a composite
+    index, so counts and group-bys are answered from the index without
+    touching the compressed text. Profiles, cover letters, interview details
+    and emails are zlib-compressed and only inflated when asked for.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+        if "tenant_id" not in columns:
+            self._conn.execute("ALTER TABLE results ADD COLUMN tenant_id TEXT")
+        self._conn.executescript(_TENANT_INDEX)
+
+    def write_batch(self, states, created_at=None):
+        """
+        Append many final states in one transaction.
+
+        Args:
+            states (iterable): Final AppState dicts
+            created_at: Timestamp for the batch (default: now)
+
+        Returns:
+            int: Number of records written
+        """
+        created_at = _to_epoch(created_at) or int(time.time())
+        rows = [_row_for(state, created_at) for state in states]
+        if rows:
+            with self._lock, self._conn:
+                self._conn.executemany(_INSERT_SQL, rows)
+        return len(rows)
+
+    def write(self, state):
+        return self.write_batch([state])
+
+    def _where(self, stage=None, verdict=None, track=None, since=None, until=None, reason_contains=None,
+               tenant_id=None):
+        clauses = []
+        params = []
+        for column, value in (("decided_stage", stage), ("final_verdict", verdict), ("track", track)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if tenant_id is not None:
+            # Results written without a tenant belong to the default one
+            clauses.append("(tenant_id = ? OR tenant_id IS NULL)" if tenant_id == DEFAULT_TENANT else "tenant_id = ?")
+            params.append(tenant_id)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(_to_epoch(since))
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(_to_epoch(until))
+        if reason_contains:
+            clauses.append("reason LIKE ?")
+            params.append(f"%{reason_contains}%")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, **filters):
+        """Number of records matching the filters (see query())."""
+        where, params = self._where(**filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM results{where}", params).fetchone()[0]
+
+    def count_by(self, group_by=("decided_stage", "final_verdict"), **filters):
+        """
+        Aggregate counts grouped by outcome columns.
+
+        Args:
+            group_by (tuple): Columns from GROUPABLE_COLUMNS; "day" groups by calendar day
+            **filters: Same filters as query()
+
+        Returns:
+            list: Dicts with the group columns and 'count', largest first
+        """
+        group_by = tuple(group_by)
+        unknown = set(group_by) - GROUPABLE_COLUMNS
+        if unknown:
+            raise ValueError(f"Cannot group by {sorted(unknown)}")
+        select = [
+            "date(created_at, 'unixepoch') AS day" if column == "day" else column
+            for column in group_by
+        ]
+        where, params = self._where(**filters)
+        sql = (
+            f"SELECT {', '.join(select)}, COUNT(*) FROM results{where} "
+            f"GROUP BY {', '.join(group_by)} ORDER BY COUNT(*) DESC"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(zip(group_by + ("count",), row)) for row in rows]
+
+    def query(self, stage=None, verdict=None, track=None, since=None, until=None,
+              reason_contains=None, limit=100, include_text=False, tenant_id=None):
+        """
+        Fetch records, newest first.
+
+        Args:
+            stage (str): Deciding stage: "filter", "jd", "cultural" or "organiser"
+            verdict (str): "select", "reject" or "parked"
+            track (str): "tech" or "sales"
+            since, until: Time bounds (epoch seconds, datetime or ISO string)
+            reason_contains (str): Substring of the deciding reason
+            limit (int): Maximum records returned
+            include_text (bool): Decompress profile, cover letter, details and email
+            tenant_id (str): Only results of this tenant
+
+        Returns:
+            list: AppState-like dicts with 'decided_stage', 'final_verdict',
+                  'reason', 'track' and 'created_at' added
+        """
+        where, params = self._where(stage, verdict, track, since, until, reason_contains, tenant_id)
+        columns = ("created_at", "track", "decided_stage", "final_verdict", "reason") + COLUMN_FIELDS
+        if include_text:
+            columns += tuple(f"{field}_z" for field in TEXT_FIELDS) + ("extra_z",)
+        sql = f"SELECT {', '.join(columns)} FROM results{where} ORDER BY created_at DESC, id DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit]).fetchall()
+
+        records = []
+        for row in rows:
+            record = dict(zip(columns, row))
+            if include_text:
+                for field in TEXT_FIELDS:
+                    record[field] = _decompress(record.pop(f"{field}_z"))
+                extra = record.pop("extra_z")
+                if extra:
+                    record.update(json.loads(_decompress(extra)))
+            records.append(record)
+        return records
+
+
+class ResultsWriter:
+    """Buffers final states and writes them to a ResultStore in batches."""
+
+    def __init__(self, store, batch_size=500):
+        self.store = store
+        self.batch_size = batch_size
+        self.written = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def add(self, state):
+        with self._lock:
+            self._buffer.append(dict(state))
+            if len(self._buffer) < self.batch_size:
+                return
+            batch, self._buffer = self._buffer, []
+        self._write(batch)
+
+    def flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        self._write(batch)
+
+    def _write(self, batch):
+        written = self.store.write_batch(batch)
+        with self._lock:
+            self.written += written
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_result_store():
+    """Return the process-wide result store."""
+    global _store
+    if _store is not None:
+        return _store
+    with _store_lock:
+        if _store is None:
+            _store = ResultStore(DEFAULT_DB_PATH)
+    return _store
+
+
+def main():
+    """Print a summary of stored results."""
+    store = get_result_store()
+    print("Stored Application Results:")
+    print("=" * 50)
+    print(f"Database: {store.db_path}")
+    print(f"Total records: {store.count()}")
+    print("\nBy stage and verdict:")
+    for group in store.count_by(("decided_stage", "final_verdict", "track")):
+        print(f"  {group['decided_stage']:10s} {group['final_verdict']:7s} {str(group['track']):6s} {group['count']}")
+    print("\nBy tenant:")
+    for group in store.count_by(("tenant_id",)):
+        print(f"  {group['tenant_id'] or DEFAULT_TENANT:10s} {group['count']}")
+    print("\nTop JD rejection reasons (tech):")
+    for group in store.count_by(("reason",), stage="jd", verdict="reject", track="tech")[:5]:
+        print(f"  {group['count']:6d}  {group['reason'][:80]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import heapq
+import itertools
+
+from budget import get_budget_governor
+from lg_graph import finalize_application, get_graph, new_application_state
+from stage_results import get_stage_result_store, screening_decision
+from tenants import tenant_scope
+
+# Weight of the JD score in the composite ranking score; the rest is culture.
+JD_SCORE_WEIGHT = 0.6
+
+
+def composite_score(state):
+    """Blend the JD and cultural scores of a screened application into one 0-100 score."""
+    jd_score = state.get("jd_score") or 0
+    cultural_score = state.get("cultural_score") or 0
+    return round(JD_SCORE_WEIGHT * jd_score + (1 - JD_SCORE_WEIGHT) * cultural_score, 2)
+
+
+class TopKShortlist:
+    """
+    Keeps the best K items per role in a bounded min-heap.
+
+    The heap root is the weakest shortlisted item, so each offer is
+    O(log K) and memory stays at K items per role however many
+    applications flow through. Ties go to the earlier arrival.
+    """
+
+    def __init__(self, k):
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        self.k = k
+        self._heaps = {}
+        self._seq = itertools.count()
+
+    def offer(self, role, score, item):
+        """
+        Offer an item to a role's shortlist.
+
+        Returns:
+            The item that did not make (or fell off) the shortlist, or None
+        """
+        heap = self._heaps.setdefault(role, [])
+        entry = (score, -next(self._seq), item)
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+            return None
+        if entry[:2] > heap[0][:2]:
+            return heapq.heapreplace(heap, entry)[2]
+        return item
+
+    def threshold(self, role):
+        """Score an item must beat to enter a full shortlist, or None if not full."""
+        heap = self._heaps.get(role, [])
+        return heap[0][0] if len(heap) >= self.k else None
+
+    def roles(self):
+        return list(self._heaps)
+
+    def top(self, role):
+        """Shortlisted items for a role, best first."""
+        return [item for _, _, item in sorted(self._heaps.get(role, []), reverse=True)]
+
+
+def run_shortlist_drive(applications, k=10, on_not_shortlisted=None):
+    """
+    Screen a stream of applications in scoring mode and schedule only the top K per role.
+
+    Every application goes through the screening graph (filter, JD, cultural)
+    with numeric scores. Candidates who pass compete for K places per
+    interview type; only the final shortlist is scheduled and emailed.
+
+    Args:
+        applications (iterable): Dicts with 'user_profile', 'cover_letter' and
+            optionally 'application_id' and 'tenant_id'
+        k (int): Shortlist size per role (and tenant)
+        on_not_shortlisted (callable): Called with the state of every
+            application that was rejected or lost its place on the shortlist
+
+    Returns:
+        dict: 'screened', 'passed_screening', 'shortlisted' (final states),
+              'not_finalized' (passed screening but were not scheduled or emailed),
+              'parked' (count parked during an LLM outage) and 'paused'
+              (the budget hard cap stopped admission)
+    """
+    app = get_graph(screen_only=True)
+    governor = get_budget_governor()
+    shortlist = TopKShortlist(k)
+    # Budget entries of shortlisted applications, charged again when they are finalized
+    spends = {}
+    screened = 0
+    passed = 0
+    parked = 0
+    paused = False
+
+    for application in applications:
+        if not governor.admit():
+            paused = True
+            break
+        with tenant_scope(application.get("tenant_id")):
+            initial = new_application_state(
+                application["user_profile"],
+                application["cover_letter"],
+                application.get("application_id"),
+                scoring_mode=True,
+                tenant_id=application.get("tenant_id"),
+            )
+            with governor.application(application.get("application_id") or id(initial)) as spent:
+                state = dict(app.invoke(initial))
+        screened += 1
+        decision = screening_decision(state)
+        if state.get("application_id"):
+            get_stage_result_store().save_decision(state["application_id"], decision)
+        if decision.startswith("parked:"):
+            parked += 1
+            continue
+        if decision != "select":
+            if on_not_shortlisted:
+                on_not_shortlisted(state)
+            continue
+
+        passed += 1
+        state["score"] = composite_score(state)
+        # Tenants compete for their own shortlists
+        role = state["interview_type"] if not state.get("tenant_id") else f"{state['tenant_id']}/{state['interview_type']}"
+        spends[id(state)] = (application.get("application_id") or id(initial), spent)
+        dropped = shortlist.offer(role, state["score"], state)
+        if dropped is not None:
+            spends.pop(id(dropped), None)
+            if on_not_shortlisted:
+                on_not_shortlisted(dropped)
+
+    finalists = []
+    for role in shortlist.roles():
+        for state in shortlist.top(role):
+            key, spent = spends.pop(id(state))
+            with governor.application(key, resume=spent):
+                finalists.append(finalize_application(state))
+
+    return {
+        "screened": screened,
+        "passed_screening": passed,
+        "shortlisted": finalists,
+        "not_finalized": passed - len(finalists),
+        "parked": parked,
+        "paused": paused,
+    }
+
+
+def main():
+    """Run a small shortlist drive and show who made the cut."""
+    applications = [
+        {
+            "user_profile": "Michael Chen, Senior Software Engineer with 5 years of backend experience. B.Tech CS 2019. Python, FastAPI, Django, PostgreSQL, AWS, Docker, Kubernetes.",
+            "cover_letter": "I take ownership end-to-end, work backwards from customers and enjoy collaborating in the office.",
+        },
+        {
+            "user_profile": "Priya Nair, Backend Engineer with 4 years of experience. B.E. 2020. Python, Flask, MySQL, AWS Lambda, Docker, CI/CD.",
+            "cover_letter": "I value transparency, continuous learning and high standards, and I like working closely with my team on site.",
+        },
+        {
+            "user_profile": "Tom Baker, Software Engineer with 4 years in Python and Django, PostgreSQL and Docker. B.Tech 2020.",
+            "cover_letter": "I am eager to grow, collaborate and deliver quality software from the office every day.",
+        },
+    ]
+    result = run_shortlist_drive(applications, k=2)
+    print("\nShortlist Drive Results:")
+    print("=" * 50)
+    print(f"Screened: {result['screened']}")
+    print(f"Passed screening: {result['passed_screening']}")
+    print(f"Scheduled and emailed: {len(result['shortlisted'])}")
+    print(f"Candidates not scheduled or emailed: {result['not_finalized']}")
+    for state in result["shortlisted"]:
+        print(f"  {state.get('interview_type')}: score {state.get('score')} | {state.get('user_profile', '')[:40]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import deque
+
+import sales_jd
+import tech_jd
+from tenants import current_tenant
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Environment switch read by skill_precheck()
+#   SKILL_REJECT_BELOW   reject before the LLM call when the core-skill overlap
+#                        is below this ratio (default 0.2, "0" turns it off)
+
+# Canonical skill -> aliases. The canonical name always matches itself.
+# Soft skills are left out on purpose: profiles rarely spell them out, so
+# they would only drag the overlap down.
+SKILL_ALIASES = {
+    # Tech
+    "python": ("python3",),
+    "fastapi": ("fast api",),
+    "flask": (),
+    "django": (),
+    "postgresql": ("postgres", "psql"),
+    "mysql": ("mariadb",),
+    "sql": ("t-sql", "pl/sql"),
+    "aws": ("amazon web services",),
+    "ec2": (),
+    "s3": (),
+    "rds": (),
+    "lambda": ("aws lambda",),
+    "gcp": ("google cloud",),
+    "azure": (),
+    "ci/cd": ("cicd", "ci / cd", "continuous integration", "continuous delivery", "continuous deployment",
+              "jenkins", "github actions", "gitlab ci", "circleci"),
+    "docker": ("containerization", "containerisation", "containers"),
+    "kubernetes": ("k8s", "eks", "gke"),
+    "terraform": ("cloudformation",),
+    "redis": (),
+    "kafka": (),
+    "sqs": (),
+    "rabbitmq": (),
+    "prometheus": (),
+    "grafana": (),
+    "opentelemetry": ("open telemetry",),
+    "graphql": (),
+    "rest": ("rest api", "rest apis", "restful"),
+    "async": ("asyncio", "async/await"),
+    "data structures": ("data structure",),
+    "algorithms": ("algorithm",),
+    "system design": ("systems design", "distributed systems"),
+    "microservices": ("micro-services", "microservice"),
+    "java": (),
+    "javascript": ("js",),
+    "typescript": (),
+    "golang": (),
+    "node.js": ("nodejs",),
+    "react": ("reactjs", "react.js"),
+    "mongodb": ("mongo",),
+    # Sales
+    "b2b": ("business-to-business",),
+    "saas": ("software as a service",),
+    "quota": ("quota attainment", "quota-carrying", "quotas"),
+    "prospecting": ("lead generation", "outbound"),
+    "discovery": ("discovery calls",),
+    "objection handling": ("handling objections",),
+    "negotiation": ("negotiating", "negotiations"),
+    "demos": ("product demos", "demo"),
+    "closing": ("closed deals", "deal closing"),
+    "meddicc": ("meddic", "meddpicc"),
+    "bant": (),
+    "spin": ("spin selling",),
+    "challenger": ("challenger sale",),
+    "salesforce": ("sfdc",),
+    "hubspot": (),
+    "crm": (),
+    "forecasting": ("forecast", "forecasts"),
+    "pipeline management": ("pipeline",),
+    "enterprise": ("enterprise sales",),
+    "mid-market": ("mid market",),
+    "channel sales": ("partner sales", "channel/partner sales"),
+}
+
+# JD stage -> module holding the default tenant's JD text (other tenants
+# bring their own, see tenants)
+SKILL_STAGES = {
+    "tech_jd": tech_jd,
+    "sales_jd": sales_jd,
+}
+
+DEFAULT_REJECT_BELOW = 0.2
+
+# A JD section heading line, e.g. "Core Requirements:" (also read by jd_spec)
+HEADING_RE = re.compile(r"^([A-Za-z][A-Za-z /&-]*):\s*$")
+
+
+def _is_word_char(ch):
+    return ch.isalnum()
+
+
+class SkillAutomaton:
+    """
+    Aho-Corasick automaton over every skill alias.
+
+    All aliases are compiled once into a single trie with failure links, so
+    extracting skills from a text is one pass over its characters whatever
+    the number of aliases. Matches must sit on word boundaries ("sql" does
+    not match inside "postgresql"). Uses pyahocorasick when installed and a
+    pure Python automaton otherwise.
+    """
+
+    def __init__(self, aliases=SKILL_ALIASES):
+        self._canonical = {}
+        for skill, skill_aliases in aliases.items():
+            for alias in (skill,) + tuple(skill_aliases):
+                self._canonical[alias.lower()] = skill
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for alias, skill in self._canonical.items():
+                self._automaton.add_word(alias, (len(alias), skill))
+            self._automaton.make_automaton()
+        else:
+            self._build()
+
+    def _build(self):
+        # goto[state] maps a character to the next state; out[state] lists
+        # (alias length, skill) for every alias ending there
+        self._goto, self._fail, self._out = [{}], [0], [[]]
+        for alias, skill in self._canonical.items():
+            state = 0
+            for ch in alias:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append((len(alias), skill))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _iter_raw(self, text):
+        if ahocorasick is not None:
+            yield from self._automaton.iter(text)
+            return
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for end, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for match in out[state]:
+                yield end, match
+
+    def skills(self, text):
+        """
+        Canonical skills mentioned in a text.
+
+        Returns:
+            set: Canonical skill names
+        """
+        text = (text or "").lower()
+        found = set()
+        for end, (length, skill) in self._iter_raw(text):
+            start = end - length + 1
+            if start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if end + 1 < len(text) and _is_word_char(text[end + 1]):
+                continue
+            found.add(skill)
+        return found
+
+
+class SkillTaxonomy:
+    """
+    Skills a JD asks for, grouped by requirement line.
+
+    Every bullet of a JD section that names at least one known skill is one
+    requirement group; the alternatives on a line ("PostgreSQL/MySQL")
+    satisfy it together. The overlap ratio is the share of core requirement
+    groups a profile satisfies.
+    """
+
+    def __init__(self, job_description, automaton):
+        self.automaton = automaton
+        self.sections = {}
+        section = "overview"
+        for line in job_description.splitlines():
+            line = line.strip()
+            heading = HEADING_RE.match(line)
+            if heading:
+                section = heading.group(1).strip().lower()
+                continue
+            if not line.startswith("-"):
+                continue
+            group = automaton.skills(line)
+            if group:
+                self.sections.setdefault(section, []).append((line.lstrip("- "), group))
+        self.core_groups = self.sections.get("core requirements", [])
+        self.skills = set().union(*(group for groups in self.sections.values() for _, group in groups))
+
+    def overlap(self, profile_text):
+        """
+        Core requirement overlap of a profile.
+
+        Returns:
+            dict: 'ratio' (0-1, or None if the JD names no core skills),
+                  'matched' (skills of the JD found in the profile) and
+                  'missing' (core requirement lines with no matching skill)
+        """
+        found = self.automaton.skills(profile_text)
+        missing = [line for line, group in self.core_groups if not group & found]
+        ratio = (len(self.core_groups) - len(missing)) / len(self.core_groups) if self.core_groups else None
+        return {"ratio": ratio, "matched": sorted(found & self.skills), "missing": missing}
+
+
+_automaton = None
+_taxonomies = {}
+_lock = threading.Lock()
+
+
+def get_skill_automaton():
+    """Return the process-wide skill automaton, compiled on first use."""
+    global _automaton
+    if _automaton is not None:
+        return _automaton
+    with _lock:
+        if _automaton is None:
+            _automaton = SkillAutomaton()
+    return _automaton
+
+
+def get_skill_taxonomy(stage):
+    """Return the taxonomy of a JD stage for the current tenant, rebuilt only when its JD text changed."""
+    job_description = current_tenant().job_description(stage)
+    key = (stage, hashlib.sha256(job_description.encode("utf-8")).hexdigest())
+    with _lock:
+        taxonomy = _taxonomies.get(key)
+    if taxonomy is None:
+        taxonomy = SkillTaxonomy(job_description, get_skill_automaton())
+        with _lock:
+            _taxonomies[key] = taxonomy
+    return taxonomy
+
+
+def reject_below():
+    return float(os.getenv("SKILL_REJECT_BELOW", str(DEFAULT_REJECT_BELOW)))
+
+
+def precheck_signature(stage):
+    """Settings that change local rejections; part of the stage's cached prompt hash."""
+    return f"skills<{reject_below()}"
+
+
+def skill_precheck(stage, profile_text, scoring=False):
+    """
+    Reject a profile for a JD stage without the LLM if it clearly misses the core skills.
+
+    Args:
+        stage (str): "tech_jd" or "sales_jd"
+        profile_text (str): Candidate profile
+        scoring (bool): Include a score, as the analyser does in scoring mode
+
+    Returns:
+        dict: An analyser result ('verdict', 'rejection_reason' and maybe
+              'score') for a clear miss, or None to ask the LLM
+    """
+    threshold = reject_below()
+    if stage not in SKILL_STAGES or threshold <= 0:
+        return None
+    overlap = get_skill_taxonomy(stage).overlap(profile_text)
+    if overlap["ratio"] is None or overlap["ratio"] >= threshold:
+        return None
+    result = {
+        "verdict": "reject",
+        "rejection_reason": (
+            f"Core skill overlap {overlap['ratio']:.0%} is far below the required 50%; "
+            f"missing: {'; '.join(overlap['missing'])}"
+        ),
+    }
+    if scoring:
+        result["score"] = int(overlap["ratio"] * 100)
+    return result
+
+
+def main():
+    """Show the tech JD taxonomy and time skill extraction over a large batch."""
+    taxonomy = get_skill_taxonomy("tech_jd")
+    print(f"Skill Taxonomy (tech JD, {'pyahocorasick' if ahocorasick else 'pure Python'} automaton):")
+    print("=" * 50)
+    for line, group in taxonomy.core_groups:
+        print(f"- {line}: {', '.join(sorted(group))}")
+
+    samples = [
+        "BS CS 2021, 3y backend in Python, FastAPI, Postgres, AWS (EC2, S3), Docker and GitHub Actions.",
+        "MBA Marketing 2020, 3y growth marketing; no coding; SEO/SEM; HubSpot, GA.",
+    ]
+    for profile in samples:
+        overlap = taxonomy.overlap(profile)
+        print(f"\n{profile}\n  overlap {overlap['ratio']:.0%}, matched {overlap['matched']}")
+        print(f"  precheck: {skill_precheck('tech_jd', profile) or 'ask the LLM'}")
+
+    batch = [samples[i % 2] * 20 for i in range(10000)]
+    started = time.perf_counter()
+    rejected = sum(1 for profile in batch if skill_precheck("tech_jd", profile))
+    elapsed = time.perf_counter() - started
+    print(f"\nScreened {len(batch)} profiles ({sum(map(len, batch)) // 1000} KB) in {elapsed:.2f}s; "
+          f"{rejected} rejected before the LLM")
+
+
+if __name__ == "__main__":
+    main()
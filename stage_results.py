@@ -0,0 +1,305 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import profile_filter
+import tech_profile_jd_analyser
+import sales_profile_jd_analyser
+import cultural_fit_analyzer
+from profile_compactor import node_input
+from skill_automaton import SKILL_STAGES, precheck_signature
+from tenants import DEFAULT_TENANT, current_tenant
+
+# The stage result database lives next to this module unless overridden.
+DEFAULT_DB_PATH = os.getenv(
+    "STAGE_RESULTS_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "stage_results.db"),
+)
+
+# Stored applications read per query by iter_applications()
+APPLICATION_CHUNK = 200
+
+# Module holding each screening stage's prompt, and the AppState fields it sets.
+# Prompts are taken from the current tenant at hash time (the modules for the
+# default tenant), so edits to the JDs or the company culture are picked up by
+# the next process that loads them.
+STAGE_SPECS = {
+    "filter": {
+        "module": profile_filter,
+        "output_fields": ("filter_verdict", "filter_reason"),
+    },
+    "tech_jd": {
+        "module": tech_profile_jd_analyser,
+        "output_fields": ("jd_verdict", "jd_reason", "jd_score", "interview_type", "matched_roles"),
+    },
+    "sales_jd": {
+        "module": sales_profile_jd_analyser,
+        "output_fields": ("jd_verdict", "jd_reason", "jd_score", "interview_type", "matched_roles"),
+    },
+    "cultural": {
+        "module": cultural_fit_analyzer,
+        "output_fields": ("cultural_verdict", "cultural_reason", "cultural_score"),
+    },
+}
+
+# Reasons the nodes produce when the LLM call failed. Such results are not
+# cached, so a re-evaluation retries them.
+ERROR_REASON_PREFIXES = (
+    "Error",
+    "Filter error",
+    "Tech JD error",
+    "Sales JD error",
+    "Cultural fit error",
+    "Model did not return a function call",
+    "Invalid verdict from model",
+    "Invalid score from model",
+    "Unable to process profile",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS applications (
+    application_id TEXT PRIMARY KEY,
+    user_profile TEXT NOT NULL,
+    cover_letter TEXT NOT NULL,
+    decision TEXT,
+    updated_at TEXT NOT NULL,
+    tenant_id TEXT
+);
+CREATE TABLE IF NOT EXISTS stage_results (
+    application_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    result TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (application_id, stage)
+);
+CREATE INDEX IF NOT EXISTS idx_stage_results_stage ON stage_results (stage, input_hash);
+CREATE TABLE IF NOT EXISTS profile_features (
+    profile_hash TEXT PRIMARY KEY,
+    features TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jd_specs (
+    jd_hash TEXT PRIMARY KEY,
+    spec TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+
+def stage_prompt_hash(stage, scoring=False):
+    """Hash of the prompt template (system prompt + function schema) for a stage of the current tenant."""
+    module = STAGE_SPECS[stage]["module"]
+    system_prompt = current_tenant().system_prompt(stage)
+    if scoring and hasattr(module, "scored_functions"):
+        prompt = [system_prompt + module.SCORING_INSTRUCTIONS, module.scored_functions]
+    else:
+        prompt = [system_prompt, module.functions]
+    # Local skill rejections depend on their threshold as much as on the prompt
+    if stage in SKILL_STAGES:
+        prompt.append(precheck_signature(stage))
+        # Imported here: jd_registry imports jd_spec, which imports this module
+        from jd_registry import get_registry, registry_routing_enabled
+
+        if registry_routing_enabled() and not scoring:
+            prompt.append(get_registry().signature("tech" if stage == "tech_jd" else "sales"))
+    payload = json.dumps(prompt, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def stage_input_hash(stage, state):
+    """
+    Content hash of everything a stage's LLM call depends on.
+
+    Args:
+        stage (str): One of STAGE_SPECS
+        state (dict): Application state holding the stage's (compacted) input
+
+    Returns:
+        str: Hex digest that changes when the prompt or the input changes
+    """
+    text = node_input(state, stage)
+    payload = stage_prompt_hash(stage, bool(state.get("scoring_mode"))) + "\0" + text
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def stage_outputs(stage, state):
+    """Extract the AppState fields a stage produced."""
+    return {field: state.get(field) for field in STAGE_SPECS[stage]["output_fields"]}
+
+
+def is_error_result(result):
+    """True if a stage result came from a failed LLM call."""
+    for value in result.values():
+        if isinstance(value, str) and value.startswith(ERROR_REASON_PREFIXES):
+            return True
+    return False
+
+
+def screening_decision(state):
+    """Summarise where an application ended up: 'reject:<stage>', 'parked:<stage>' or 'select'."""
+    if state.get("parked_stage"):
+        return f"parked:{state['parked_stage']}"
+    if state.get("filter_verdict") not in ("tech", "sales"):
+        return "reject:filter"
+    if state.get("jd_verdict") != "select":
+        return "reject:jd"
+    if state.get("cultural_verdict") != "select":
+        return "reject:cultural"
+    return "select"
+
+
+class StageResultStore:
+    """SQLite store of application inputs and per-stage results tagged with input hashes."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(applications)")}
+        if "tenant_id" not in columns:
+            self._conn.execute("ALTER TABLE applications ADD COLUMN tenant_id TEXT")
+
+    def save_application(self, application_id, user_profile, cover_letter, tenant_id=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO applications (application_id, user_profile, cover_letter, updated_at, tenant_id) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (application_id) DO UPDATE SET "
+                "user_profile = excluded.user_profile, cover_letter = excluded.cover_letter, "
+                "updated_at = excluded.updated_at, tenant_id = excluded.tenant_id",
+                (application_id, user_profile, cover_letter, datetime.now().isoformat(), tenant_id),
+            )
+
+    def save_decision(self, application_id, decision):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE applications SET decision = ?, updated_at = ? WHERE application_id = ?",
+                (decision, datetime.now().isoformat(), application_id),
+            )
+
+    def save_stage(self, application_id, stage, input_hash, result):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stage_results "
+                "(application_id, stage, input_hash, result, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (application_id, stage, input_hash, json.dumps(result), datetime.now().isoformat()),
+            )
+
+    def delete_stage(self, application_id, stage):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM stage_results WHERE application_id = ? AND stage = ?",
+                (application_id, stage),
+            )
+
+    def get_stage(self, application_id, stage):
+        """Return (input_hash, result) for a stored stage, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT input_hash, result FROM stage_results WHERE application_id = ? AND stage = ?",
+                (application_id, stage),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def get_features(self, profile_hash):
+        """Return the feature record stored for a profile hash, or None (see profile_features)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT features FROM profile_features WHERE profile_hash = ?", (profile_hash,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_features(self, profile_hash, features):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profile_features (profile_hash, features, updated_at) VALUES (?, ?, ?)",
+                (profile_hash, json.dumps(features), datetime.now().isoformat()),
+            )
+
+    def get_jd_spec(self, jd_hash):
+        """Return the requirement spec stored for a JD hash, or None (see jd_spec)."""
+        with self._lock:
+            row = self._conn.execute("SELECT spec FROM jd_specs WHERE jd_hash = ?", (jd_hash,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_jd_spec(self, jd_hash, spec):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jd_specs (jd_hash, spec, updated_at) VALUES (?, ?, ?)",
+                (jd_hash, json.dumps(spec), datetime.now().isoformat()),
+            )
+
+    def iter_applications(self, application_ids=None, parked_only=False, tenant_id=None, deferred_only=False,
+                          chunk_size=APPLICATION_CHUNK):
+        """
+        Yield stored applications as dicts with inputs, tenant and last decision.
+
+        Rows are read chunk_size at a time (keyed on the application id), so
+        only one chunk of profiles and cover letters is in memory and the
+        store can be written between chunks.
+        """
+        sql = "SELECT application_id, user_profile, cover_letter, decision, tenant_id FROM applications"
+        clauses = []
+        params = []
+        if application_ids:
+            clauses.append(f"application_id IN ({','.join('?' * len(application_ids))})")
+            params = list(application_ids)
+        if parked_only:
+            clauses.append("decision LIKE 'parked:%'")
+        if deferred_only:
+            clauses.append("decision = 'deferred'")
+        if tenant_id is not None:
+            # Applications stored before tenants existed belong to the default one
+            clauses.append("(tenant_id = ? OR tenant_id IS NULL)" if tenant_id == DEFAULT_TENANT else "tenant_id = ?")
+            params.append(tenant_id)
+        clauses.append("application_id > ?")
+        sql += " WHERE " + " AND ".join(clauses) + " ORDER BY application_id LIMIT ?"
+        last = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(sql, params + [last, chunk_size]).fetchmany(chunk_size)
+            for row in rows:
+                yield {
+                    "application_id": row[0],
+                    "user_profile": row[1],
+                    "cover_letter": row[2],
+                    "decision": row[3],
+                    "tenant_id": row[4],
+                }
+            if len(rows) < chunk_size:
+                return
+            last = rows[-1][0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_stage_result_store():
+    """Return the process-wide stage result store."""
+    global _store
+    if _store is not None:
+        return _store
+    with _store_lock:
+        if _store is None:
+            _store = StageResultStore(DEFAULT_DB_PATH)
+    return _store
+
+
+def record_stage_result(stage, state):
+    """Persist a finished stage for state['application_id'] unless the LLM call failed."""
+    result = stage_outputs(stage, state)
+    store = get_stage_result_store()
+    if is_error_result(result):
+        store.delete_stage(state["application_id"], stage)
+        return
+    store.save_stage(state["application_id"], stage, stage_input_hash(stage, state), result)
@@ -0,0 +1,145 @@
+import argparse
+import itertools
+import json
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def read_applications(path):
+    """
+    Lazily read applications from a JSON lines file.
+
+    Each line is an object with 'user_profile', 'cover_letter' and optionally
+    'application_id'. Lines are parsed as they are consumed, so the file is
+    never held in memory.
+
+    Yields:
+        dict: One application
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+# Templates for synthetic applications: tech, sales, and a clear reject
+_SAMPLES = [
+    ("Candidate {i}, Senior Software Engineer with 5 years of backend experience. B.Tech CS 2019. "
+     "Python, FastAPI, Django, PostgreSQL, AWS, Docker, Kubernetes. Reach me at candidate{i}@example.com. ",
+     "I take ownership of my work end-to-end and enjoy collaborating with my team in the office. "),
+    ("Candidate {i}, Account Executive with 4 years of experience in B2B SaaS sales. Graduated in 2020. "
+     "Consistently exceeded quota using MEDDICC; Salesforce power user. candidate{i}@example.com ",
+     "I am passionate about B2B sales and thrive on working closely with colleagues on site. "),
+    ("Candidate {i}, Human Resources Manager with 4 years of experience. Graduated in 2020 with a "
+     "degree in Psychology. candidate{i}@example.com ",
+     "I am passionate about people management and organizational development. "),
+]
+
+
+def synthetic_applications(count, padding=20):
+    """
+    Generate count applications lazily, each roughly padding times the size of a template.
+
+    Yields:
+        dict: One application with a unique id
+    """
+    for i in range(count):
+        profile, letter = _SAMPLES[i % len(_SAMPLES)]
+        yield {
+            "application_id": f"bench-{i}",
+            "user_profile": profile.format(i=i) * padding,
+            "cover_letter": letter * padding,
+        }
+
+
+def _rss_mb():
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def measure(run, count, checkpoints=10):
+    """
+    Run count synthetic applications through run(applications, on_result) and
+    sample the traced Python heap at evenly spaced points.
+
+    Returns:
+        dict: 'count', 'seconds', 'heap_mb' (list of (processed, MB)),
+              'peak_heap_mb' and 'peak_rss_mb'
+    """
+    every = max(count // checkpoints, 1)
+    samples = []
+    processed = itertools.count(1)
+
+    def on_result(_state):
+        n = next(processed)
+        if n % every == 0:
+            samples.append((n, round(tracemalloc.get_traced_memory()[0] / 2 ** 20, 2)))
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    run(synthetic_applications(count), on_result)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "count": count,
+        "seconds": round(elapsed, 1),
+        "heap_mb": samples,
+        "peak_heap_mb": round(peak / 2 ** 20, 2),
+        "peak_rss_mb": _rss_mb(),
+    }
+
+
+def main():
+    """
+    Benchmark memory of the streaming pipeline against collecting every final state.
+
+    Set LLM_CASSETTE, LLM_CASSETTE_MODE=replay and LLM_REPLAY_ON_MISS=node
+    so the run replays recorded LLM calls instead of paying for them.
+    """
+    parser = argparse.ArgumentParser(description="Memory benchmark of streaming vs collected batch runs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Batch sizes to run")
+    parser.add_argument("--collect", action="store_true",
+                        help="Also run a driver that keeps every final state, for comparison")
+    args = parser.parse_args()
+
+    import contextlib
+    import os
+
+    from lg_graph import run_once, stream_batch
+
+    def streamed(applications, on_result):
+        stream_batch(applications, on_result=on_result)
+
+    def collected(applications, on_result):
+        # What a naive driver does: keep every full final state
+        states = []
+        for application in applications:
+            state = run_once(application["user_profile"], application["cover_letter"], application["application_id"])
+            states.append(state)
+            on_result(state)
+        return states
+
+    runs = [("stream_batch", streamed)] + ([("collected", collected)] if args.collect else [])
+    print("Streaming Memory Benchmark:")
+    print("=" * 50)
+    for name, run in runs:
+        for size in args.sizes:
+            # The nodes print every step; keep the benchmark output readable
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                result = measure(run, size)
+            heap = ", ".join(f"{n}: {mb}" for n, mb in result["heap_mb"])
+            print(f"{name} x{size}: {result['seconds']}s, peak heap {result['peak_heap_mb']} MB, "
+                  f"peak RSS {result['peak_rss_mb']} MB")
+            print(f"  heap MB by applications processed: {heap}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,8 @@
 from tech_jd import job_description
-import os
 import json
-from openai import OpenAI
-from dotenv import load_dotenv
 
-load_dotenv()
-
-_client = None
-
-
-def get_openai_client():
-    global _client
-    if _client is not None:
-        return _client
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables")
-    _client = OpenAI(api_key=api_key)
-    return _client
+from llm_circuit import LLMUnavailableError
+from llm_client import create_chat_completion
 
 
 functions = [
@@ -41,8 +26,43 @@ functions = [
     }
 ]
 
+# Same schema plus a numeric score, used in scoring mode to rank candidates
+scored_functions = [
+    {
+        "name": "finalverdict",
+        "description": "Return select or reject with a 0-100 score and an optional rejection_reason",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "verdict": {
+                    "type": "string",
+                    "enum": ["select", "reject"]
+                },
+                "score": {
+                    "type": "integer",
+                    "minimum": 0,
+                    "maximum": 100,
+                    "description": "0-100 rating of how well the candidate matches the JD"
+                },
+                "rejection_reason": {
+                    "type": "string",
+                    "description": "Reason for rejection if verdict is reject; empty otherwise"
+                }
+            },
+            "required": ["verdict", "score", "rejection_reason"]
+        }
+    }
+]
+
+SCORING_INSTRUCTIONS = """
+Also return score: an integer from 0 to 100 rating how well the candidate matches the JD, used to rank shortlisted candidates.
+Use the full range. Candidates you reject must score below 50.
+"""
+
 
-SYSTEM_PROMPT = f"""You are a precise job-profile matcher for a tech role.
+# Prompt with a {job_description} placeholder, shared by every role of this
+# track in jd_registry and filled in per tenant (see tenants).
+PROMPT_TEMPLATE = """You are a precise job-profile matcher for a tech role.
 You will be given a job description (JD) and a candidate profile.
 Assess whether the candidate's skills, experience, and background sufficiently intersect with the JD requirements.
 If the overlap is strong enough for a reasonable shortlist, choose verdict=select; otherwise verdict=reject.
@@ -60,18 +80,20 @@ JD:
 {job_description}
 """
 
+SYSTEM_PROMPT = PROMPT_TEMPLATE.format(job_description=job_description)
+
 
-def analyze_profile_against_jd(profile_text: str):
-    client = get_openai_client()
+def analyze_profile_against_jd(profile_text: str, system_prompt: str = None, scoring: bool = False):
     messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "system", "content": (system_prompt or SYSTEM_PROMPT) + (SCORING_INSTRUCTIONS if scoring else "")},
         {"role": "user", "content": f"Candidate Profile:\n\n{profile_text}"}
     ]
     try:
-        resp = client.chat.completions.create(
+        resp = create_chat_completion(
+            "tech_jd",
             model="gpt-4",
             messages=messages,
-            functions=functions,
+            functions=scored_functions if scoring else functions,
             function_call={"name": "finalverdict"}
         )
         fc = resp.choices[0].message.function_call
@@ -83,8 +105,15 @@ def analyze_profile_against_jd(profile_text: str):
                 return {"verdict": "reject", "rejection_reason": "Invalid verdict from model"}
             if verdict == "select":
                 reason = ""
-            return {"verdict": verdict, "rejection_reason": reason}
+            if not scoring:
+                return {"verdict": verdict, "rejection_reason": reason}
+            score = args.get("score")
+            if isinstance(score, bool) or not isinstance(score, (int, float)):
+                return {"verdict": "reject", "rejection_reason": "Invalid score from model", "score": 0}
+            return {"verdict": verdict, "rejection_reason": reason, "score": max(0, min(100, int(score)))}
         return {"verdict": "reject", "rejection_reason": "Model did not return a function call"}
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         return {"verdict": "reject", "rejection_reason": f"Error: {e}"}
 
@@ -0,0 +1,567 @@
+import contextvars
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import company_culture
+import sales_jd
+import tech_jd
+from in_memory_db import DEFAULT_DB_PATH, SlotStore, get_default_slot_store, use_slot_store
+
+# Environment switches read by the tenant registry and the LLM fair-share limiter
+#   TENANTS_PATH             tenant configs: a JSON file ({tenant_id: config} or a list of
+#                            configs with 'tenant_id') or a directory of <tenant_id>.json files
+#   TENANT_LLM_CONCURRENCY   live LLM calls in flight across all tenants (default 8, "0" = no limit)
+
+# Keys of a tenant config. Anything left out falls back to the single-company
+# setup, so the default tenant runs the pipeline exactly as before.
+#   name              company name
+#   company_culture   culture text for the cultural-fit stage
+#   tech_jd, sales_jd JD texts for the JD stages
+#   slots_db          interview slot database (default: interview_slots.<tenant_id>.db)
+#   email_sender      From address of delivered emails (default: EMAIL_SENDER)
+#   email_signature   sign-off of candidate emails (default "HR Team")
+#   llm_weight        share of the LLM concurrency while tenants compete (default 1)
+DEFAULT_TENANT = "default"
+DEFAULT_SIGNATURE = "HR Team"
+LATENCY_WINDOW = 10000
+
+# Screening stage -> (config key of the text its prompt is built from, prompt placeholder)
+_STAGE_TEXTS = {
+    "tech_jd": ("tech_jd", "job_description"),
+    "sales_jd": ("sales_jd", "job_description"),
+    "cultural": ("company_culture", "company_culture"),
+}
+
+# Tenant ids name config files, so they are restricted to a safe alphabet
+_TENANT_ID_RE = re.compile(r"[A-Za-z0-9_-]+")
+
+# Current tenant of the application being processed
+_current_tenant = contextvars.ContextVar("current_tenant", default=None)
+
+
+def _default_text(key):
+    # Read at call time so edits to the modules are picked up as before
+    return {
+        "tech_jd": tech_jd.job_description,
+        "sales_jd": sales_jd.job_description,
+        "company_culture": company_culture.company_culture,
+    }[key]
+
+
+def stage_module(stage):
+    """Analyser module holding a screening stage's default prompt."""
+    # Imported here: the analysers import llm_client, which imports this module
+    import cultural_fit_analyzer
+    import profile_filter
+    import sales_profile_jd_analyser
+    import tech_profile_jd_analyser
+
+    return {
+        "filter": profile_filter,
+        "tech_jd": tech_profile_jd_analyser,
+        "sales_jd": sales_profile_jd_analyser,
+        "cultural": cultural_fit_analyzer,
+    }[stage]
+
+
+def _tenant_db_path(tenant_id):
+    if DEFAULT_DB_PATH == ":memory:":
+        return ":memory:"
+    root, ext = os.path.splitext(DEFAULT_DB_PATH)
+    return f"{root}.{tenant_id}{ext}"
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q / 100), len(ordered) - 1)]
+
+
+class Tenant:
+    """
+    One company or business unit served by the pipeline.
+
+    Prompts built from the tenant's JDs and culture are compiled on first use
+    and cached, and the slot store is opened on first use, so a tenant costs
+    nothing until one of its applications arrives.
+    """
+
+    def __init__(self, tenant_id, config=None):
+        self.tenant_id = tenant_id
+        self.config = dict(config or {})
+        self.name = self.config.get("name")
+        self.email_sender = self.config.get("email_sender")
+        self.email_signature = self.config.get("email_signature", DEFAULT_SIGNATURE)
+        self.llm_weight = float(self.config.get("llm_weight", 1))
+        self._prompts = {}
+        self._store = None
+        self._lock = threading.Lock()
+
+    def text(self, key):
+        """The tenant's 'tech_jd', 'sales_jd' or 'company_culture' text."""
+        return self.config[key] if key in self.config else _default_text(key)
+
+    def job_description(self, stage):
+        """JD text of a JD stage ("tech_jd" or "sales_jd")."""
+        return self.text(stage)
+
+    def system_prompt(self, stage):
+        """
+        System prompt of a screening stage for this tenant.
+
+        Stages the tenant does not customise use the analyser module's prompt.
+        With JD_SPEC on, the JD stages embed the JD's compiled requirement
+        spec instead of its text (see jd_spec). Prompts are rendered once per
+        stage and cached; spec prompts built from a local-rules spec only for
+        JD_SPEC_RETRY_SECONDS.
+        """
+        module = stage_module(stage)
+        key, placeholder = _STAGE_TEXTS.get(stage, (None, None))
+        if placeholder == "job_description":
+            # Imported here: jd_spec imports llm_client, which imports this module
+            from jd_spec import get_jd_spec, jd_specs_enabled, local_spec_retry_seconds, render_spec
+
+            if jd_specs_enabled():
+                # The tenant's JD is fixed, so its spec prompt is rendered once per stage
+                with self._lock:
+                    cached = self._prompts.get(("spec", stage))
+                if cached is not None and (cached[1] is None or cached[1] > time.monotonic()):
+                    return cached[0]
+                spec, _ = get_jd_spec(self.text(key))
+                prompt = module.PROMPT_TEMPLATE.format(job_description=render_spec(spec))
+                # A spec compiled by local rules is retried with the LLM after a while
+                retry_at = time.monotonic() + local_spec_retry_seconds() if spec.get("source") == "local" else None
+                with self._lock:
+                    self._prompts[("spec", stage)] = (prompt, retry_at)
+                return prompt
+        if key not in self.config:
+            return module.SYSTEM_PROMPT
+        with self._lock:
+            prompt = self._prompts.get(stage)
+            if prompt is None:
+                prompt = module.PROMPT_TEMPLATE.format(**{placeholder: self.config[key]})
+                self._prompts[stage] = prompt
+        return prompt
+
+    def slot_store(self):
+        """The tenant's interview slot store, opened (and seeded like the default one) on first use."""
+        if self.tenant_id == DEFAULT_TENANT and "slots_db" not in self.config:
+            return get_default_slot_store()
+        with self._lock:
+            if self._store is None:
+                store = SlotStore(self.config.get("slots_db") or _tenant_db_path(self.tenant_id))
+                if os.getenv("INTERVIEW_SLOTS_SEED", "1") != "0":
+                    store.seed_random(30)
+                self._store = store
+            return self._store
+
+
+class TenantRegistry:
+    """
+    Tenants by id, loaded lazily and cached.
+
+    With a directory, each <tenant_id>.json is read the first time its
+    tenant is asked for; a single file is read once, on the first lookup.
+    Tenants can also be registered directly. The default tenant always
+    exists, with an empty config unless one is provided.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._configs = None
+        self._tenants = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv("TENANTS_PATH"))
+
+    def _load_config(self, tenant_id):
+        if not self.path:
+            return None
+        if not _TENANT_ID_RE.fullmatch(tenant_id):
+            # Comes from application input: never let it escape the config directory
+            raise ValueError(f"Invalid tenant id {tenant_id!r}")
+        if os.path.isdir(self.path):
+            file_path = os.path.join(self.path, f"{tenant_id}.json")
+            if not os.path.exists(file_path):
+                return None
+            with open(file_path, encoding="utf-8") as f:
+                return json.load(f)
+        if self._configs is None:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._configs = {config["tenant_id"]: config for config in data} if isinstance(data, list) else data
+        return self._configs.get(tenant_id)
+
+    def register(self, tenant_id, config=None):
+        """Add (or replace) a tenant. Returns the Tenant."""
+        tenant = Tenant(tenant_id, config)
+        with self._lock:
+            previous = self._tenants.get(tenant_id)
+            if previous is not None and previous.config.get("slots_db") == tenant.config.get("slots_db"):
+                # Keep the open slot store (and its cached availability)
+                tenant._store = previous._store
+            self._tenants[tenant_id] = tenant
+        return tenant
+
+    def get(self, tenant_id=None):
+        """
+        Return a tenant, loading its config on first use.
+
+        Raises:
+            ValueError: The tenant is not registered or configured
+        """
+        tenant_id = tenant_id or DEFAULT_TENANT
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is not None:
+                return tenant
+            config = self._load_config(tenant_id)
+        if config is None and tenant_id != DEFAULT_TENANT:
+            raise ValueError(f"Unknown tenant {tenant_id!r}")
+        with self._lock:
+            if tenant_id not in self._tenants:
+                self._tenants[tenant_id] = Tenant(tenant_id, config)
+            return self._tenants[tenant_id]
+
+    def reload(self, tenant_id):
+        """Re-read a tenant's config, e.g. after its JD or culture was edited."""
+        with self._lock:
+            self._configs = None
+            config = self._load_config(tenant_id)
+        if config is None and tenant_id != DEFAULT_TENANT:
+            raise ValueError(f"Unknown tenant {tenant_id!r}")
+        return self.register(tenant_id, config)
+
+    def loaded(self):
+        """Ids of the tenants loaded so far."""
+        with self._lock:
+            return list(self._tenants)
+
+
+class FairShareLimiter:
+    """
+    Weighted fair share of live LLM calls between tenants.
+
+    At most `capacity` calls are in flight. When calls have to wait, the
+    next free place goes to the waiting tenant with the lowest virtual time
+    (start-time fair queueing, as in priority_scheduler), which advances by
+    1/weight per call. A tenant running a bulk drive therefore keeps the
+    whole capacity while it is alone and gets only its share once others
+    are waiting. A tenant that had nothing waiting starts at the current
+    virtual time instead of with credit for its idle period.
+    """
+
+    def __init__(self, capacity=8, weight_of=None):
+        self.capacity = capacity
+        self.weight_of = weight_of or (lambda tenant_id: 1.0)
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = {}
+        self._granted = set()
+        self._tags = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        self._stats = {}
+
+    @classmethod
+    def from_env(cls, weight_of=None):
+        return cls(int(os.getenv("TENANT_LLM_CONCURRENCY", "8")), weight_of)
+
+    def _charge(self, tenant_id):
+        tag = self._tags.get(tenant_id, 0.0)
+        self._virtual_time = tag
+        self._tags[tenant_id] = tag + 1.0 / max(self.weight_of(tenant_id), 1e-9)
+        self._in_flight += 1
+
+    def _grant_waiting(self):
+        granted = False
+        while self._in_flight < self.capacity:
+            backlogged = [tenant_id for tenant_id, queue in self._waiting.items() if queue]
+            if not backlogged:
+                break
+            tenant_id = min(backlogged, key=lambda t: self._tags[t])
+            self._granted.add(self._waiting[tenant_id].popleft())
+            self._charge(tenant_id)
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def acquire(self, tenant_id):
+        """Wait for a place for one LLM call of a tenant. Returns the seconds waited."""
+        started = time.monotonic()
+        with self._cond:
+            queue = self._waiting.setdefault(tenant_id, deque())
+            if not queue:
+                self._tags[tenant_id] = max(self._tags.get(tenant_id, 0.0), self._virtual_time)
+            stats = self._stats.setdefault(tenant_id, {"calls": 0, "waited": 0, "wait_seconds": 0.0,
+                                                       "max_wait_seconds": 0.0})
+            stats["calls"] += 1
+            if self._in_flight < self.capacity and not any(self._waiting.values()):
+                self._charge(tenant_id)
+                return 0.0
+            ticket = next(self._seq)
+            queue.append(ticket)
+            self._grant_waiting()
+            while ticket not in self._granted:
+                self._cond.wait()
+            self._granted.discard(ticket)
+            waited = time.monotonic() - started
+            stats["waited"] += 1
+            stats["wait_seconds"] += waited
+            stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+            return waited
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._grant_waiting()
+
+    def call(self, tenant_id, fn):
+        """Run fn() once the tenant has a place."""
+        if self.capacity <= 0:
+            return fn()
+        self.acquire(tenant_id)
+        try:
+            return fn()
+        finally:
+            self.release()
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "waiting": {tenant_id: len(queue) for tenant_id, queue in self._waiting.items() if queue},
+                "by_tenant": {tenant_id: dict(stats) for tenant_id, stats in self._stats.items()},
+            }
+
+
+class TenantMetrics:
+    """Throughput, time per application, decisions and LLM spend per tenant."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._tenants = {}
+
+    def _entry(self, tenant_id):
+        entry = self._tenants.get(tenant_id)
+        if entry is None:
+            entry = {"applications": 0, "decisions": {}, "latencies": deque(maxlen=self.window),
+                     "first_started": None, "last_finished": None,
+                     "llm_calls": 0, "tokens": 0, "cost": 0.0}
+            self._tenants[tenant_id] = entry
+        return entry
+
+    def record_application(self, tenant_id, seconds, decision):
+        """Record one application run to completion (or parked)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry(tenant_id)
+            entry["applications"] += 1
+            entry["decisions"][decision] = entry["decisions"].get(decision, 0) + 1
+            entry["latencies"].append(seconds)
+            started = now - seconds
+            if entry["first_started"] is None or started < entry["first_started"]:
+                entry["first_started"] = started
+            entry["last_finished"] = now
+
+    def record_llm(self, tenant_id, usage, cost):
+        """Record the usage block and cost of one chat completion."""
+        tokens = (getattr(usage, "prompt_tokens", 0) or 0) + (getattr(usage, "completion_tokens", 0) or 0)
+        with self._lock:
+            entry = self._entry(tenant_id)
+            entry["llm_calls"] += 1
+            entry["tokens"] += tokens
+            entry["cost"] += cost
+
+    def report(self, limiter=None):
+        """
+        Per-tenant figures.
+
+        Returns:
+            dict: Per tenant: applications, decisions, applications_per_min,
+                  p50/p95/p99 seconds per application, llm_calls, tokens,
+                  cost_usd and, with a limiter, its quota waits
+        """
+        quota = limiter.snapshot()["by_tenant"] if limiter is not None else {}
+        with self._lock:
+            report = {}
+            for tenant_id, entry in self._tenants.items():
+                latencies = list(entry["latencies"])
+                elapsed = (entry["last_finished"] - entry["first_started"]) if entry["applications"] else 0
+                row = {
+                    "applications": entry["applications"],
+                    "decisions": dict(entry["decisions"]),
+                    "applications_per_min": round(entry["applications"] / elapsed * 60, 2) if elapsed > 0 else None,
+                    "llm_calls": entry["llm_calls"],
+                    "tokens": entry["tokens"],
+                    "cost_usd": round(entry["cost"], 4),
+                }
+                for q in (50, 95, 99):
+                    value = _percentile(latencies, q)
+                    row[f"p{q}_s"] = round(value, 3) if value is not None else None
+                if tenant_id in quota:
+                    row["llm_quota"] = quota[tenant_id]
+                report[tenant_id] = row
+            return report
+
+
+_registry = None
+_limiter = None
+_metrics = None
+_lock = threading.Lock()
+
+
+def get_tenant_registry():
+    """Return the process-wide tenant registry, configured from TENANTS_PATH on first use."""
+    global _registry
+    if _registry is not None:
+        return _registry
+    with _lock:
+        if _registry is None:
+            _registry = TenantRegistry.from_env()
+    return _registry
+
+
+def set_tenant_registry(registry):
+    """Replace the process-wide tenant registry."""
+    global _registry
+    with _lock:
+        _registry = registry
+
+
+def _tenant_weight(tenant_id):
+    try:
+        return get_tenant_registry().get(tenant_id).llm_weight
+    except ValueError:
+        return 1.0
+
+
+def get_fair_share_limiter():
+    """Return the process-wide LLM fair-share limiter, weighted by each tenant's llm_weight."""
+    global _limiter
+    if _limiter is not None:
+        return _limiter
+    with _lock:
+        if _limiter is None:
+            _limiter = FairShareLimiter.from_env(_tenant_weight)
+    return _limiter
+
+
+def set_fair_share_limiter(limiter):
+    """Replace the process-wide LLM fair-share limiter."""
+    global _limiter
+    with _lock:
+        _limiter = limiter
+
+
+def get_tenant_metrics():
+    """Return the process-wide per-tenant metrics."""
+    global _metrics
+    if _metrics is not None:
+        return _metrics
+    with _lock:
+        if _metrics is None:
+            _metrics = TenantMetrics()
+    return _metrics
+
+
+def tenant_report():
+    """Per-tenant throughput, latency, LLM spend and quota waits."""
+    return get_tenant_metrics().report(get_fair_share_limiter())
+
+
+def current_tenant_id():
+    return _current_tenant.get() or DEFAULT_TENANT
+
+
+def current_tenant():
+    """The tenant of the application being processed (the default tenant outside tenant_scope())."""
+    return get_tenant_registry().get(_current_tenant.get())
+
+
+@contextmanager
+def tenant_scope(tenant_id=None):
+    """
+    Process the block for one tenant.
+
+    Prompts, skill taxonomies and cached stage results follow the tenant's
+    JDs and culture, get_slot_store() returns the tenant's store, and LLM
+    calls count against the tenant's share.
+
+    Raises:
+        ValueError: The tenant is not registered or configured
+    """
+    tenant = get_tenant_registry().get(tenant_id)
+    token = _current_tenant.set(tenant.tenant_id)
+    try:
+        with use_slot_store(tenant.slot_store()):
+            yield tenant
+    finally:
+        _current_tenant.reset(token)
+
+
+def main():
+    """Show a tenant's prompt and how the fair-share limiter protects a small tenant from a bulk drive."""
+    # Shows the prose JD prompts, without compiling a spec, unless JD_SPEC is set
+    os.environ.setdefault("JD_SPEC", "0")
+    registry = TenantRegistry()
+    registry.register("acme", {
+        "name": "Acme Corp",
+        "company_culture": "We are remote-first and value written communication and autonomy.",
+        "email_signature": "Acme Talent Team",
+    })
+    registry.register("globex", {"name": "Globex", "llm_weight": 2})
+    acme = registry.get("acme")
+    print("Tenants:")
+    print("=" * 50)
+    print(f"acme cultural prompt ends with: ...{acme.system_prompt('cultural')[-70:].strip()!r}")
+    # Imported here: jd_spec imports llm_client, which imports this module
+    from jd_spec import jd_specs_enabled, spec_prompt
+
+    tech = stage_module("tech_jd")
+    default_tech = spec_prompt(tech, _default_text("tech_jd")) if jd_specs_enabled() else tech.SYSTEM_PROMPT
+    print(f"globex tech prompt is the default one: "
+          f"{registry.get('globex').system_prompt('tech_jd') == default_tech}")
+
+    # acme floods 8 LLM places with 400 calls from 32 threads; globex sends
+    # 40 calls from 2 threads meanwhile
+    def simulate(limiter, shared):
+        waits = {"acme": [], "globex": []}
+
+        def worker(tenant_id, calls):
+            for _ in range(calls):
+                started = time.monotonic()
+                # One shared queue is plain FIFO
+                limiter.call("all" if shared else tenant_id, lambda: time.sleep(random.uniform(0.004, 0.006)))
+                waits[tenant_id].append(time.monotonic() - started)
+
+        threads = [threading.Thread(target=worker, args=("acme", 400 // 32)) for _ in range(32)]
+        threads += [threading.Thread(target=worker, args=("globex", 20)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return waits
+
+    fifo = simulate(FairShareLimiter(8), shared=True)
+    fair = simulate(FairShareLimiter(8, lambda tenant_id: registry.get(tenant_id).llm_weight), shared=False)
+    print("\nLLM call latency with 8 places shared (p95):")
+    for tenant_id in ("acme", "globex"):
+        print(f"  {tenant_id:7s} FIFO {_percentile(fifo[tenant_id], 95) * 1000:6.1f}ms -> "
+              f"fair share {_percentile(fair[tenant_id], 95) * 1000:6.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
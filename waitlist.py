@@ -0,0 +1,425 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+
+from budget import get_budget_governor
+from email_delivery import find_email_address
+from emailer import render_template_email
+from in_memory_db import SlotStore, TIME_SLOTS, get_slot_store, use_slot_store
+from interview_organiser import BOOKING_HOLD_SECONDS, REQUIRED_TYPES, confirm_hold, describe_slots, place_hold
+from priority_scheduler import _percentile
+from profile_features import candidate_name
+from results_store import get_result_store
+from tenants import current_tenant_id, tenant_scope
+
+# Environment switches read by get_waitlist()
+#   WAITLIST                "0" to stop waitlisting candidates no slots were found for (default on)
+#   WAITLIST_DB             path of the waitlist database (default waitlist.db next to this module)
+#   WAITLIST_SWEEP_SECONDS  how often the dispatcher releases expired slot holds (default 5)
+
+# The waitlist database lives next to this module unless overridden.
+DEFAULT_DB_PATH = os.getenv(
+    "WAITLIST_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "waitlist.db"),
+)
+
+# AppState fields kept for the follow-up once slots are booked
+FOLLOW_UP_FIELDS = (
+    "application_id", "tenant_id", "candidate_email", "interview_type",
+    "filter_verdict", "jd_verdict", "jd_score", "cultural_verdict", "cultural_score", "score", "scoring_mode",
+    "profile_features",
+)
+LATENCY_WINDOW = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS waitlist (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    application_id TEXT NOT NULL UNIQUE,
+    tenant_id TEXT,
+    interview_type TEXT NOT NULL,
+    priority REAL NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    state TEXT NOT NULL
+);
+"""
+
+
+def _finalize(state):
+    # Imported here: lg_graph waitlists candidates from its organiser node
+    from lg_graph import finalize_application
+    return finalize_application(state)
+
+
+def _write_result(state):
+    get_result_store().write(state)
+
+
+class Waitlist:
+    """
+    Selected candidates no interview slots were found for, waiting for slots to open.
+
+    The waitlist listens to the change feed of the slot store of every
+    tenant it holds candidates for (see SlotStore.subscribe). When slots of
+    some interview types become free (added, or a hold released or
+    expired), only the candidates whose rounds include one of those types
+    are woken: highest priority first, then first come, first served. Each
+    woken candidate gets a bundle of slots booked (every round or none);
+    they then leave the waitlist and follow_up(state) produces the
+    follow-up email (by default the graph's organiser and emailer steps),
+    which is handed to on_scheduled(state) (by default written to the
+    results store). Once a bundle cannot be booked for an interview type,
+    later candidates of that type are not tried on the same change.
+
+    The change feed only queues wake-ups; they run on the dispatcher thread
+    (see start()), never in the thread that freed the slots, so a woken
+    candidate's follow-up is not run (or billed) inside another
+    application's node. A candidate is still scheduled within moments of
+    slots opening instead of at the next poll. Entries are kept in SQLite;
+    only their ids, types and priorities are indexed in memory, and the
+    kept state is read back once the candidate is booked. After a restart,
+    watch() resubscribes and catches up.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, follow_up=None, on_scheduled=None):
+        self.db_path = db_path
+        self.follow_up = follow_up or _finalize
+        self.on_scheduled = on_scheduled or _write_result
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        # application_id -> entry (ids, type and priority; the kept state stays in
+        # SQLite until the candidate is woken), and round type -> application ids needing it
+        self._entries = {}
+        self._by_type = {}
+        # Slot store each tenant's candidates are scheduled from
+        self._stores = {}
+        # (store, freed interview types, monotonic time freed)
+        self._pending = deque()
+        self._dispatching = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._closing = False
+        self._stats = {"waitlisted": 0, "woken": 0, "scheduled": 0, "booking_failed": 0}
+        self._wake_latencies = deque(maxlen=LATENCY_WINDOW)
+        self._waits = deque(maxlen=LATENCY_WINDOW)
+        for seq, application_id, tenant_id, interview_type, priority, enqueued_at in self._conn.execute(
+            "SELECT seq, application_id, tenant_id, interview_type, priority, enqueued_at "
+            "FROM waitlist ORDER BY seq"
+        ):
+            self._index({"seq": seq, "application_id": application_id, "tenant_id": tenant_id,
+                         "interview_type": interview_type, "priority": priority,
+                         "enqueued_at": enqueued_at})
+
+    def _index(self, entry):
+        self._entries[entry["application_id"]] = entry
+        for round_type in REQUIRED_TYPES[entry["interview_type"]]:
+            self._by_type.setdefault(round_type, set()).add(entry["application_id"])
+
+    def _unindex(self, application_id):
+        entry = self._entries.pop(application_id, None)
+        if entry is not None:
+            for round_type in REQUIRED_TYPES[entry["interview_type"]]:
+                self._by_type[round_type].discard(application_id)
+        return entry
+
+    def add(self, state, priority=0):
+        """
+        Waitlist a selected candidate whose interviews could not be scheduled.
+
+        The candidate is scheduled from the current slot store (the tenant's
+        inside tenant_scope). Adding an application again moves it to the back.
+
+        Args:
+            state (dict): AppState after the organiser, with 'interview_type'
+            priority (float): Higher is woken first; equal priorities are FIFO
+
+        Returns:
+            str: The waitlisted application id, or None for an unknown interview type
+        """
+        interview_type = state.get("interview_type")
+        if interview_type not in REQUIRED_TYPES:
+            return None
+        application_id = state.get("application_id") or f"waitlist-{uuid.uuid4().hex[:12]}"
+        tenant_id = state.get("tenant_id") or current_tenant_id()
+        kept = {field: state[field] for field in FOLLOW_UP_FIELDS if state.get(field) is not None}
+        kept.update({
+            "application_id": application_id,
+            "tenant_id": tenant_id,
+            "candidate_email": state.get("candidate_email") or find_email_address(state.get("user_profile")),
+        })
+        store = get_slot_store()
+        enqueued_at = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM waitlist WHERE application_id = ?", (application_id,))
+            seq = self._conn.execute(
+                "INSERT INTO waitlist (application_id, tenant_id, interview_type, priority, enqueued_at, state) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (application_id, tenant_id, interview_type, priority, enqueued_at, json.dumps(kept)),
+            ).lastrowid
+            self._unindex(application_id)
+            self._index({"seq": seq, "application_id": application_id, "tenant_id": tenant_id,
+                         "interview_type": interview_type, "priority": priority,
+                         "enqueued_at": enqueued_at})
+            self._stores[tenant_id] = store
+            self._stats["waitlisted"] += 1
+        store.subscribe(self._on_slots_freed)
+        return application_id
+
+    def remove(self, application_id):
+        """Take a candidate off the waitlist, e.g. when they withdraw. Returns True if they were on it."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM waitlist WHERE application_id = ?", (application_id,))
+            return self._unindex(application_id) is not None
+
+    def waiting(self, interview_type=None):
+        """Waitlisted entries in wake-up order (optionally of one interview type)."""
+        with self._lock:
+            entries = [entry for entry in self._entries.values()
+                       if interview_type is None or entry["interview_type"] == interview_type]
+        return sorted(entries, key=lambda entry: (-entry["priority"], entry["seq"]))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def watch(self):
+        """
+        Subscribe to the slot stores of every waitlisted tenant, e.g. after a restart.
+
+        Each store is then checked once for every round type, so slots that
+        opened while nothing was listening are picked up.
+        """
+        with self._lock:
+            tenant_ids = {entry["tenant_id"] for entry in self._entries.values()} - set(self._stores)
+        for tenant_id in tenant_ids:
+            try:
+                with tenant_scope(tenant_id):
+                    store = get_slot_store()
+            except ValueError as e:
+                print(f"Waitlist cannot watch slots of tenant {tenant_id}: {e}")
+                continue
+            with self._lock:
+                self._stores[tenant_id] = store
+            store.subscribe(self._on_slots_freed)
+        for store in {id(store): store for store in list(self._stores.values())}.values():
+            self._on_slots_freed(store, frozenset(t for types in REQUIRED_TYPES.values() for t in types))
+
+    def _on_slots_freed(self, store, interview_types):
+        # Runs in whichever thread freed the slots: only queue the change
+        with self._lock:
+            self._pending.append((store, interview_types, time.monotonic()))
+        self._wake.set()
+
+    def _dispatch(self):
+        """Handle pending changes (on the dispatcher thread, or in close()). A thread already dispatching picks up new ones."""
+        while self._dispatching.acquire(blocking=False):
+            try:
+                while True:
+                    with self._lock:
+                        if not self._pending:
+                            break
+                        store, interview_types, freed_at = self._pending.popleft()
+                    self._wake_for(store, interview_types, freed_at)
+            finally:
+                self._dispatching.release()
+            with self._lock:
+                if not self._pending:
+                    return
+
+    def _wake_for(self, store, interview_types, freed_at):
+        with self._lock:
+            tenant_ids = {tenant_id for tenant_id, tenant_store in self._stores.items() if tenant_store is store}
+            ids = set().union(*(self._by_type.get(t, ()) for t in interview_types))
+            woken = sorted((self._entries[i] for i in ids if self._entries[i]["tenant_id"] in tenant_ids),
+                           key=lambda entry: (-entry["priority"], entry["seq"]))
+        unavailable = set()
+        for entry in woken:
+            if entry["interview_type"] in unavailable:
+                continue
+            with self._lock:
+                if entry["application_id"] not in self._entries:
+                    continue
+                self._stats["woken"] += 1
+            slots = self._book(store, entry)
+            if slots is None:
+                unavailable.add(entry["interview_type"])
+                continue
+            self._scheduled(entry, slots, freed_at)
+
+    def _book(self, store, entry):
+        """Book a full bundle for an entry from store. Returns the slots or None."""
+        hold_id = f"waitlist:{entry['application_id']}"
+        with use_slot_store(store):
+            if not place_hold(entry["interview_type"], hold_id, ttl=BOOKING_HOLD_SECONDS):
+                return None
+            slots = confirm_hold(hold_id)
+        if not slots:
+            with self._lock:
+                self._stats["booking_failed"] += 1
+        return slots or None
+
+    def _scheduled(self, entry, slots, freed_at):
+        application_id = entry["application_id"]
+        latency = time.monotonic() - freed_at
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT state FROM waitlist WHERE application_id = ?",
+                                     (application_id,)).fetchone()
+            self._conn.execute("DELETE FROM waitlist WHERE application_id = ?", (application_id,))
+            self._unindex(application_id)
+            self._stats["scheduled"] += 1
+            self._wake_latencies.append(latency)
+            self._waits.append(time.time() - entry["enqueued_at"])
+        print(f"\n⏰ WAITLIST - {application_id} scheduled {latency:.3f}s after slots opened")
+        kept = json.loads(row[0]) if row else {"application_id": application_id, "tenant_id": entry["tenant_id"],
+                                                "interview_type": entry["interview_type"]}
+        state = dict(kept, booked_slots=slots, interview_details=describe_slots(slots), slots_not_found="")
+        try:
+            # Already counted when it was screened: only charge the follow-up to it
+            with get_budget_governor().application(application_id, resume={"calls": 0, "tokens": 0, "cost": 0.0}):
+                state = self.follow_up(state)
+            self.on_scheduled(state)
+        except Exception as e:
+            print(f"Waitlist follow-up failed for {application_id}: {e}")
+
+    def _run(self, sweep_seconds):
+        stores = []
+        while not self._closing:
+            if not self._wake.wait(timeout=sweep_seconds):
+                # Holds that lapsed free their slots only once released
+                with self._lock:
+                    stores = {id(store): store for store in self._stores.values()}.values()
+                for store in stores:
+                    store.release_expired_holds()
+            self._wake.clear()
+            self._dispatch()
+
+    def start(self, sweep_seconds=None):
+        """Handle wake-ups on a dispatcher thread, which also releases expired holds every sweep_seconds."""
+        if self._thread is not None:
+            return
+        sweep_seconds = sweep_seconds or float(os.getenv("WAITLIST_SWEEP_SECONDS", "5"))
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, args=(sweep_seconds,), name="waitlist", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop the dispatcher thread after it handled the pending changes."""
+        if self._thread is None:
+            return
+        self._closing = True
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        self._dispatch()
+
+    def report(self):
+        """
+        Waitlist size and outcomes.
+
+        Returns:
+            dict: 'waiting' (per interview type), 'waitlisted', 'woken', 'scheduled',
+                  'booking_failed', p50/p95 seconds from slots opening to booking
+                  ('wake_p50_s', 'wake_p95_s') and from waitlisting to booking
+                  ('wait_p50_s', 'wait_p95_s')
+        """
+        with self._lock:
+            waiting = {}
+            for entry in self._entries.values():
+                waiting[entry["interview_type"]] = waiting.get(entry["interview_type"], 0) + 1
+            report = dict(self._stats, waiting=waiting)
+            for name, values in (("wake", list(self._wake_latencies)), ("wait", list(self._waits))):
+                for q in (50, 95):
+                    value = _percentile(values, q)
+                    report[f"{name}_p{q}_s"] = round(value, 3) if value is not None else None
+        return report
+
+
+_waitlist = None
+_waitlist_lock = threading.Lock()
+
+
+def waitlist_enabled():
+    return os.getenv("WAITLIST", "1") != "0"
+
+
+def get_waitlist():
+    """Return the process-wide waitlist with its dispatcher running, watching the slot stores of restored entries."""
+    global _waitlist
+    if _waitlist is not None:
+        return _waitlist
+    with _waitlist_lock:
+        if _waitlist is None:
+            waitlist = Waitlist(DEFAULT_DB_PATH)
+            waitlist.watch()
+            waitlist.start()
+            _waitlist = waitlist
+    return _waitlist
+
+
+def set_waitlist(waitlist):
+    """Replace the process-wide waitlist (e.g. one with a custom follow-up); start() it to handle wake-ups."""
+    global _waitlist
+    _waitlist = waitlist
+
+
+def main():
+    """Waitlist candidates on an empty slot store, then open slots and show who is woken and how fast."""
+    store = SlotStore(":memory:")
+    emails = []
+
+    def follow_up(state):
+        name = candidate_name(state)
+        return dict(state, final_email=render_template_email("select", state["interview_details"], name))
+
+    waitlist = Waitlist(":memory:", follow_up=follow_up, on_scheduled=emails.append)
+    candidates = [
+        ("tech-1", "tech", 0, "Priya Nair"),
+        ("tech-2", "tech", 0, "Tom Berg"),
+        ("tech-3", "tech", 1, "Ana Ruiz"),
+        ("sales-1", "sales", 0, "James Thompson"),
+    ]
+    with use_slot_store(store):
+        # The only tech bundle is held for an application still being screened
+        for hour, round_type in enumerate(REQUIRED_TYPES["tech"]):
+            store.add_slot("2026-11-02", TIME_SLOTS[hour], round_type)
+        place_hold("tech", "in-screening", ttl=0.5)
+        for application_id, interview_type, priority, name in candidates:
+            waitlist.add({"application_id": application_id, "interview_type": interview_type,
+                          "filter_verdict": interview_type, "jd_verdict": "select", "cultural_verdict": "select",
+                          "profile_features": {"name": name}}, priority=priority)
+    waitlist.start(sweep_seconds=0.1)
+    print("Waitlisted (wake-up order):", [entry["application_id"] for entry in waitlist.waiting()])
+
+    print("\nOpening a bundle of tech rounds...")
+    for hour, round_type in enumerate(REQUIRED_TYPES["tech"]):
+        store.add_slot("2026-11-03", TIME_SLOTS[hour], round_type)
+    time.sleep(0.1)
+    woken = waitlist.report()["woken"]
+    print("\nOpening a Communication slot...")
+    store.add_slot("2026-11-03", TIME_SLOTS[4], "Communication")
+    time.sleep(0.1)
+    print(f"Candidates woken by it: {waitlist.report()['woken'] - woken} (tech candidates are not)")
+    print("\nOpening a Case study slot...")
+    store.add_slot("2026-11-03", TIME_SLOTS[5], "Case study")
+    time.sleep(0.1)
+    print("\nWaiting for the hold of the application in screening to lapse...")
+    time.sleep(0.6)
+    waitlist.close()
+
+    print("\nFollow-up emails:")
+    for state in emails:
+        print(f"  {state['application_id']}: {state['interview_details']}")
+    print("\nStill waiting:", [entry["application_id"] for entry in waitlist.waiting()])
+    report = waitlist.report()
+    print(f"Woken {report['woken']}, scheduled {report['scheduled']}; "
+          f"slots opening to booking p50 {report['wake_p50_s']}s, p95 {report['wake_p95_s']}s")
+
+
+if __name__ == "__main__":
+    main()